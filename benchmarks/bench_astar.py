@@ -0,0 +1,68 @@
+"""
+Nodes settled and latency of single route searches per algorithm of
+`OSMNXRouter(algorithm=...)` on the CSR graph of a road network (a synthetic
+grid unless `--place` is given, see `local_graph.py`): Dijkstra stopping at the
+target, A* with the great-circle heuristic, and A* with landmarks (ALT). The
+full Dijkstra search of the scipy engine (in C) is timed for reference. The
+heuristics are evaluated only for the nodes each search reaches, within the
+latency.
+
+Usage:
+    python benchmarks/bench_astar.py --routes 50 --landmarks 16
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from georouting.graph import CSRGraph
+from local_graph import load_graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--place", default=None)
+    parser.add_argument("--size", type=int, default=150, help="grid size without --place")
+    parser.add_argument("--routes", type=int, default=50)
+    parser.add_argument("--landmarks", type=int, default=16)
+    args = parser.parse_args()
+
+    graph = CSRGraph.from_networkx(load_graph(args.place, args.size))
+    start = time.perf_counter()
+    landmarks = graph.landmarks(args.landmarks)
+    print(
+        "%d landmarks: %.2f s, %.1f MB"
+        % (
+            args.landmarks,
+            time.perf_counter() - start,
+            (landmarks[1].nbytes + landmarks[2].nbytes) / 1e6,
+        )
+    )
+
+    rng = np.random.default_rng(0)
+    pairs = rng.integers(0, len(graph.nodes), (args.routes, 2)).tolist()
+    heuristics = {
+        "dijkstra": lambda source, target: None,
+        "astar": lambda source, target: graph.great_circle_heuristic(target),
+        "alt": lambda source, target: graph.landmark_heuristic(landmarks, target, source),
+    }
+
+    print("%12s %16s %14s %8s" % ("algorithm", "nodes settled", "latency (ms)", "same"))
+    start = time.perf_counter()
+    expected = [graph.route(s, t) for s, t in pairs]
+    scipy_time = (time.perf_counter() - start) / args.routes
+    print("%12s %16d %14.1f %8s" % ("scipy", len(graph.nodes), scipy_time * 1000, True))
+    for name, heuristic in heuristics.items():
+        settled, same = [], True
+        start = time.perf_counter()
+        for (s, t), path in zip(pairs, expected):
+            route, n = graph.astar(s, t, heuristic(s, t))
+            settled.append(n)
+            same &= route == path
+        elapsed = (time.perf_counter() - start) / args.routes
+        print("%12s %16.0f %14.1f %8s" % (name, np.mean(settled), elapsed * 1000, same))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Wall-clock time of `get_distances_batch` (serial and with a thread pool) versus
+`aget_distances_batch` (asyncio) against the local mock OSRM server with
+simulated latency.
+
+Usage:
+    python benchmarks/bench_async_batch.py --pairs 5000 --origins 100 --delay 0.02 --concurrency 4 16
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from georouting.routers import OSRMRouter
+from mock_osrm import start_server
+
+
+def random_pairs(n, n_origins=None, seed=0):
+    """Random OD pairs around Boston; origins are drawn from `n_origins` distinct points."""
+    rng = np.random.default_rng(seed)
+    n_origins = n_origins or n
+    points = np.column_stack(
+        [rng.uniform(42.2, 42.5, n_origins), rng.uniform(-71.3, -70.9, n_origins)]
+    )
+    origins = points[rng.integers(0, n_origins, n)]
+    destinations = np.column_stack(
+        [rng.uniform(42.2, 42.5, n), rng.uniform(-71.3, -70.9, n)]
+    )
+    return origins.round(5), destinations.round(5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pairs", type=int, default=5000)
+    parser.add_argument("--origins", type=int, default=100, help="distinct origins")
+    parser.add_argument("--delay", type=float, default=0.02)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[4, 16])
+    args = parser.parse_args()
+
+    origins, destinations = random_pairs(args.pairs, args.origins)
+    server, url = start_server(delay=args.delay)
+    try:
+        router = OSRMRouter(base_url=url)
+        start = time.perf_counter()
+        serial = router.get_distances_batch(origins, destinations)
+        t_serial = time.perf_counter() - start
+        print(f"serial               : {t_serial:7.2f} s  ({args.pairs / t_serial:8.0f} pairs/s)")
+
+        for concurrency in args.concurrency:
+            start = time.perf_counter()
+            result = asyncio.run(
+                router.aget_distances_batch(origins, destinations, concurrency=concurrency)
+            )
+            elapsed = time.perf_counter() - start
+            assert result.equals(serial)
+            print(
+                f"async concurrency={concurrency:<3d}: {elapsed:7.2f} s  "
+                f"({args.pairs / elapsed:8.0f} pairs/s, {t_serial / elapsed:.1f}x)"
+            )
+
+            start = time.perf_counter()
+            result = router.get_distances_batch(origins, destinations, workers=concurrency)
+            elapsed = time.perf_counter() - start
+            assert result.equals(serial)
+            print(
+                f"threads workers={concurrency:<5d}: {elapsed:7.2f} s  "
+                f"({args.pairs / elapsed:8.0f} pairs/s, {t_serial / elapsed:.1f}x)"
+            )
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
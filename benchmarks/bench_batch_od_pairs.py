@@ -0,0 +1,109 @@
+"""
+Time of dividing origin-destination pairs into batches: the vectorized
+`gtl.get_batch_od_pairs` (and `gtl.get_batch_od_indices`, which skips building
+coordinate tuples) versus the previous pandas groupby/string-key version
+(kept below as `legacy_get_batch_od_pairs`), which also serves as a reference for
+the batch contents.
+
+The legacy version is slow (minutes at 1M pairs); `--legacy-max` skips it above a
+number of pairs.
+
+Usage:
+    python benchmarks/bench_batch_od_pairs.py --pairs 10000 100000 1000000 --origins 1000
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+import georouting.utils as gtl
+from bench_async_batch import random_pairs
+
+
+def legacy_get_batch_od_pairs(orgins, destinations, max_batch_size=25):
+    """The string-key/groupby implementation `get_batch_od_pairs` used to have."""
+    orgins = pd.DataFrame(orgins, columns=["lat", "lon"])
+    destinations = pd.DataFrame(destinations, columns=["lat", "lon"])
+    df = pd.merge(
+        orgins,
+        destinations,
+        left_index=True,
+        right_index=True,
+        suffixes=("_origin", "_destination"),
+    )
+    df = df.drop_duplicates()
+    df["origin"] = df["lat_origin"].astype(str) + "," + df["lon_origin"].astype(str)
+    df["destination"] = (
+        df["lat_destination"].astype(str) + "," + df["lon_destination"].astype(str)
+    )
+    if df["destination"].nunique() >= df["origin"].nunique():
+        according = "origin"
+    else:
+        according = "destination"
+
+    batches = []
+    for _, group in df.groupby(according):
+        for start in range(0, len(group), int(max_batch_size)):
+            sub_group = group.iloc[start : start + int(max_batch_size)]
+            batches.append(
+                (
+                    sub_group[["lat_origin", "lon_origin"]].value_counts().index.to_list(),
+                    sub_group[["lat_destination", "lon_destination"]]
+                    .value_counts()
+                    .index.to_list(),
+                )
+            )
+    return batches
+
+
+def normalize(batches):
+    return sorted((tuple(sorted(o)), tuple(sorted(d))) for o, d in batches)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pairs", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--origins", type=int, default=1000, help="distinct origins")
+    parser.add_argument("--batch-size", type=int, default=25)
+    parser.add_argument("--legacy-max", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(
+        "%10s %12s %12s %12s %10s %8s"
+        % ("pairs", "legacy (s)", "new (s)", "indices (s)", "speedup", "same")
+    )
+    for n in args.pairs:
+        origins, destinations = random_pairs(n, min(args.origins, n))
+        _, indices_time = timed(
+            gtl.get_batch_od_indices, origins, destinations, args.batch_size
+        )
+        origins, destinations = origins.tolist(), destinations.tolist()
+
+        new, new_time = timed(
+            gtl.get_batch_od_pairs, origins, destinations, args.batch_size
+        )
+        if n <= args.legacy_max:
+            legacy, legacy_time = timed(
+                legacy_get_batch_od_pairs, origins, destinations, args.batch_size
+            )
+            same = normalize(new) == normalize(legacy)
+            print(
+                "%10d %12.3f %12.3f %12.3f %9.0fx %8s"
+                % (n, legacy_time, new_time, indices_time, legacy_time / new_time, same)
+            )
+        else:
+            print(
+                "%10d %12s %12.3f %12.3f %10s %8s"
+                % (n, "-", new_time, indices_time, "-", "-")
+            )
+
+
+if __name__ == "__main__":
+    main()
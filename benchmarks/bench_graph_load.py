@@ -0,0 +1,69 @@
+"""
+Startup time of `OSMNXRouter` with a saved road network (`graph_dir`) against
+building the graph: the NetworkX graph (downloaded and given speeds and travel
+times by OSMnx with `--place`, a synthetic grid otherwise, see `local_graph.py`)
+converted to CSR arrays, versus memory-mapping the saved arrays. The NetworkX graph is only rebuilt from
+the arrays when a method needs it (snapping points to nodes still does).
+
+Usage:
+    python benchmarks/bench_graph_load.py --size 300
+    python benchmarks/bench_graph_load.py --place "Cambridge, Massachusetts, USA"
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from georouting.graph import CSRGraph
+from georouting.routers import OSMNXRouter
+from local_graph import load_graph, random_points
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--place", default=None)
+    parser.add_argument("--size", type=int, default=150, help="grid size without --place")
+    parser.add_argument("--matrix", type=int, default=50)
+    args = parser.parse_args()
+
+    G, build_time = timed(load_graph, args.place, args.size)
+    graph, convert_time = timed(CSRGraph.from_networkx, G)
+    origins = random_points(G, args.matrix, seed=2)
+    destinations = random_points(G, args.matrix, seed=3)
+
+    with tempfile.TemporaryDirectory() as graph_dir:
+        area = args.place or "grid %d" % args.size
+        router = OSMNXRouter(area=area, engine="scipy", graph=G)
+        router.graph_dir = graph_dir
+        _, save_time = timed(graph.save, router.graph_path)
+        size = sum(
+            os.path.getsize(os.path.join(router.graph_path, f))
+            for f in os.listdir(router.graph_path)
+        )
+        loaded, load_time = timed(
+            lambda: OSMNXRouter(area=area, engine="scipy", graph_dir=graph_dir)
+        )
+        _, nx_time = timed(lambda: loaded.G)
+        expected = router.get_distance_matrix(origins, destinations)
+        df, matrix_time = timed(loaded.get_distance_matrix, origins, destinations)
+
+    print("%-36s %8.2f s" % ("build the NetworkX graph", build_time))
+    print("%-36s %8.2f s" % ("convert to CSR arrays", convert_time))
+    print("%-36s %8.2f s (%.1f MB)" % ("save", save_time, size / 1e6))
+    print("%-36s %8.3f s" % ("OSMNXRouter(graph_dir=...) startup", load_time))
+    print("%-36s %8.2f s" % ("rebuild the NetworkX graph", nx_time))
+    print("%-36s %8.2f s" % ("%dx%d matrix" % (args.matrix, args.matrix), matrix_time))
+    print("same results:", np.allclose(df.values, expected.values, equal_nan=True))
+
+
+if __name__ == "__main__":
+    main()
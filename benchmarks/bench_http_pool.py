@@ -0,0 +1,63 @@
+"""
+Requests/second of `OSRMRouter.get_route` against the local mock OSRM server,
+with and without the pooled keep-alive session.
+
+"before" emulates the previous behaviour (a bare `requests.get` per call, i.e.
+a new TCP connection each time); "after" uses the shared pooled session.
+
+Usage:
+    python benchmarks/bench_http_pool.py --requests 2000 --threads 1 8
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from georouting.routers import OSRMRouter
+from mock_osrm import start_server
+
+
+class UnpooledSession:
+    """Mimics the old code path: one connection per request."""
+
+    def get(self, url, timeout=None):
+        return requests.get(url, timeout=timeout)
+
+
+def run(router, n, threads):
+    origin, destination = (42.36, -71.06), (42.37, -71.10)
+    start = time.perf_counter()
+    if threads == 1:
+        for _ in range(n):
+            router.get_route(origin, destination)
+    else:
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(lambda _: router.get_route(origin, destination), range(n)))
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    args = parser.parse_args()
+
+    server, url = start_server()
+    try:
+        for threads in args.threads:
+            before = OSRMRouter(base_url=url, session=UnpooledSession())
+            after = OSRMRouter(base_url=url, pool_maxsize=max(threads, 10))
+            rps_before = run(before, args.requests, threads)
+            rps_after = run(after, args.requests, threads)
+            print(
+                f"threads={threads:<3d} before: {rps_before:8.0f} req/s   "
+                f"after: {rps_after:8.0f} req/s   speedup: {rps_after / rps_before:.2f}x"
+            )
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
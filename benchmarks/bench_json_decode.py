@@ -0,0 +1,96 @@
+"""
+Time of decoding large OSRM `/table` responses with each installed JSON decoder
+(`gtl.JSON_DECODERS`), and of parsing the decoded response into the distance and
+duration arrays.
+
+Responses are recorded once into `--record-dir` (from the OSRM server at
+`--base-url`, or generated with the mock server's `/table` handler when no URL is
+given, since large tables do not fit in the URL limit of the mock server) and
+replayed from disk afterwards, so every decoder parses the same bytes.
+
+Usage:
+    python benchmarks/bench_json_decode.py --sizes 500 1000 2000
+    python benchmarks/bench_json_decode.py --base-url http://localhost:5000 --sizes 1000
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import requests
+
+import georouting.utils as gtl
+from georouting.routers import OSRMRouter
+from bench_async_batch import random_pairs
+from mock_osrm import table_response
+
+
+def record_response(base_url, size, path):
+    """Request a `size` x `size` table and store the raw response body at `path`."""
+    origins, destinations = random_pairs(size, seed=size)
+    if base_url is None:
+        coords = [(lon, lat) for lat, lon in origins.tolist() + destinations.tolist()]
+        data = table_response(coords, range(size), range(size, 2 * size))
+        path.write_bytes(json.dumps(data).encode())
+        return
+    router = OSRMRouter(base_url=base_url)
+    url = router._get_matrix_distance_url(origins.tolist(), destinations.tolist())
+    response = requests.get(url, timeout=600)
+    response.raise_for_status()
+    path.write_bytes(response.content)
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000])
+    parser.add_argument("--base-url", default=None, help="OSRM server to record from")
+    parser.add_argument("--record-dir", default="benchmarks/responses")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    record_dir = Path(args.record_dir)
+    record_dir.mkdir(parents=True, exist_ok=True)
+    router = OSRMRouter(base_url="http://localhost")
+
+    print(
+        "%8s %10s %10s %12s %12s %12s"
+        % ("size", "MB", "decoder", "decode (s)", "parse (s)", "total (s)")
+    )
+    for size in args.sizes:
+        path = record_dir / ("osrm_table_%d.json" % size)
+        if not path.exists():
+            record_response(args.base_url, size, path)
+        body = path.read_bytes()
+
+        for name, decoder in gtl.JSON_DECODERS.items():
+            data = decoder(body)
+            decode_time = best_time(lambda: decoder(body), args.repeat)
+            parse_time = best_time(
+                lambda: router._parse_distance_matrix_arrays(data, (size, size)),
+                args.repeat,
+            )
+            print(
+                "%8d %10.1f %10s %12.3f %12.3f %12.3f"
+                % (
+                    size,
+                    len(body) / 1e6,
+                    name,
+                    decode_time,
+                    parse_time,
+                    decode_time + parse_time,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Time of `OSMNXRouter` routes, distance matrices and batches per graph engine on a
+city-size road network (a synthetic grid unless `--place` is given, see
+`local_graph.py`), and the memory of the graph each engine searches (the
+NetworkX graph measured with tracemalloc, the CSR arrays and search matrix of the
+scipy engine; igraph memory is not traced). The results of every engine are
+checked against the first one.
+
+The setup time of the "ch" engine is the contraction hierarchy preprocessing;
+with `--ch-path` it is saved there and loaded by later runs. Its searches only
+grow slowly with the network, so it is worth it on larger networks (--size 300).
+
+Usage:
+    python benchmarks/bench_osmnx_engines.py --engines networkx igraph --matrix 20
+    python benchmarks/bench_osmnx_engines.py --engines scipy ch --ch-path grid.ch.npz
+    python benchmarks/bench_osmnx_engines.py --size 300 --matrix 100 --batch 1000 \
+        --engines scipy ch --ch-path grid300.ch.npz
+    python benchmarks/bench_osmnx_engines.py --place "Cambridge, Massachusetts, USA"
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from georouting.routers import OSMNXRouter
+from local_graph import load_graph, random_points
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def graph_megabytes(router, G):
+    if router.engine == "networkx":
+        return "%.1f" % (G.graph["nbytes"] / 1e6)
+    if router.engine == "scipy":
+        matrix = router.graph.matrix()
+        nbytes = router.graph.nbytes + matrix.data.nbytes
+        return "%.1f" % (nbytes / 1e6)
+    if router.engine == "ch":
+        arrays = (router.ch.rank,) + router.ch.forward + router.ch.backward
+        return "%.1f" % ((router.graph.nbytes + sum(a.nbytes for a in arrays)) / 1e6)
+    return "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--place", default=None)
+    parser.add_argument("--size", type=int, default=150, help="grid size without --place")
+    parser.add_argument("--engines", nargs="+", default=["networkx", "igraph", "scipy"])
+    parser.add_argument("--routes", type=int, default=20)
+    parser.add_argument("--matrix", type=int, default=20, help="origins = destinations")
+    parser.add_argument("--batch", type=int, default=400)
+    parser.add_argument("--ch-path", default=None)
+    args = parser.parse_args()
+
+    G = load_graph(args.place, args.size)
+    route_points = random_points(G, 2 * args.routes, seed=1)
+    origins = random_points(G, args.matrix, seed=2)
+    destinations = random_points(G, args.matrix, seed=3)
+    batch_origins = random_points(G, args.batch, seed=4)
+    batch_destinations = random_points(G, args.batch, seed=5)
+
+    print(
+        "%10s %10s %10s %12s %12s %12s %8s"
+        % ("engine", "graph (MB)", "setup (s)", "route (ms)", "matrix (s)", "batch (s)", "same")
+    )
+    reference = None
+    for engine in args.engines:
+        router, setup_time = timed(
+            lambda: OSMNXRouter(graph=G, engine=engine, ch_path=args.ch_path)
+        )
+        start = time.perf_counter()
+        for o, d in zip(route_points[::2], route_points[1::2]):
+            router.get_route(o, d)
+        route_time = (time.perf_counter() - start) / args.routes
+        matrix, matrix_time = timed(router.get_distance_matrix, origins, destinations)
+        batch, batch_time = timed(
+            router.get_distances_batch, batch_origins, batch_destinations
+        )
+
+        result = np.concatenate([matrix.values, batch.values]).astype(float)
+        if reference is None:
+            reference = result
+        same = np.allclose(result, reference, equal_nan=True, atol=1)
+        print(
+            "%10s %10s %10.2f %12.1f %12.2f %12.2f %8s"
+            % (
+                engine,
+                graph_megabytes(router, G),
+                setup_time,
+                route_time * 1000,
+                matrix_time,
+                batch_time,
+                same,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
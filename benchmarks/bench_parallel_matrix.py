@@ -0,0 +1,50 @@
+"""
+Time of a large `OSMNXRouter` distance matrix with the scipy engine and one or
+more worker processes, which memory-map a single saved copy of the CSR graph
+(see `georouting.graph.parallel_costs`); the time includes starting the
+processes.
+
+Usage:
+    python benchmarks/bench_parallel_matrix.py --workers 1 4 8 --matrix 500
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from georouting.routers import OSMNXRouter
+from local_graph import load_graph, random_points
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--place", default=None)
+    parser.add_argument("--size", type=int, default=150, help="grid size without --place")
+    parser.add_argument("--matrix", type=int, default=300, help="origins = destinations")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    G = load_graph(args.place, args.size)
+    router = OSMNXRouter(graph=G, engine="scipy")
+    origins = random_points(G, args.matrix, seed=2)
+    destinations = random_points(G, args.matrix, seed=3)
+
+    print(
+        "graph: %.1f MB of CSR arrays shared by the workers, %.1f MB as NetworkX"
+        % (router.graph.nbytes / 1e6, G.graph["nbytes"] / 1e6)
+    )
+    print("%8s %12s %8s" % ("workers", "matrix (s)", "same"))
+    reference = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        df = router.get_distance_matrix(origins, destinations, workers=workers)
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = df.values
+        same = np.allclose(df.values, reference, equal_nan=True)
+        print("%8d %12.2f %8s" % (workers, elapsed, same))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Time of snapping points to their nearest network nodes with
+`osmnx.distance.nearest_nodes`, which builds a spatial index on every call,
+against `OSMNXRouter.snap`, which queries the index the router builds once, and
+the nearest edge snapping of `OSMNXRouter(snap_to="edge")` (`EdgeIndex.query`).
+
+Usage:
+    python benchmarks/bench_snap.py --points 1 100 10000 1000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import osmnx as ox
+
+from georouting.routers import OSMNXRouter
+from local_graph import load_graph, random_points
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--place", default=None)
+    parser.add_argument("--size", type=int, default=150, help="grid size without --place")
+    parser.add_argument("--points", type=int, nargs="+", default=[1, 100, 10000])
+    args = parser.parse_args()
+
+    G = load_graph(args.place, args.size)
+    start = time.perf_counter()
+    router = OSMNXRouter(graph=G, snap_to="edge")
+    print("router setup (index builds): %.2f s" % (time.perf_counter() - start))
+
+    print(
+        "%8s %14s %14s %14s %8s"
+        % ("points", "osmnx (ms)", "snap (ms)", "edges (ms)", "same")
+    )
+    for n in args.points:
+        points = np.array(random_points(G, n, seed=n))
+        start = time.perf_counter()
+        expected = ox.distance.nearest_nodes(G, points[:, 1], points[:, 0])
+        osmnx_time = time.perf_counter() - start
+        start = time.perf_counter()
+        nodes, _ = router.snap(points)
+        snap_time = time.perf_counter() - start
+        start = time.perf_counter()
+        router.edge_index.query(points)
+        edge_time = time.perf_counter() - start
+        same = np.array_equal(nodes, expected)
+        print(
+            "%8d %14.1f %14.1f %14.1f %8s"
+            % (n, osmnx_time * 1000, snap_time * 1000, edge_time * 1000, same)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Road networks for the local routing benchmarks.
+
+`load_graph` downloads the network of a place with OSMnx, or, without a place
+(or network access), builds a synthetic city-size grid network with the same
+node and edge attributes: a `size` x `size` grid of ~100 m blocks with random
+speeds, one-way streets and a few missing blocks.
+"""
+
+import gc
+import time
+import tracemalloc
+
+import networkx as nx
+import numpy as np
+import osmnx as ox
+
+
+def grid_graph(size=150, seed=0):
+    rng = np.random.default_rng(seed)
+    i, j = np.divmod(np.arange(size * size), size)
+    x = -71.2 + 0.0012 * j + rng.normal(0, 0.0002, size * size)
+    y = 42.3 + 0.0009 * i + rng.normal(0, 0.0002, size * size)
+    nodes = np.arange(size * size) + 1000
+
+    u = np.concatenate([nodes[j < size - 1], nodes[i < size - 1]])
+    v = np.concatenate([nodes[j < size - 1] + 1, nodes[i < size - 1] + size])
+    keep = rng.random(len(u)) > 0.03
+    u, v = u[keep], v[keep]
+    speed = rng.choice([25.0, 40.0, 56.0, 90.0], len(u), p=[0.5, 0.3, 0.15, 0.05])
+    two_way = rng.random(len(u)) > 0.15
+    u, v, speed = (
+        np.concatenate([u, v[two_way]]),
+        np.concatenate([v, u[two_way]]),
+        np.concatenate([speed, speed[two_way]]),
+    )
+
+    lon, lat = np.radians(x[u - 1000]), np.radians(y[u - 1000])
+    lon2, lat2 = np.radians(x[v - 1000]), np.radians(y[v - 1000])
+    a = (
+        np.sin((lat2 - lat) / 2) ** 2
+        + np.cos(lat) * np.cos(lat2) * np.sin((lon2 - lon) / 2) ** 2
+    )
+    length = 2 * 6371009 * np.arcsin(np.sqrt(a))
+    travel_time = length / (speed / 3.6)
+
+    G = nx.MultiDiGraph(crs="epsg:4326")
+    G.add_nodes_from(
+        (n, {"x": float(a), "y": float(b)}) for n, a, b in zip(nodes.tolist(), x, y)
+    )
+    G.add_edges_from(
+        (a, b, {"length": l, "speed_kph": s, "travel_time": t})
+        for a, b, l, s, t in zip(
+            u.tolist(), v.tolist(), length.tolist(), speed.tolist(), travel_time.tolist()
+        )
+    )
+    return G
+
+
+def load_graph(place=None, size=150, mode="drive"):
+    """
+    Return the benchmark network. The memory the NetworkX graph holds (measured with
+    tracemalloc while building it) is stored in `G.graph["nbytes"]`.
+    """
+    start = time.perf_counter()
+    tracemalloc.start()
+    if place:
+        G = ox.graph_from_place(place, network_type=mode)
+        G = ox.add_edge_travel_times(ox.add_edge_speeds(G))
+        name = place
+    else:
+        G = grid_graph(size)
+        name = "synthetic %dx%d grid" % (size, size)
+    gc.collect()
+    G.graph["nbytes"] = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(
+        "[graph] %s: %d nodes, %d edges (%.1f s)"
+        % (name, len(G), G.number_of_edges(), time.perf_counter() - start)
+    )
+    return G
+
+
+def random_points(G, n, seed=0):
+    """`n` random (lat, lon) points near the nodes of `G`."""
+    rng = np.random.default_rng(seed)
+    nodes = np.array([(d["y"], d["x"]) for _, d in G.nodes(data=True)])
+    points = nodes[rng.integers(0, len(nodes), n)]
+    return (points + rng.normal(0, 0.0002, points.shape)).round(6).tolist()
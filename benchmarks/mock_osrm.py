@@ -0,0 +1,137 @@
+"""
+A small stand-in for an OSRM server used by the benchmarks.
+
+It answers `/route/v1/...` and `/table/v1/...` requests with deterministic
+values (great-circle distance and a constant speed), optionally after an
+artificial delay to mimic network/server latency. It speaks HTTP/1.1 so
+keep-alive connections are honoured.
+
+Usage:
+    python benchmarks/mock_osrm.py --port 5000 --delay 0.01
+"""
+
+import argparse
+import gzip
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+SPEED_MPS = 10.0
+
+
+def haversine(lon1, lat1, lon2, lat2):
+    lon1, lat1, lon2, lat2 = map(math.radians, (lon1, lat1, lon2, lat2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * 6371000 * math.asin(math.sqrt(a))
+
+
+def _parse_coords(text):
+    return [tuple(map(float, c.split(","))) for c in text.split(";")]
+
+
+def _parse_index(qs, name, default):
+    value = qs.get(name, [None])[0]
+    if value is None or value == "all":
+        return default
+    return [int(i) for i in value.split(";")]
+
+
+def table_response(coords, sources, destinations):
+    """The `/table` response for (lon, lat) `coords` and the source/destination indices."""
+    distances = [
+        [haversine(*coords[i], *coords[j]) for j in destinations] for i in sources
+    ]
+    durations = [[d / SPEED_MPS for d in row] for row in distances]
+    return {"code": "Ok", "durations": durations, "distances": distances}
+
+
+class MockOSRMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    delay = 0.0
+    use_gzip = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _route(self, coords):
+        (lon1, lat1), (lon2, lat2) = coords[0], coords[-1]
+        distance = haversine(lon1, lat1, lon2, lat2)
+        geometry = {"type": "LineString", "coordinates": [[lon1, lat1], [lon2, lat2]]}
+        step = {"geometry": geometry, "duration": distance / SPEED_MPS, "distance": distance}
+        return {
+            "code": "Ok",
+            "routes": [
+                {
+                    "duration": distance / SPEED_MPS,
+                    "distance": distance,
+                    "geometry": geometry,
+                    "legs": [{"steps": [step]}],
+                }
+            ],
+        }
+
+    def _table(self, coords, qs):
+        everything = list(range(len(coords)))
+        return table_response(
+            coords,
+            _parse_index(qs, "sources", everything),
+            _parse_index(qs, "destinations", everything),
+        )
+
+    def do_GET(self):
+        if self.delay:
+            time.sleep(self.delay)
+        url = urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+        if len(parts) != 4 or parts[0] not in ("route", "table"):
+            self.send_error(404)
+            return
+        coords = _parse_coords(parts[3])
+        qs = parse_qs(url.query)
+        data = self._route(coords) if parts[0] == "route" else self._table(coords, qs)
+
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if self.use_gzip and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = gzip.compress(body, compresslevel=1)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_server(port=0, delay=0.0, use_gzip=True):
+    """
+    Start the mock server in a background thread.
+    Returns the server and its base URL; call `server.shutdown()` when done.
+    """
+    handler = type(
+        "Handler", (MockOSRMHandler,), {"delay": delay, "use_gzip": use_gzip}
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, "http://127.0.0.1:%d" % server.server_address[1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--delay", type=float, default=0.0)
+    args = parser.parse_args()
+    server, url = start_server(args.port, args.delay)
+    print(f"[mock-osrm] serving on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
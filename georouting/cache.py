@@ -0,0 +1,443 @@
+"""
+Result caches for the routers.
+
+`SQLiteCache` keeps origin-destination results (duration and distance) and
+raw route responses in a local SQLite file, so repeated runs over the same
+pairs only query the routing service for pairs it has not seen before.
+
+`MemoryCache` is an in-process LRU cache with the same interface, for
+interactive sessions that ask for the same routes over and over.
+"""
+
+import json
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_CACHE_PATH = "georouting_cache.sqlite"
+
+# coordinates are rounded to this many decimals (about 0.1 m) to build cache keys
+DEFAULT_KEY_PRECISION = 6
+
+
+class SQLiteCache:
+    """
+    Persistent cache of routing results backed by a SQLite file.
+
+    Parameters
+    ----------
+    - `path` : str or Path
+        Location of the SQLite database. Use ":memory:" for a throw-away cache.
+    - `ttl` : float
+        Time to live of an entry in seconds. Older entries are ignored and purged.
+        None keeps entries forever.
+    - `max_entries` : int
+        Maximum number of origin-destination entries (and, separately, routes) to
+        keep. Above it the oldest entries are evicted, down to 90% of it so that
+        the rows are counted once per many inserts. None means no limit.
+    - `key_precision` : int
+        Number of decimals the coordinates are rounded to when building keys.
+
+    The cache counts hits and misses of lookups, see `stats()`.
+    """
+
+    def __init__(
+        self,
+        path=DEFAULT_CACHE_PATH,
+        ttl=None,
+        max_entries=None,
+        key_precision=DEFAULT_KEY_PRECISION,
+    ):
+        self.path = str(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.key_precision = key_precision
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # an upper bound of the rows of each table, see `_evict`
+        self._counts = {}
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._create_tables()
+
+    def __repr__(self):
+        return "SQLiteCache(%r, ttl=%r, max_entries=%r)" % (
+            self.path,
+            self.ttl,
+            self.max_entries,
+        )
+
+    def _create_tables(self):
+        with self._lock, self._conn:
+            if self.path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS distances (
+                    provider TEXT, mode TEXT,
+                    origin_lat REAL, origin_lon REAL,
+                    destination_lat REAL, destination_lon REAL,
+                    duration REAL, distance REAL, created_at REAL,
+                    PRIMARY KEY (provider, mode, origin_lat, origin_lon,
+                                 destination_lat, destination_lon)
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS distances_created_at ON distances (created_at)"
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS routes (
+                    provider TEXT, mode TEXT,
+                    origin_lat REAL, origin_lon REAL,
+                    destination_lat REAL, destination_lon REAL,
+                    route TEXT, created_at REAL,
+                    PRIMARY KEY (provider, mode, origin_lat, origin_lon,
+                                 destination_lat, destination_lon)
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS routes_created_at ON routes (created_at)"
+            )
+
+    def _keys(self, pairs):
+        """Round an (n, 4) array of origin/destination coordinates to key values."""
+        pairs = np.asarray(pairs, dtype=float).reshape(-1, 4)
+        return np.round(pairs, self.key_precision)
+
+    def _min_created_at(self):
+        return time.time() - self.ttl if self.ttl is not None else -np.inf
+
+    def get_distances(self, provider, mode, pairs):
+        """
+        Look up origin-destination pairs.
+
+        `pairs` is a sequence of (origin_lat, origin_lon, destination_lat, destination_lon).
+        Returns three arrays: a boolean mask of the pairs found, their durations and
+        their distances (NaN where not found or unreachable).
+        """
+        keys = self._keys(pairs)
+        n = len(keys)
+        found = np.zeros(n, dtype=bool)
+        durations = np.full(n, np.nan)
+        distances = np.full(n, np.nan)
+        if n == 0:
+            return found, durations, distances
+
+        with self._lock:
+            conn = self._conn
+            conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS lookup "
+                "(i INTEGER, origin_lat REAL, origin_lon REAL, "
+                "destination_lat REAL, destination_lon REAL)"
+            )
+            conn.execute("DELETE FROM lookup")
+            conn.executemany(
+                "INSERT INTO lookup VALUES (?, ?, ?, ?, ?)",
+                ((i, *map(float, key)) for i, key in enumerate(keys)),
+            )
+            rows = conn.execute(
+                """
+                SELECT l.i, d.duration, d.distance FROM lookup l
+                JOIN distances d
+                  ON d.provider = ? AND d.mode = ?
+                 AND d.origin_lat = l.origin_lat AND d.origin_lon = l.origin_lon
+                 AND d.destination_lat = l.destination_lat
+                 AND d.destination_lon = l.destination_lon
+                WHERE d.created_at >= ?
+                """,
+                (provider, mode, self._min_created_at()),
+            ).fetchall()
+            conn.execute("DELETE FROM lookup")
+            conn.commit()
+
+            for i, duration, distance in rows:
+                found[i] = True
+                durations[i] = np.nan if duration is None else duration
+                distances[i] = np.nan if distance is None else distance
+            hits = int(found.sum())
+            self.hits += hits
+            self.misses += n - hits
+
+        return found, durations, distances
+
+    def set_distances(self, provider, mode, pairs, durations, distances):
+        """
+        Store durations and distances for origin-destination pairs.
+        """
+        keys = self._keys(pairs)
+        now = time.time()
+        records = [
+            (
+                provider,
+                mode,
+                *map(float, key),
+                None if duration is None or duration != duration else float(duration),
+                None if distance is None or distance != distance else float(distance),
+                now,
+            )
+            for key, duration, distance in zip(keys, durations, distances)
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO distances VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                records,
+            )
+            self._evict("distances", len(records))
+
+    def get_route(self, provider, mode, origin, destination):
+        """Return the cached raw route response between two points, or None."""
+        key = self._keys([list(origin) + list(destination)])[0]
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT route FROM routes
+                WHERE provider = ? AND mode = ?
+                  AND origin_lat = ? AND origin_lon = ?
+                  AND destination_lat = ? AND destination_lon = ?
+                  AND created_at >= ?
+                """,
+                (provider, mode, *map(float, key), self._min_created_at()),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set_route(self, provider, mode, origin, destination, route):
+        """Store the raw (JSON serializable) route response between two points."""
+        key = self._keys([list(origin) + list(destination)])[0]
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO routes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (provider, mode, *map(float, key), json.dumps(route), time.time()),
+            )
+            self._evict("routes", 1)
+
+    def _evict(self, table, added):
+        """
+        Drop expired entries and, above `max_entries`, the oldest ones.
+
+        The rows are not counted on every insert: the count is kept as an upper
+        bound, raised by the `added` rows (a replaced row counts as added), and
+        only when it exceeds `max_entries` are the rows counted again.
+        """
+        if self.ttl is not None:
+            self._conn.execute(
+                "DELETE FROM %s WHERE created_at < ?" % table, (self._min_created_at(),)
+            )
+        if self.max_entries is None:
+            return
+        count = self._counts.get(table)
+        if count is not None:
+            count += added
+        if count is None or count > self.max_entries:
+            count = self._conn.execute("SELECT COUNT(*) FROM %s" % table).fetchone()[0]
+            if count > self.max_entries:
+                keep = self.max_entries - self.max_entries // 10
+                self._conn.execute(
+                    "DELETE FROM %s WHERE rowid IN "
+                    "(SELECT rowid FROM %s ORDER BY created_at LIMIT ?)" % (table, table),
+                    (count - keep,),
+                )
+                count = keep
+        self._counts[table] = count
+
+    def stats(self):
+        """Return hit/miss counters and the number of stored entries."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM distances").fetchone()[0]
+            routes = self._conn.execute("SELECT COUNT(*) FROM routes").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "routes": routes,
+        }
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM distances")
+            self._conn.execute("DELETE FROM routes")
+            self._counts.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class MemoryCache:
+    """
+    In-process least-recently-used cache of routing results.
+
+    Matrix cells and raw route responses are kept in one LRU order, keyed by
+    provider, mode and rounded coordinates. Nothing is copied or serialized, so a
+    hit returns the very object that was stored.
+
+    Parameters
+    ----------
+    - `max_entries` : int
+        Maximum number of entries (matrix cells plus routes). None means no limit.
+    - `max_bytes` : int
+        Maximum approximate size of the cached data in bytes. None means no limit.
+    - `key_precision` : int
+        Number of decimals the coordinates are rounded to when building keys.
+    """
+
+    # approximate memory taken by a matrix cell: key tuple, two floats, dict slot
+    cell_bytes = 200
+
+    def __init__(
+        self,
+        max_entries=100_000,
+        max_bytes=64 * 1024**2,
+        key_precision=DEFAULT_KEY_PRECISION,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.key_precision = key_precision
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "MemoryCache(max_entries=%r, max_bytes=%r)" % (
+            self.max_entries,
+            self.max_bytes,
+        )
+
+    def __len__(self):
+        return len(self._data)
+
+    def _keys(self, kind, provider, mode, pairs):
+        pairs = np.round(np.asarray(pairs, dtype=float).reshape(-1, 4), self.key_precision)
+        return [(kind, provider, mode, *key) for key in pairs.tolist()]
+
+    def _get(self, key):
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[0]
+
+    def _set(self, key, value, nbytes):
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.nbytes -= old[1]
+        self._data[key] = (value, nbytes)
+        self.nbytes += nbytes
+        while self._data and (
+            (self.max_entries is not None and len(self._data) > self.max_entries)
+            or (self.max_bytes is not None and self.nbytes > self.max_bytes)
+        ):
+            _, (_, size) = self._data.popitem(last=False)
+            self.nbytes -= size
+            self.evictions += 1
+
+    def get_distances(self, provider, mode, pairs):
+        """
+        Look up origin-destination pairs, see `SQLiteCache.get_distances`.
+        """
+        keys = self._keys("cell", provider, mode, pairs)
+        found = np.zeros(len(keys), dtype=bool)
+        durations = np.full(len(keys), np.nan)
+        distances = np.full(len(keys), np.nan)
+        with self._lock:
+            for i, key in enumerate(keys):
+                cell = self._get(key)
+                if cell is not None:
+                    found[i] = True
+                    durations[i], distances[i] = cell
+        return found, durations, distances
+
+    def set_distances(self, provider, mode, pairs, durations, distances):
+        """
+        Store durations and distances for origin-destination pairs.
+        """
+        keys = self._keys("cell", provider, mode, pairs)
+        with self._lock:
+            for key, duration, distance in zip(keys, durations, distances):
+                cell = (
+                    np.nan if duration is None else float(duration),
+                    np.nan if distance is None else float(distance),
+                )
+                self._set(key, cell, self.cell_bytes)
+
+    def get_route(self, provider, mode, origin, destination):
+        """Return the cached raw route response between two points, or None."""
+        (key,) = self._keys("route", provider, mode, [list(origin) + list(destination)])
+        with self._lock:
+            return self._get(key)
+
+    def set_route(self, provider, mode, origin, destination, route):
+        """Store the raw route response between two points."""
+        (key,) = self._keys("route", provider, mode, [list(origin) + list(destination)])
+        try:
+            nbytes = len(json.dumps(route))
+        except (TypeError, ValueError):
+            nbytes = sys.getsizeof(route)
+        with self._lock:
+            self._set(key, route, nbytes)
+
+    def stats(self):
+        """Return hit/miss counters, the number of entries and their approximate size."""
+        with self._lock:
+            routes = sum(1 for key in self._data if key[0] == "route")
+            entries = len(self._data) - routes
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "routes": routes,
+                "evictions": self.evictions,
+                "bytes": self.nbytes,
+            }
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def close(self):
+        pass
+
+
+def make_cache(cache):
+    """
+    Turn the `cache` option of a router into a cache object: None disables
+    caching, "memory" creates a `MemoryCache`, a path opens a `SQLiteCache`
+    there, and cache objects are used as is.
+    """
+    if cache is None or cache is False:
+        return None
+    if cache == "memory":
+        return MemoryCache()
+    if isinstance(cache, (str, Path)):
+        return SQLiteCache(cache)
+    return cache
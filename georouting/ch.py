@@ -0,0 +1,489 @@
+"""
+Contraction hierarchies for local routing.
+
+`ContractionHierarchy` preprocesses a `CSRGraph` once: nodes are contracted one by
+one, least important first, adding shortcut edges that keep the travel times
+between the remaining nodes. A query then only searches upwards in the hierarchy
+from both ends, settling a few hundred nodes instead of a large part of the
+network. The index is saved to and loaded from a `.npz` file, so the
+preprocessing is paid once per graph.
+
+Every edge of the hierarchy carries the travel time and the length of the road
+path it stands for, so distances come out of the queries without unpacking the
+shortcuts; routes are unpacked through the `middle` node of each shortcut.
+
+Distance matrices and batches search upwards once from every unique source and
+target, keeping only the few hundred nodes each search settles, and join the
+search spaces of the sources and targets with NumPy.
+
+The preprocessing runs its witness searches in pure Python: it takes over ten
+minutes for a network of 90,000 nodes and grows faster than linearly, so the
+hierarchy suits city to metropolitan networks. State-scale networks are better
+served by the scipy engine, see `georouting.graph.CSRGraph`.
+"""
+
+import heapq
+import time
+from pathlib import Path
+
+import numpy as np
+
+from georouting.graph import _source_chunks
+
+# witness searches stop after settling this many nodes; a stopped search only
+# means that a (possibly unneeded) shortcut is added
+DEFAULT_WITNESS_LIMIT = 200
+
+# number of sources whose search spaces are joined with the buckets at once
+SEARCH_CHUNK = 64
+
+
+def _to_csr(num_nodes, edges):
+    """
+    Pack per-node edge dicts {node: {other: (time, length, middle)}} into CSR arrays.
+    """
+    counts = np.array([len(edges[n]) for n in range(num_nodes)], dtype=np.int64)
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    items = [(other, *edge) for n in range(num_nodes) for other, edge in edges[n].items()]
+    if not items:
+        items = np.zeros((0, 4))
+    items = np.array(items, dtype=np.float64).reshape(-1, 4)
+    return (
+        indptr,
+        items[:, 0].astype(np.int32),
+        items[:, 1],
+        items[:, 2],
+        items[:, 3].astype(np.int32),
+    )
+
+
+def _concat_ranges(starts, counts):
+    """The concatenation of the ranges [start, start + count) as one index array."""
+    offsets = np.cumsum(counts) - counts
+    return np.arange(counts.sum()) - np.repeat(offsets - starts, counts)
+
+
+class ContractionHierarchy:
+    """
+    A contraction hierarchy over the nodes of a `CSRGraph` (by node index).
+
+    Build it with `ContractionHierarchy.build(graph)`, save it with `save(path)` and
+    load it with `ContractionHierarchy.load(path)`.
+
+    Parameters
+    ----------
+    - `nodes` : array of int
+        The node ids of the graph.
+
+    - `rank` : array of int
+        The contraction order of each node.
+
+    - `forward`, `backward` : tuples of arrays
+        The upward edges of each node in CSR form, (indptr, indices, travel_time,
+        length, middle), `middle` being -1 for road edges. `forward` holds the
+        edges leaving a node, `backward` the edges entering it, both towards nodes
+        of higher rank.
+
+    - `fingerprint` : str
+        The `CSRGraph.fingerprint` of the graph, used to check that an index
+        matches a graph.
+    """
+
+    def __init__(self, nodes, rank, forward, backward, fingerprint=None):
+        self.nodes = np.asarray(nodes, dtype=np.int64)
+        self.fingerprint = fingerprint
+        self.rank = np.asarray(rank, dtype=np.int32)
+        self.forward = tuple(np.asarray(a) for a in forward)
+        self.backward = tuple(np.asarray(a) for a in backward)
+        # plain lists are much faster than arrays in the Python search loops
+        self._forward = [a.tolist() for a in self.forward]
+        self._backward = [a.tolist() for a in self.backward]
+
+    def __repr__(self):
+        return "ContractionHierarchy(%d nodes, %d upward edges)" % (
+            len(self.nodes),
+            len(self.forward[1]) + len(self.backward[1]),
+        )
+
+    # ------------- preprocessing -------------
+
+    @classmethod
+    def build(cls, graph, witness_limit=DEFAULT_WITNESS_LIMIT, verbose=False):
+        """
+        Contract the nodes of a `CSRGraph` with travel time weights.
+
+        Nodes are contracted in the order of their edge difference (shortcuts added
+        minus edges removed, plus the number of contracted neighbors), updated lazily.
+        This is slow on large networks: over ten minutes for 90,000 nodes.
+        """
+        start = time.perf_counter()
+        n = len(graph.nodes)
+        out_edges = [dict() for _ in range(n)]
+        in_edges = [dict() for _ in range(n)]
+        tails = np.repeat(np.arange(n), np.diff(graph.indptr)).tolist()
+        for u, v, t, l in zip(
+            tails,
+            graph.indices.tolist(),
+            graph.travel_time.astype(np.float64).tolist(),
+            graph.length.astype(np.float64).tolist(),
+        ):
+            if u != v:
+                out_edges[u][v] = in_edges[v][u] = (t, l, -1)
+
+        inf = float("inf")
+        heappush, heappop = heapq.heappush, heapq.heappop
+
+        def witness_search(source, skip, limit, targets, max_settled):
+            # travel times from source to the targets avoiding `skip`, up to `limit`
+            dist = {source: 0.0}
+            heap = [(0.0, source)]
+            settled = 0
+            remaining = len(targets)
+            while heap and settled < max_settled and remaining:
+                d, x = heappop(heap)
+                if d > dist[x]:
+                    continue
+                if d > limit:
+                    break
+                settled += 1
+                if x in targets:
+                    remaining -= 1
+                for y, edge in out_edges[x].items():
+                    if y != skip and d + edge[0] < dist.get(y, inf):
+                        dist[y] = d + edge[0]
+                        heappush(heap, (d + edge[0], y))
+            return dist
+
+        def shortcuts(v, max_settled=witness_limit):
+            found = []
+            if not out_edges[v] or not in_edges[v]:
+                return found
+            max_out = max(edge[0] for edge in out_edges[v].values())
+            targets = set(out_edges[v])
+            for u, (t_uv, l_uv, _) in in_edges[v].items():
+                dist = witness_search(u, v, t_uv + max_out, targets - {u}, max_settled)
+                for w, (t_vw, l_vw, _) in out_edges[v].items():
+                    if w != u and dist.get(w, inf) > t_uv + t_vw:
+                        found.append((u, w, t_uv + t_vw, l_uv + l_vw))
+            return found
+
+        deleted = np.zeros(n, dtype=np.int64)
+        contracted = np.zeros(n, dtype=bool)
+        prio = np.zeros(n, dtype=np.int64)
+
+        def update(v, max_settled=witness_limit):
+            found = shortcuts(v, max_settled)
+            prio[v] = len(found) - len(in_edges[v]) - len(out_edges[v]) + deleted[v]
+            heappush(heap, (prio[v], v))
+            return found
+
+        # priorities are estimated with short witness searches; the shortcuts of a
+        # node are only computed exactly right before contracting it
+        estimate = max(witness_limit // 10, 1)
+        heap = []
+        for v in range(n):
+            update(v, estimate)
+        rank = np.zeros(n, dtype=np.int32)
+        forward = [None] * n
+        backward = [None] * n
+        order = 0
+        while heap:
+            queued, v = heapq.heappop(heap)
+            if contracted[v] or queued != prio[v]:
+                continue
+            # lazy update: contract v only if it is still the least important node
+            found = update(v)
+            while heap and (contracted[heap[0][1]] or heap[0][0] != prio[heap[0][1]]):
+                heapq.heappop(heap)
+            if heap and prio[v] > heap[0][0]:
+                continue
+
+            for u, w, t, l in found:
+                if t < out_edges[u].get(w, (np.inf,))[0]:
+                    out_edges[u][w] = in_edges[w][u] = (t, l, v)
+            forward[v] = out_edges[v]
+            backward[v] = in_edges[v]
+            neighbors = set(in_edges[v]) | set(out_edges[v])
+            for u in in_edges[v]:
+                del out_edges[u][v]
+            for w in out_edges[v]:
+                del in_edges[w][v]
+            out_edges[v] = {}
+            in_edges[v] = {}
+            contracted[v] = True
+            rank[v] = order
+            order += 1
+            # the priorities of the neighbors change with the removed edges
+            for x in neighbors:
+                deleted[x] += 1
+                update(x, estimate)
+            if verbose and order % 10000 == 0:
+                print("[ch] contracted %d/%d nodes" % (order, n))
+
+        ch = cls(
+            graph.nodes,
+            rank,
+            _to_csr(n, forward),
+            _to_csr(n, backward),
+            graph.fingerprint(),
+        )
+        if verbose:
+            print("[ch] %r built in %.1f s" % (ch, time.perf_counter() - start))
+        return ch
+
+    def save(self, path):
+        """Save the index to a `.npz` file."""
+        names = ("indptr", "indices", "travel_time", "length", "middle")
+        arrays = {"nodes": self.nodes, "rank": self.rank}
+        if self.fingerprint is not None:
+            arrays["fingerprint"] = np.array(self.fingerprint)
+        for prefix, csr in (("forward", self.forward), ("backward", self.backward)):
+            arrays.update({"%s_%s" % (prefix, name): a for name, a in zip(names, csr)})
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index saved with `save`."""
+        names = ("indptr", "indices", "travel_time", "length", "middle")
+        with np.load(Path(path)) as data:
+            return cls(
+                data["nodes"],
+                data["rank"],
+                [data["forward_%s" % name] for name in names],
+                [data["backward_%s" % name] for name in names],
+                str(data["fingerprint"]) if "fingerprint" in data else None,
+            )
+
+    # ------------- queries -------------
+
+    def _upward_search(self, node, backward=False):
+        """
+        Search upwards from a node (towards it if `backward`); returns
+        {node: (travel_time, length, parent)} for the settled nodes.
+        """
+        indptr, indices, times, lengths, _ = self._backward if backward else self._forward
+        best = {node: 0.0}
+        settled = {}
+        heap = [(0.0, 0.0, node, -1)]
+        while heap:
+            t, l, x, parent = heapq.heappop(heap)
+            if x in settled:
+                continue
+            settled[x] = (t, l, parent)
+            for k in range(indptr[x], indptr[x + 1]):
+                y = indices[k]
+                if y not in settled and t + times[k] < best.get(y, np.inf):
+                    best[y] = t + times[k]
+                    heapq.heappush(heap, (t + times[k], l + lengths[k], y, x))
+        return settled
+
+    def _edge(self, u, v):
+        """The (middle) of the hierarchy edge u->v."""
+        if self.rank[u] < self.rank[v]:
+            indptr, indices, _, _, middle = self._forward
+            a, b = u, v
+        else:
+            indptr, indices, _, _, middle = self._backward
+            a, b = v, u
+        for k in range(indptr[a], indptr[a + 1]):
+            if indices[k] == b:
+                return middle[k]
+        raise KeyError((u, v))
+
+    def _unpack(self, u, v):
+        """The road nodes of the hierarchy edge u->v, without u."""
+        stack, path = [(u, v)], []
+        while stack:
+            a, b = stack.pop()
+            middle = self._edge(a, b)
+            if middle < 0:
+                path.append(b)
+            else:
+                stack.append((middle, b))
+                stack.append((a, middle))
+        return path
+
+    def route(self, source, target):
+        """
+        Return the fastest route between two node indices as a list of node
+        indices, or None if there is no route.
+        """
+        forward = self._upward_search(source)
+        backward = self._upward_search(target, backward=True)
+        meet, best = None, np.inf
+        for x, (t, _, _) in forward.items():
+            if x in backward and t + backward[x][0] < best:
+                meet, best = x, t + backward[x][0]
+        if meet is None:
+            return None
+
+        up = [meet]
+        while forward[up[-1]][2] >= 0:
+            up.append(forward[up[-1]][2])
+        up = up[::-1]
+        down = [meet]
+        while backward[down[-1]][2] >= 0:
+            down.append(backward[down[-1]][2])
+
+        path = [source]
+        for a, b in zip(up[:-1], up[1:]):
+            path += self._unpack(a, b)
+        for a, b in zip(down[:-1], down[1:]):
+            path += self._unpack(a, b)
+        return path
+
+    def _search_space(self, node, backward=False):
+        """
+        Search upwards from a node (towards it if `backward`) with stall-on-demand;
+        returns the settled nodes with their travel times and lengths, as lists.
+
+        A node reached more slowly than through one of its higher neighbors
+        already in the search is stalled: it is not on a fastest path, so it is
+        left out and its edges are not relaxed.
+        """
+        indptr, indices, times, lengths, _ = self._backward if backward else self._forward
+        down_ptr, down_indices, down_times, _, _ = self._forward if backward else self._backward
+        best = {node: 0.0}
+        nodes, space_times, space_lengths = [], [], []
+        settled = set()
+        heappop, heappush = heapq.heappop, heapq.heappush
+        heap = [(0.0, 0.0, node)]
+        while heap:
+            t, l, x = heappop(heap)
+            if x in settled:
+                continue
+            settled.add(x)
+            stalled = False
+            for k in range(down_ptr[x], down_ptr[x + 1]):
+                y = down_indices[k]
+                if y in best and best[y] + down_times[k] < t:
+                    stalled = True
+                    break
+            if stalled:
+                continue
+            nodes.append(x)
+            space_times.append(t)
+            space_lengths.append(l)
+            for k in range(indptr[x], indptr[x + 1]):
+                y = indices[k]
+                if t + times[k] < best.get(y, np.inf):
+                    best[y] = t + times[k]
+                    heappush(heap, (t + times[k], l + lengths[k], y))
+        return nodes, space_times, space_lengths
+
+    def _search_spaces(self, nodes, backward=False):
+        """
+        The search spaces of the `nodes` (see `_search_space`) as (row, node) entries
+        in row order with their travel times and lengths.
+        """
+        counts, cols, times, lengths = [], [], [], []
+        for node in np.asarray(nodes).tolist():
+            space = self._search_space(node, backward)
+            counts.append(len(space[0]))
+            cols += space[0]
+            times += space[1]
+            lengths += space[2]
+        return (
+            np.repeat(np.arange(len(counts)), counts),
+            np.array(cols, dtype=np.int64),
+            np.array(times, dtype=np.float64),
+            np.array(lengths, dtype=np.float64),
+        )
+
+    def _buckets(self, targets):
+        """
+        The backward search spaces of the `targets` as entries grouped by target:
+        the target (position in `targets`), node, travel time and length of each.
+        """
+        return self._search_spaces(targets, backward=True)
+
+    def many_to_many(self, sources, targets):
+        """
+        Return the travel times and lengths between all sources and targets (node
+        indices) as two (len(sources), len(targets)) arrays, NaN where there is no route.
+
+        The backward search spaces of the targets are stored in buckets by node;
+        the forward searches of the sources then run in chunks, and the buckets of
+        the nodes they settle are scanned for the whole chunk at once.
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        bucket_targets, bucket_nodes, bucket_times, bucket_lengths = self._buckets(targets)
+        order = np.argsort(bucket_nodes, kind="stable")
+        bucket_targets = bucket_targets[order]
+        bucket_times = bucket_times[order]
+        bucket_lengths = bucket_lengths[order]
+        bucket_ptr = np.searchsorted(bucket_nodes[order], np.arange(len(self.nodes) + 1))
+
+        durations = np.full((len(sources), len(targets)), np.inf)
+        distances = np.full((len(sources), len(targets)), np.inf)
+        for start in range(0, len(sources), SEARCH_CHUNK):
+            rows, nodes, times, lengths = self._search_spaces(
+                sources[start : start + SEARCH_CHUNK]
+            )
+            counts = bucket_ptr[nodes + 1] - bucket_ptr[nodes]
+            index = _concat_ranges(bucket_ptr[nodes], counts)
+            pair = (np.repeat(rows + start, counts), bucket_targets[index])
+            total = np.repeat(times, counts) + bucket_times[index]
+            np.minimum.at(durations, pair, total)
+            # the length of the fastest meeting node (the shortest of ties)
+            fastest = total == durations[pair]
+            np.minimum.at(
+                distances,
+                (pair[0][fastest], pair[1][fastest]),
+                (np.repeat(lengths, counts) + bucket_lengths[index])[fastest],
+            )
+        unreached = np.isinf(durations)
+        durations[unreached] = np.nan
+        distances[unreached] = np.nan
+        return durations, distances
+
+    def costs(self, sources, targets):
+        """
+        Return the travel time and length of the fastest route of each (source,
+        target) pair of node indices, as two float arrays, NaN where there is no route.
+        Each unique node is searched once.
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        unique_targets, target_codes = np.unique(targets, return_inverse=True)
+        bucket_targets, bucket_nodes, bucket_times, bucket_lengths = self._buckets(
+            unique_targets
+        )
+        starts = np.searchsorted(bucket_targets, np.arange(len(unique_targets)))
+        counts = np.diff(np.append(starts, len(bucket_nodes)))
+
+        durations = np.full(len(sources), np.nan)
+        distances = np.full(len(sources), np.nan)
+        n = len(self.nodes)
+        for chunk, pairs, chunk_rows in _source_chunks(sources, SEARCH_CHUNK):
+            rows, cols, times, lengths = self._search_spaces(chunk)
+            # the search space entries of the chunk, sorted by (row, node)
+            space_keys = rows * n + cols
+            order = np.argsort(space_keys)
+            space_keys = space_keys[order]
+            times, lengths = times[order], lengths[order]
+
+            # the bucket entries of the target of each pair, met by the source's search
+            pair_counts = counts[target_codes[pairs]]
+            entries = _concat_ranges(starts[target_codes[pairs]], pair_counts)
+            entry_keys = np.repeat(chunk_rows, pair_counts) * n + bucket_nodes[entries]
+            found = np.searchsorted(space_keys, entry_keys).clip(0, max(len(space_keys) - 1, 0))
+            met = space_keys[found] == entry_keys if len(space_keys) else np.zeros(0, bool)
+            total = np.where(met, times[found] + bucket_times[entries], np.inf)
+            pair_starts = np.cumsum(pair_counts) - pair_counts
+            # every target's bucket holds at least the target itself
+            best = np.minimum.reduceat(total, pair_starts)
+            total_lengths = np.where(
+                met & (total == np.repeat(best, pair_counts)),
+                lengths[found] + bucket_lengths[entries],
+                np.inf,
+            )
+            reached = np.isfinite(best)
+            durations[pairs] = np.where(reached, best, np.nan)
+            distances[pairs] = np.where(
+                reached, np.minimum.reduceat(total_lengths, pair_starts), np.nan
+            )
+        return durations, distances
@@ -0,0 +1,701 @@
+"""
+Compact road networks for local routing.
+
+`CSRGraph` holds an OSMnx road network as flat NumPy arrays: the sorted node ids
+and coordinates, and the edges in compressed sparse row (CSR) form with int32
+node indices and float32 `travel_time` and `length` weights. Shortest paths
+run on it with `scipy.sparse.csgraph`, without the per-node and per-edge Python
+dicts of a NetworkX graph.
+
+A graph is saved as a directory of `.npy` files (`CSRGraph.save`), which
+`CSRGraph.load` memory-maps: loading takes milliseconds whatever the size of the
+network, and processes loading the same files share their pages. A `graph.json`
+manifest is written last, so a directory without one (an interrupted save) is
+not a saved graph.
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import dijkstra
+
+from georouting.snapping import EARTH_RADIUS_M
+
+# number of sources searched at once; bounds the (sources x nodes) result arrays
+DEFAULT_SOURCE_CHUNK = 64
+# the memory the result arrays of one chunk of searches may take, in bytes: a
+# float64 travel time and an int32 predecessor per source and node
+SEARCH_MEMORY = 256 * 2**20
+SEARCH_BYTES_PER_NODE = 12
+
+# the arrays of a saved graph, one `<name>.npy` file each
+ARRAYS = ("nodes", "x", "y", "indptr", "indices", "travel_time", "length")
+GEOMETRY_ARRAYS = ("geometry_offsets", "geometry_x", "geometry_y")
+# the manifest of a saved graph: the saved arrays and the fingerprint of the graph
+MANIFEST = "graph.json"
+
+
+class CSRGraph:
+    """
+    A directed road network in CSR form.
+
+    Parallel edges are collapsed to the one with the least travel time, which is
+    the edge any fastest route uses.
+
+    Parameters
+    ----------
+    - `nodes` : array of int
+        The sorted node ids (OSM ids).
+
+    - `x`, `y` : arrays of float
+        The coordinates of the nodes in `crs`, longitude and latitude by default.
+
+    - `indptr`, `indices` : arrays of int
+        The CSR structure: the edges leaving node i go to `indices[indptr[i]:indptr[i + 1]]`,
+        sorted by target.
+
+    - `travel_time`, `length` : arrays of float
+        The travel time (s) and length (m) of the edges, in the order of `indices`.
+
+    - `geometry` : tuple of arrays, optional
+        The edge geometries as `(offsets, x, y)`: the points of edge i are
+        `x[offsets[i]:offsets[i + 1]]` and `y[offsets[i]:offsets[i + 1]]`.
+
+    - `crs` : str
+        The coordinate reference system of the coordinates.
+    """
+
+    def __init__(
+        self,
+        nodes,
+        x,
+        y,
+        indptr,
+        indices,
+        travel_time,
+        length,
+        geometry=None,
+        crs="epsg:4326",
+    ):
+        self.nodes = np.asarray(nodes, dtype=np.int64)
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.indptr = np.asarray(indptr)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.travel_time = np.asarray(travel_time, dtype=np.float32)
+        self.length = np.asarray(length, dtype=np.float32)
+        self.geometry = geometry
+        self.crs = crs
+        self._matrix = None
+        self._reversed = None
+        self._edge_keys = None
+        self._max_speed = None
+        self._lists = None
+        self._radians = None
+        self._fingerprint = None
+
+    def __repr__(self):
+        return "CSRGraph(%d nodes, %d edges, %.1f MB)" % (
+            len(self.nodes),
+            len(self.indices),
+            self.nbytes / 1e6,
+        )
+
+    @classmethod
+    def from_networkx(cls, G, weight="travel_time", geometry=True):
+        """
+        Convert an OSMnx (NetworkX) graph with `travel_time` and `length` edge attributes.
+
+        With `geometry`, the `geometry` of the edges is kept as well (a straight
+        line for edges without one).
+        """
+        nodes = np.array(sorted(G.nodes), dtype=np.int64)
+        x = np.array([G.nodes[n]["x"] for n in nodes.tolist()], dtype=np.float64)
+        y = np.array([G.nodes[n]["y"] for n in nodes.tolist()], dtype=np.float64)
+
+        edges = list(G.edges(data=True))
+        u = np.searchsorted(nodes, np.fromiter((e[0] for e in edges), np.int64, len(edges)))
+        v = np.searchsorted(nodes, np.fromiter((e[1] for e in edges), np.int64, len(edges)))
+        travel_time = np.fromiter((e[2][weight] for e in edges), np.float64, len(edges))
+        length = np.fromiter((e[2]["length"] for e in edges), np.float64, len(edges))
+        lines = None
+        if geometry:
+            lines = [
+                np.asarray(e[2]["geometry"].coords) if "geometry" in e[2] else None
+                for e in edges
+            ]
+        return cls.from_edges(
+            nodes, x, y, u, v, travel_time, length, lines, G.graph.get("crs", "epsg:4326")
+        )
+
+    @classmethod
+    def from_edges(
+        cls, nodes, x, y, u, v, travel_time, length, lines=None, crs="epsg:4326"
+    ):
+        """
+        Build the graph from edge arrays (`u` and `v` are indices into `nodes`).
+
+        `lines` optionally holds the (n, 2) array of (x, y) points of each edge, or
+        None for a straight edge.
+        """
+        # sort by source, target and travel time, then keep the fastest parallel edge
+        order = np.lexsort((travel_time, v, u))
+        u, v = u[order], v[order]
+        first = np.ones(len(u), dtype=bool)
+        first[1:] = (u[1:] != u[:-1]) | (v[1:] != v[:-1])
+        order, u, v = order[first], u[first], v[first]
+
+        indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(u, minlength=len(nodes)), out=indptr[1:])
+        geometry = None
+        if lines is not None:
+            geometry = cls._pack_lines(
+                [lines[i] for i in order.tolist()], np.column_stack([x, y]), u, v
+            )
+        return cls(
+            nodes, x, y, indptr, v, travel_time[order], length[order], geometry, crs
+        )
+
+    @staticmethod
+    def _pack_lines(lines, points, u, v):
+        """
+        Concatenate the edge lines into the `(offsets, x, y)` geometry arrays.
+        """
+        lines = [
+            points[[a, b]] if line is None else line
+            for line, a, b in zip(lines, u.tolist(), v.tolist())
+        ]
+        offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+        np.cumsum([len(line) for line in lines], out=offsets[1:])
+        coords = np.concatenate(lines) if lines else np.empty((0, 2))
+        return offsets, coords[:, 0].copy(), coords[:, 1].copy()
+
+    @staticmethod
+    def is_saved(path):
+        """Whether `path` holds a completely saved graph."""
+        return path is not None and os.path.exists(os.path.join(path, MANIFEST))
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        """
+        Load a graph saved with `save`, memory-mapping its arrays (`mmap_mode=None`
+        reads them into memory instead).
+        """
+        if not cls.is_saved(path):
+            raise FileNotFoundError("No saved road network in %s" % path)
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(path, name + ".npy"), mmap_mode=mmap_mode)
+            for name in manifest["arrays"]
+        }
+        geometry = None
+        if GEOMETRY_ARRAYS[0] in arrays:
+            geometry = tuple(arrays.pop(name) for name in GEOMETRY_ARRAYS)
+        graph = cls(**arrays, geometry=geometry, crs=manifest.get("crs", "epsg:4326"))
+        graph._fingerprint = manifest["fingerprint"]
+        return graph
+
+    def save(self, path):
+        """
+        Save the arrays of the graph as `.npy` files in the directory `path`, and
+        then the manifest.
+
+        Every file is written to a temporary file and renamed into place, so
+        processes saving the same graph at once, or loading it meanwhile, never see
+        a partial file, and the graph only counts as saved once all are there.
+        """
+        os.makedirs(path, exist_ok=True)
+        names = ARRAYS + (GEOMETRY_ARRAYS if self.geometry is not None else ())
+        arrays = [getattr(self, name) for name in ARRAYS]
+        if self.geometry is not None:
+            arrays += list(self.geometry)
+        for name, array in zip(names, arrays):
+            self._write_file(
+                path, name + ".npy", lambda f: np.save(f, np.ascontiguousarray(array))
+            )
+        manifest = {
+            "arrays": list(names),
+            "fingerprint": self.fingerprint(),
+            "crs": str(self.crs),
+        }
+        self._write_file(path, MANIFEST, lambda f: f.write(json.dumps(manifest).encode()))
+
+    @staticmethod
+    def _write_file(path, name, write):
+        with tempfile.NamedTemporaryFile(dir=path, suffix=".tmp", delete=False) as f:
+            write(f)
+        os.replace(f.name, os.path.join(path, name))
+
+    def fingerprint(self):
+        """
+        A hash of the node ids, edges and travel times of the graph, to tell whether
+        data derived from it (e.g. a contraction hierarchy) is still valid.
+        """
+        if self._fingerprint is None:
+            digest = hashlib.sha1()
+            for array in (self.nodes, self.indptr, self.indices, self.travel_time):
+                digest.update(np.ascontiguousarray(array).data)
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def to_networkx(self):
+        """
+        Convert the graph back to an OSMnx-style `networkx.MultiDiGraph`, with `x`,
+        `y` node attributes and `travel_time`, `length` (and `geometry`) edge
+        attributes.
+        """
+        G = nx.MultiDiGraph(crs=self.crs)
+        G.add_nodes_from(
+            (n, {"x": a, "y": b})
+            for n, a, b in zip(self.nodes.tolist(), self.x.tolist(), self.y.tolist())
+        )
+        tail = np.repeat(np.arange(len(self.nodes)), np.diff(self.indptr))
+        attrs = [
+            {"travel_time": t, "length": l}
+            for t, l in zip(self.travel_time.tolist(), self.length.tolist())
+        ]
+        if self.geometry is not None:
+            from shapely import linestrings
+
+            offsets, gx, gy = self.geometry
+            lines = linestrings(
+                np.column_stack([gx, gy]),
+                indices=np.repeat(np.arange(len(attrs)), np.diff(offsets)),
+            )
+            for attr, line in zip(attrs, lines):
+                attr["geometry"] = line
+        G.add_edges_from(
+            zip(
+                self.nodes[tail].tolist(),
+                self.nodes[self.indices].tolist(),
+                attrs,
+            )
+        )
+        return G
+
+    @property
+    def projected(self):
+        """Whether the coordinates are projected (in meters) rather than lon/lat."""
+        from osmnx.projection import is_projected
+
+        return is_projected(self.crs)
+
+    @property
+    def nbytes(self):
+        """The memory held by the arrays of the graph, in bytes."""
+        arrays = [getattr(self, name) for name in ARRAYS]
+        if self.geometry is not None:
+            arrays += list(self.geometry)
+        return sum(a.nbytes for a in arrays)
+
+    def node_index(self, node_ids):
+        """
+        Return the indices of the given node ids; raises a KeyError for unknown ids.
+        """
+        node_ids = np.asarray(node_ids, dtype=np.int64)
+        index = np.searchsorted(self.nodes, node_ids).clip(0, len(self.nodes) - 1)
+        if not (self.nodes[index] == node_ids).all():
+            raise KeyError("Unknown node ids: %s" % node_ids[self.nodes[index] != node_ids][:5])
+        return index
+
+    def matrix(self):
+        """
+        The travel time adjacency matrix used by the searches (built once, float64).
+        """
+        if self._matrix is None:
+            n = len(self.nodes)
+            self._matrix = sp.csr_matrix(
+                (self.travel_time.astype(np.float64), self.indices, self.indptr),
+                shape=(n, n),
+            )
+        return self._matrix
+
+    def reversed(self):
+        """
+        The graph with every edge reversed, for searches towards a target (built once).
+        """
+        if self._reversed is None:
+            tail = np.repeat(
+                np.arange(len(self.nodes), dtype=np.int32), np.diff(self.indptr)
+            )
+            self._reversed = CSRGraph.from_edges(
+                self.nodes,
+                self.x,
+                self.y,
+                self.indices,
+                tail,
+                self.travel_time,
+                self.length,
+                crs=self.crs,
+            )
+            self._reversed._reversed = self
+        return self._reversed
+
+    def edge_index(self, u, v):
+        """
+        Return the positions of the u->v edges (node indices) in the edge arrays.
+        """
+        if self._edge_keys is None:
+            # within a row the targets are sorted, so the u * n + v keys are sorted
+            tail = np.repeat(
+                np.arange(len(self.nodes), dtype=np.int64), np.diff(self.indptr)
+            )
+            self._edge_keys = tail * len(self.nodes) + self.indices
+        return np.searchsorted(
+            self._edge_keys, np.asarray(u, np.int64) * len(self.nodes) + v
+        )
+
+    def find_edges(self, u, v):
+        """
+        Like `edge_index`, with -1 for the (u, v) pairs that are not edges.
+        """
+        position = self.edge_index(u, v).clip(0, max(len(self.indices) - 1, 0))
+        keys = np.asarray(u, np.int64) * len(self.nodes) + v
+        found = self._edge_keys[position] == keys if len(self.indices) else False
+        return np.where(found, position, -1)
+
+    def _search(self, sources):
+        """
+        Single-source searches from the `sources` node indices: returns the travel
+        times and predecessors, (len(sources), n_nodes) arrays.
+        """
+        return dijkstra(
+            self.matrix(), directed=True, indices=sources, return_predecessors=True
+        )
+
+    def _walk_lengths(self, pred, rows, targets):
+        """
+        Sum the edge lengths along the search trees `pred[rows]`, from each target up
+        to its source, all pairs at once.
+        """
+        lengths = np.zeros(len(targets))
+        current = np.asarray(targets, dtype=np.int64)
+        active = np.flatnonzero(pred[rows, current] >= 0)
+        while active.size:
+            parent = pred[rows[active], current[active]]
+            lengths[active] += self.length[self.edge_index(parent, current[active])]
+            current[active] = parent
+            active = active[pred[rows[active], parent] >= 0]
+        return lengths
+
+    def costs(self, sources, targets, chunk_size=DEFAULT_SOURCE_CHUNK):
+        """
+        Return the travel time and length of the fastest route of each (source,
+        target) pair of node indices, as two float arrays, NaN where there is no route.
+
+        One search is run per unique source, `chunk_size` sources at a time, fewer
+        on large graphs (see `search_chunk_size`).
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        durations = np.full(len(sources), np.nan)
+        distances = np.full(len(sources), np.nan)
+
+        chunk_size = search_chunk_size(len(self.nodes), chunk_size)
+        for chunk, pairs, rows in _source_chunks(sources, chunk_size):
+            durations[pairs], distances[pairs] = self._chunk_costs(
+                chunk, rows, targets[pairs]
+            )
+        return durations, distances
+
+    def _chunk_costs(self, chunk, rows, targets):
+        """
+        The travel times and lengths from `chunk[rows]` to `targets`, with one search
+        per source of the chunk.
+        """
+        times, pred = self._search(chunk)
+        durations = times[rows, targets]
+        distances = np.full(len(rows), np.nan)
+        reached = np.isfinite(durations)
+        distances[reached] = self._walk_lengths(pred, rows[reached], targets[reached])
+        durations[~reached] = np.nan
+        return durations, distances
+
+    def route(self, source, target):
+        """
+        Return the fastest route between two node indices as a list of node
+        indices, or None if there is no route.
+        """
+        times, pred = self._search([source])
+        if not np.isfinite(times[0, target]):
+            return None
+        path = [target]
+        while path[-1] != source:
+            path.append(pred[0, path[-1]])
+        return path[::-1]
+
+    def max_speed(self):
+        """
+        The highest great-circle speed over an edge (m/s): no route is faster
+        than this as the crow flies, which makes `great_circle_heuristic` admissible.
+        """
+        if self._max_speed is None:
+            tail = np.repeat(np.arange(len(self.nodes)), np.diff(self.indptr))
+            distance = great_circle(
+                self.x[tail], self.y[tail], self.x[self.indices], self.y[self.indices]
+            )
+            speed = distance / np.maximum(self.travel_time, 1e-6)
+            self._max_speed = float(speed.max()) if len(speed) else 1.0
+        return self._max_speed
+
+    def great_circle_heuristic(self, target):
+        """
+        A lower bound of the travel time to the `target` node index: the
+        great-circle distance at `max_speed`. Returns a function of a node index,
+        evaluated by `astar` only for the nodes it reaches.
+        """
+        if self._radians is None:
+            lat = np.radians(self.y)
+            self._radians = (np.radians(self.x).tolist(), lat.tolist(), np.cos(lat).tolist())
+        lon, lat, cos_lat = self._radians
+        t_lon, t_lat, t_cos = lon[target], lat[target], cos_lat[target]
+        scale = 2 * EARTH_RADIUS_M / self.max_speed()
+        sin, asin, sqrt = math.sin, math.asin, math.sqrt
+
+        def heuristic(node):
+            a = (
+                sin((lat[node] - t_lat) / 2) ** 2
+                + cos_lat[node] * t_cos * sin((lon[node] - t_lon) / 2) ** 2
+            )
+            return scale * asin(sqrt(min(a, 1.0)))
+
+        return heuristic
+
+    def landmarks(self, count=16, seed=0):
+        """
+        Choose `count` landmark nodes far apart from each other, for the ALT
+        heuristic (`landmark_heuristic`).
+
+        The first landmark is random; each next one is the reachable node farthest
+        from those chosen so far.
+
+        Returns
+        -------
+        - `nodes` : array of int
+            The landmark node indices.
+        - `from_landmarks`, `to_landmarks` : float32 arrays
+            The travel times from the landmarks to every node and from every node to
+            the landmarks, as (n_nodes, count) arrays.
+        - `slack` : float
+            A bound of the float32 rounding error of a difference of two travel
+            times, subtracted from the bounds to keep them admissible.
+        """
+        count = min(count, len(self.nodes))
+        rng = np.random.default_rng(seed)
+        chosen = [int(rng.integers(len(self.nodes)))]
+        while len(chosen) < count:
+            times = dijkstra(self.matrix(), indices=chosen, min_only=True)
+            times[~np.isfinite(times)] = -1
+            times[chosen] = -1
+            chosen.append(int(times.argmax()))
+        chosen = np.array(chosen)
+        from_landmarks = dijkstra(self.matrix(), indices=chosen)
+        to_landmarks = dijkstra(self.reversed().matrix(), indices=chosen)
+        finite = np.concatenate(
+            [from_landmarks[np.isfinite(from_landmarks)], to_landmarks[np.isfinite(to_landmarks)]]
+        )
+        slack = 1e-6 * float(finite.max()) if finite.size else 0.0
+        return (
+            chosen,
+            np.ascontiguousarray(from_landmarks.T, dtype=np.float32),
+            np.ascontiguousarray(to_landmarks.T, dtype=np.float32),
+            slack,
+        )
+
+    @staticmethod
+    def landmark_heuristic(landmarks, target, source=None, active=8):
+        """
+        The ALT lower bound of the travel time to the `target` node index, from the
+        `landmarks` of `CSRGraph.landmarks`: by the triangle inequality,
+        d(v, t) >= d(l, t) - d(l, v) and d(v, t) >= d(v, l) - d(t, l). Returns a
+        function of a node index, as `great_circle_heuristic`.
+
+        With a `source`, only the `active` landmarks giving the best bounds from
+        the source are used, which makes every evaluation cheaper.
+        """
+        _, from_landmarks, to_landmarks, slack = landmarks
+        from_target = from_landmarks[target].astype(np.float64)
+        to_target = to_landmarks[target].astype(np.float64)
+        forward = list(range(len(from_target)))
+        backward = list(range(len(to_target)))
+        if source is not None:
+            with np.errstate(invalid="ignore"):
+                forward_bounds = from_target - from_landmarks[source]
+                backward_bounds = to_landmarks[source] - to_target
+            bounds = np.concatenate([forward_bounds, backward_bounds])
+            bounds[~np.isfinite(bounds)] = -np.inf
+            best = np.argsort(-bounds)[:active].tolist()
+            forward = [i for i in best if i < len(from_target)]
+            backward = [i - len(from_target) for i in best if i >= len(from_target)]
+        from_target, to_target = from_target.tolist(), to_target.tolist()
+        inf = math.inf
+
+        def heuristic(node):
+            bound = 0.0
+            if forward:
+                row = from_landmarks[node].tolist()
+                for i in forward:
+                    if from_target[i] - row[i] > bound and from_target[i] < inf:
+                        bound = from_target[i] - row[i]
+            if backward:
+                row = to_landmarks[node].tolist()
+                for i in backward:
+                    if row[i] - to_target[i] > bound and row[i] < inf:
+                        bound = row[i] - to_target[i]
+            return max(bound - slack, 0.0)
+
+        return heuristic
+
+    def astar(self, source, target, heuristic=None):
+        """
+        Return the fastest route between two node indices as a list of node indices
+        (None if there is no route), and the number of nodes settled by the search.
+
+        `heuristic` is a function giving a lower bound of the travel time from a node
+        to the target (e.g. `great_circle_heuristic` or `landmark_heuristic`). It is
+        evaluated once per node reached, never for the whole graph. Without one,
+        the search is a Dijkstra search that stops at the target.
+        """
+        if self._lists is None:
+            self._lists = (
+                self.indptr.tolist(),
+                self.indices.tolist(),
+                self.travel_time.tolist(),
+            )
+        indptr, indices, travel_time = self._lists
+        heuristic = heuristic or _no_heuristic
+        h = {source: heuristic(source)}
+        times = {source: 0.0}
+        parents = {source: None}
+        heap = [(h[source], 0.0, source)]
+        heappush, heappop, inf = heapq.heappush, heapq.heappop, math.inf
+        settled = 0
+        while heap:
+            _, time, node = heappop(heap)
+            if time > times[node]:
+                continue
+            settled += 1
+            if node == target:
+                path = [target]
+                while parents[path[-1]] is not None:
+                    path.append(parents[path[-1]])
+                return path[::-1], settled
+            for i in range(indptr[node], indptr[node + 1]):
+                v = indices[i]
+                t = time + travel_time[i]
+                if t < times.get(v, inf):
+                    times[v] = t
+                    parents[v] = node
+                    hv = h.get(v)
+                    if hv is None:
+                        hv = h[v] = heuristic(v)
+                    heappush(heap, (t + hv, t, v))
+        return None, settled
+
+
+def _no_heuristic(node):
+    return 0.0
+
+
+def great_circle(x1, y1, x2, y2):
+    """The great-circle distance between (lon, lat) points in degrees, in meters."""
+    x1, y1, x2, y2 = map(np.radians, (x1, y1, x2, y2))
+    a = (
+        np.sin((y2 - y1) / 2) ** 2
+        + np.cos(y1) * np.cos(y2) * np.sin((x2 - x1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1)))
+
+
+def search_chunk_size(n_nodes, chunk_size=DEFAULT_SOURCE_CHUNK, memory=None):
+    """
+    The number of sources to search at once on a graph of `n_nodes` nodes: at most
+    `chunk_size`, and few enough for the results of a chunk to fit in `memory` bytes
+    (`SEARCH_MEMORY` by default).
+    """
+    if memory is None:
+        memory = SEARCH_MEMORY
+    fit = memory // (SEARCH_BYTES_PER_NODE * max(n_nodes, 1))
+    return int(max(1, min(chunk_size, fit)))
+
+
+def _source_chunks(sources, chunk_size):
+    """
+    Split the pairs by source: yields the chunks of `chunk_size` unique sources,
+    with the positions of their pairs and the row of each pair's source in the chunk.
+    """
+    unique_sources, codes = np.unique(sources, return_inverse=True)
+    codes = codes.ravel()
+    # the pairs grouped by source, and where the pairs of each source start
+    order = np.argsort(codes, kind="stable")
+    offsets = np.zeros(len(unique_sources) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=len(unique_sources)), out=offsets[1:])
+    for start in range(0, len(unique_sources), chunk_size):
+        chunk = unique_sources[start : start + chunk_size]
+        pairs = order[offsets[start] : offsets[start + len(chunk)]]
+        yield chunk, pairs, codes[pairs] - start
+
+
+# the graph of a worker process of `parallel_costs`
+_worker_graph = None
+
+
+def _load_worker_graph(path):
+    global _worker_graph
+    _worker_graph = CSRGraph.load(path)
+
+
+def _worker_costs(chunk, rows, targets):
+    return _worker_graph._chunk_costs(chunk, rows, targets)
+
+
+def parallel_costs(path, sources, targets, workers, chunk_size=DEFAULT_SOURCE_CHUNK):
+    """
+    `CSRGraph.costs` of the graph saved in `path`, with the searches spread over
+    `workers` processes.
+
+    Every process memory-maps the saved graph, so there is a single copy of it in
+    memory whatever the number of workers, and each task only carries a chunk of
+    source indices with the targets of their pairs. The processes are started
+    from a fresh interpreter ("forkserver" where available, else "spawn"), not
+    forked from the caller, so they do not inherit its memory (e.g. a NetworkX
+    graph). The workers share `SEARCH_MEMORY`, so each searches fewer sources at
+    once on large graphs.
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    durations = np.full(len(sources), np.nan)
+    distances = np.full(len(sources), np.nan)
+
+    n_nodes = len(CSRGraph.load(path).nodes)
+    chunk_size = search_chunk_size(n_nodes, chunk_size, SEARCH_MEMORY // max(workers, 1))
+    chunks = list(_source_chunks(sources, chunk_size))
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        # the server imports this module once, rather than every worker
+        context.set_forkserver_preload([__name__])
+    else:
+        context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_load_worker_graph,
+        initargs=(str(path),),
+    ) as executor:
+        futures = [
+            (pairs, executor.submit(_worker_costs, chunk, rows, targets[pairs]))
+            for chunk, pairs, rows in chunks
+        ]
+        for pairs, future in futures:
+            durations[pairs], distances[pairs] = future.result()
+    return durations, distances
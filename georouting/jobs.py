@@ -0,0 +1,366 @@
+"""
+Checkpointed, resumable `get_distances_batch` runs.
+
+A `BatchJob` keeps the input pairs, the batch plan and the result of every
+finished batch in a SQLite file inside a job directory. If a run dies (crash,
+lost connection, Ctrl-C), running the job again only requests the batches that
+are still outstanding.
+"""
+
+import json
+import sqlite3
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from georouting.routers.base import OD_COLUMNS
+
+JOB_FILE = "job.sqlite"
+
+
+def _format_seconds(seconds):
+    if seconds is None or not np.isfinite(seconds):
+        return "?"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return "%dh%02dm" % (hours, minutes)
+    if minutes:
+        return "%dm%02ds" % (minutes, seconds)
+    return "%ds" % seconds
+
+
+class BatchJob:
+    """
+    A `get_distances_batch` run persisted to a directory.
+
+    The first time a directory is used, the input pairs are stored and divided into
+    batches with the router's batch planner. Later, `BatchJob(router, path)` reopens
+    the job without the inputs, and `run()` requests only the outstanding batches.
+
+    Parameters
+    ----------
+    - `router` : BaseRouter
+        The router used to request the batches. Use the same router class and
+        options (mode, `quantize`) when resuming a job.
+
+    - `path` : str or Path
+        The job directory.
+
+    - `origins`, `destinations` : iterable objects
+        The origin-destination pairs, needed only when the job is created. Any
+        iterables are accepted, generators included: the pairs are read once and
+        stored in the job. When reopening a job, sized inputs are checked against
+        the stored number of pairs.
+
+    - `max_batch_size` : int
+        Maximum pairs per matrix request. Defaults to the router's `max_batch_size`.
+
+    - `plan` : str
+        How the pairs are grouped into requests, "rows" or "blocks", see
+        `get_distances_batch`.
+
+    Example
+    -------
+    >>> job = BatchJob(router, "jobs/boston", origins, destinations)
+    >>> job.run(workers=4)  # interrupted? run it again to resume
+    >>> df = job.result(append_od=True)
+    """
+
+    def __init__(
+        self,
+        router,
+        path,
+        origins=None,
+        destinations=None,
+        max_batch_size=None,
+        plan="rows",
+    ):
+        self.router = router
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path / JOB_FILE)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._create_tables()
+        if origins is not None and not hasattr(origins, "__len__"):
+            origins = list(origins)
+        if destinations is not None and not hasattr(destinations, "__len__"):
+            destinations = list(destinations)
+
+        if self._get_meta("n_pairs") is None:
+            if origins is None or destinations is None:
+                raise ValueError(
+                    "%s holds no job; pass origins and destinations to create it."
+                    % self.path
+                )
+            self._create_job(origins, destinations, max_batch_size, plan)
+        elif origins is not None and len(origins) != int(self._get_meta("n_pairs")):
+            raise ValueError(
+                "%s holds a job over %s pairs, not %d."
+                % (self.path, self._get_meta("n_pairs"), len(origins))
+            )
+
+    def __repr__(self):
+        progress = self.progress()
+        return "BatchJob(%r, %d/%d batches done)" % (
+            str(self.path),
+            progress["batches_done"],
+            progress["batches"],
+        )
+
+    def _create_tables(self):
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS inputs (row INTEGER PRIMARY KEY, "
+                "origin_lat REAL, origin_lon REAL, destination_lat REAL, destination_lon REAL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS batches (id INTEGER PRIMARY KEY, "
+                "origins TEXT, destinations TEXT, elements INTEGER, pairs INTEGER, "
+                "status TEXT, attempts INTEGER, error TEXT)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results (batch INTEGER, "
+                "origin_lat REAL, origin_lon REAL, destination_lat REAL, destination_lon REAL, "
+                "distance REAL, duration REAL)"
+            )
+
+    def _get_meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def _create_job(self, origins, destinations, max_batch_size, plan):
+        origins, destinations, batches, cached = self.router._get_batches(
+            origins, destinations, max_batch_size, plan
+        )
+        inputs = self.router._stack_pairs(origins, destinations)
+        # the number of input pairs each batch (or the cache, -1) answers
+        keys, owners = self.router._batch_keys(batches, cached)
+        owners = owners[
+            self.router._match_pairs(keys, self.router._get_pair_keys(origins, destinations))
+        ]
+        pairs = np.bincount(owners[owners >= 0], minlength=len(batches))
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO inputs VALUES (?, ?, ?, ?, ?)",
+                ((i, *row) for i, row in enumerate(inputs.tolist())),
+            )
+            self._conn.executemany(
+                "INSERT INTO batches VALUES (?, ?, ?, ?, ?, 'pending', 0, NULL)",
+                (
+                    (
+                        i,
+                        json.dumps([list(p) for p in o]),
+                        json.dumps([list(p) for p in d]),
+                        len(o) * len(d),
+                        int(pairs[i]),
+                    )
+                    for i, (o, d) in enumerate(batches)
+                ),
+            )
+            if cached is not None and len(cached):
+                self._insert_results(None, cached)
+            meta = {
+                "router": type(self.router).__name__,
+                "mode": self.router.mode,
+                "plan": plan,
+                "n_pairs": len(inputs),
+                "cached_pairs": int((owners < 0).sum()),
+                "created_at": time.time(),
+            }
+            self._conn.executemany(
+                "INSERT INTO meta VALUES (?, ?)", ((k, str(v)) for k, v in meta.items())
+            )
+
+    def _insert_results(self, batch_id, df):
+        values = df[OD_COLUMNS + ["distance (m)", "duration (s)"]].to_numpy(dtype=float)
+        self._conn.executemany(
+            "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (batch_id, *[None if v != v else v for v in row])
+                for row in values.tolist()
+            ),
+        )
+
+    def _save_batch(self, batch_id, batch, result):
+        """Store the result of a batch, or record the failure."""
+        with self._conn:
+            if isinstance(result, Exception):
+                self._conn.execute(
+                    "UPDATE batches SET status = 'failed', attempts = attempts + 1, "
+                    "error = ? WHERE id = ?",
+                    (repr(result), batch_id),
+                )
+                return False
+            od_matrix = self.router._get_OD_matrix(batch[0], batch[1])
+            df = pd.concat([od_matrix, result.reset_index(drop=True)], axis=1)
+            self._conn.execute("DELETE FROM results WHERE batch = ?", (batch_id,))
+            self._insert_results(batch_id, df)
+            self._conn.execute(
+                "UPDATE batches SET status = 'done', attempts = attempts + 1, "
+                "error = NULL WHERE id = ?",
+                (batch_id,),
+            )
+            return True
+
+    def _outstanding(self):
+        rows = self._conn.execute(
+            "SELECT id, origins, destinations, pairs FROM batches "
+            "WHERE status != 'done' ORDER BY id"
+        ).fetchall()
+        return {i: (json.loads(o), json.loads(d), n) for i, o, d, n in rows}
+
+    def progress(self):
+        """
+        Return the number of input pairs answered, batches, failed batches and
+        elements (origins x destinations of the batches, what the requests cost),
+        done and in total. Pairs found in the cache when the job was created
+        count as done.
+        """
+        rows = self._conn.execute(
+            "SELECT status, COUNT(*), COALESCE(SUM(elements), 0), COALESCE(SUM(pairs), 0) "
+            "FROM batches GROUP BY status"
+        ).fetchall()
+        counts = {status: (n, elements, pairs) for status, n, elements, pairs in rows}
+        done = counts.get("done", (0, 0, 0))
+        return {
+            "pairs": int(self._get_meta("n_pairs")),
+            "pairs_done": int(self._get_meta("cached_pairs")) + done[2],
+            "batches": sum(c[0] for c in counts.values()),
+            "batches_done": done[0],
+            "batches_failed": counts.get("failed", (0, 0, 0))[0],
+            "elements": sum(c[1] for c in counts.values()),
+            "elements_done": done[1],
+        }
+
+    def run(self, workers=1, errors="raise", progress=True, report_every=10.0):
+        """
+        Request the outstanding batches, storing every result as soon as it arrives.
+
+        A batch that failed transiently (connection error, timeout, 429/5xx response)
+        is retried up to the router's `batch_retries` times within the run. Batches that still fail are kept as outstanding for the next run; then
+        `errors="raise"` raises a RuntimeError, while `errors="coerce"` only warns.
+
+        Parameters
+        ----------
+        - `workers` : int
+            Number of threads requesting batches in parallel.
+
+        - `errors` : str
+            "raise" or "coerce", see above.
+
+        - `progress` : bool or callable
+            Print the progress (pairs done, requests per second, ETA) every
+            `report_every` seconds. A callable is called with the progress dict instead.
+
+        Returns
+        -------
+        - `progress` : dict
+            The progress of the job at the end of the run, see `progress()`.
+        """
+        outstanding = self._outstanding()
+        attempts = dict.fromkeys(outstanding, 0)
+        status = self.progress()
+        pairs_left = status["pairs"] - status["pairs_done"]
+        pairs_done, requests = 0, 0
+        started = last_report = time.monotonic()
+
+        def report(final=False):
+            elapsed = max(time.monotonic() - started, 1e-9)
+            rate = pairs_done / elapsed
+            info = self.progress()
+            info.update(
+                requests_per_second=requests / elapsed,
+                pairs_per_second=rate,
+                eta=(pairs_left - pairs_done) / rate if rate else float("inf"),
+            )
+            if callable(progress):
+                progress(info)
+            elif progress:
+                print(
+                    "[job] %d/%d pairs (%.1f%%), %d/%d batches, %.1f req/s, ETA %s%s"
+                    % (
+                        info["pairs_done"],
+                        info["pairs"],
+                        100.0 * info["pairs_done"] / max(info["pairs"], 1),
+                        info["batches_done"],
+                        info["batches"],
+                        info["requests_per_second"],
+                        _format_seconds(0 if final else info["eta"]),
+                        ", %d failed" % info["batches_failed"] if info["batches_failed"] else "",
+                    )
+                )
+            return info
+
+        executor = ThreadPoolExecutor(max_workers=max(int(workers), 1))
+        try:
+            futures = {
+                executor.submit(self.router._try_distance_matrix, batch[:2]): i
+                for i, batch in outstanding.items()
+            }
+            while futures:
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    i = futures.pop(future)
+                    requests += 1
+                    attempts[i] += 1
+                    result = future.result()
+                    if self._save_batch(i, outstanding[i], result):
+                        pairs_done += outstanding[i][2]
+                    elif attempts[i] <= self.router.batch_retries and (
+                        self.router._is_transient_failure(result)
+                    ):
+                        futures[
+                            executor.submit(self.router._try_distance_matrix, outstanding[i][:2])
+                        ] = i
+                if progress and time.monotonic() - last_report >= report_every:
+                    last_report = time.monotonic()
+                    report()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        info = report(final=True) if progress else self.progress()
+        if info["batches_failed"]:
+            error = self._conn.execute(
+                "SELECT error FROM batches WHERE status = 'failed' LIMIT 1"
+            ).fetchone()[0]
+            message = "%d of %d batches failed after %d retries: %s" % (
+                info["batches_failed"],
+                info["batches"],
+                self.router.batch_retries,
+                error,
+            )
+            if errors != "coerce":
+                raise RuntimeError(message + "; run the job again to retry them.")
+            warnings.warn(message + "; their pairs are left as NaN.")
+        return info
+
+    def result(self, append_od=False):
+        """
+        Return the distances of the input pairs, in input order, like `get_distances_batch`.
+        Pairs of outstanding batches are NaN.
+        """
+        inputs = pd.read_sql_query(
+            "SELECT origin_lat, origin_lon, destination_lat, destination_lon "
+            "FROM inputs ORDER BY row",
+            self._conn,
+        ).to_numpy(dtype=float)
+        results = pd.read_sql_query(
+            'SELECT origin_lat, origin_lon, destination_lat, destination_lon, '
+            'distance AS "distance (m)", duration AS "duration (s)" FROM results',
+            self._conn,
+        ).astype(float)
+        return self.router._assemble_batches(
+            [], [], inputs[:, :2], inputs[:, 2:], append_od, cached=results
+        )
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,112 @@
+"""
+Client-side rate limiting for the web routers.
+
+Routing providers limit both the number of requests and the number of
+matrix elements (origins x destinations) per second. A `RateLimiter`
+combines one token bucket for each, and is shared by every router of the
+same class so that threads draw from the same budget. The asynchronous batch
+methods send their requests from worker threads, so they wait on it too.
+"""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    A token bucket refilled at `rate` tokens per second, holding at most `capacity` tokens.
+
+    Requests larger than the bucket are allowed: the bucket goes into debt and
+    later callers wait until it has been paid back, so the long-run rate is
+    never exceeded.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate should be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+
+    def reserve(self, tokens, now=None):
+        """
+        Take `tokens` from the bucket and return how many seconds the caller
+        has to wait before using them. Not thread-safe on its own.
+        """
+        now = time.monotonic() if now is None else now
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+        self._tokens -= tokens
+        return max(0.0, -self._tokens / self.rate)
+
+
+class RateLimiter:
+    """
+    Limit requests per second and elements per second, thread-safe.
+
+    Parameters
+    ----------
+    requests_per_second : float
+        Maximum sustained number of requests per second, or None for no limit.
+    elements_per_second : float
+        Maximum sustained number of matrix elements per second, or None for no limit.
+    burst : float
+        Size of each bucket, in seconds worth of tokens.
+    """
+
+    def __init__(self, requests_per_second=None, elements_per_second=None, burst=1.0):
+        self.requests_per_second = requests_per_second
+        self.elements_per_second = elements_per_second
+        self._buckets = []
+        if requests_per_second:
+            self._requests = TokenBucket(
+                requests_per_second, max(1.0, requests_per_second * burst)
+            )
+            self._buckets.append((self._requests, False))
+        if elements_per_second:
+            self._elements = TokenBucket(
+                elements_per_second, max(1.0, elements_per_second * burst)
+            )
+            self._buckets.append((self._elements, True))
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "RateLimiter(requests_per_second=%r, elements_per_second=%r)" % (
+            self.requests_per_second,
+            self.elements_per_second,
+        )
+
+    def reserve(self, elements=1):
+        """Reserve one request of `elements` elements; return the seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            waits = [
+                bucket.reserve(elements if is_elements else 1, now)
+                for bucket, is_elements in self._buckets
+            ]
+        return max(waits, default=0.0)
+
+    def acquire(self, elements=1):
+        """Block until one request of `elements` elements may be sent."""
+        wait = self.reserve(elements)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+_SHARED_LIMITERS = {}
+_SHARED_LIMITERS_LOCK = threading.Lock()
+
+
+def get_shared_rate_limiter(key, requests_per_second=None, elements_per_second=None):
+    """
+    Return the process-wide `RateLimiter` registered under `key` (e.g. a router
+    class name), creating it with the given limits on first use.
+    """
+    with _SHARED_LIMITERS_LOCK:
+        limiter = _SHARED_LIMITERS.get(key)
+        if limiter is None:
+            limiter = RateLimiter(requests_per_second, elements_per_second)
+            _SHARED_LIMITERS[key] = limiter
+    return limiter
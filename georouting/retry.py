@@ -0,0 +1,152 @@
+"""
+Retry policy for requests to web routing services.
+
+Transient failures (connection errors, timeouts and 429/5xx responses) are
+retried with exponential backoff and full jitter. A `Retry-After` header
+sent by the server takes precedence over the computed backoff.
+"""
+
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+
+class RetryPolicy:
+    """
+    When and how long to wait before retrying a failed request.
+
+    Parameters
+    ----------
+    max_attempts : int
+        Total number of attempts per request, including the first one.
+    backoff_factor : float
+        Base delay in seconds; attempt `n` waits up to `backoff_factor * 2 ** (n - 1)`.
+    max_backoff : float
+        Upper bound for the computed delay (a `Retry-After` header is honoured as is).
+    jitter : bool
+        If True, the delay is drawn uniformly from [0, computed delay] ("full jitter").
+    status_forcelist : iterable of int
+        HTTP status codes considered transient.
+    allowed_methods : iterable of str
+        HTTP methods that are safe to retry. Other methods are only retried when
+        the caller marks the request as idempotent.
+    """
+
+    def __init__(
+        self,
+        max_attempts=5,
+        backoff_factor=0.5,
+        max_backoff=60,
+        jitter=True,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=IDEMPOTENT_METHODS,
+    ):
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.status_forcelist = frozenset(status_forcelist)
+        self.allowed_methods = frozenset(m.upper() for m in allowed_methods)
+
+    def __repr__(self):
+        return "RetryPolicy(max_attempts=%r, backoff_factor=%r, max_backoff=%r)" % (
+            self.max_attempts,
+            self.backoff_factor,
+            self.max_backoff,
+        )
+
+    def can_retry(self, method, attempt, idempotent=None):
+        """Whether attempt number `attempt` (1-based) may be followed by another one."""
+        if attempt >= self.max_attempts:
+            return False
+        if idempotent is None:
+            idempotent = method.upper() in self.allowed_methods
+        return idempotent
+
+    def is_retryable_response(self, response):
+        return response.status_code in self.status_forcelist
+
+    def get_backoff(self, attempt, response=None):
+        """Seconds to wait after failed attempt number `attempt` (1-based)."""
+        retry_after = parse_retry_after(response) if response is not None else None
+        if retry_after is not None:
+            return retry_after
+        delay = min(self.max_backoff, self.backoff_factor * 2 ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def sleep(self, attempt, response=None):
+        time.sleep(self.get_backoff(attempt, response))
+
+
+def parse_retry_after(response):
+    """
+    Return the delay in seconds requested by a `Retry-After` header, or None.
+    The header may hold a number of seconds or an HTTP date.
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+def is_transient_error(exc, status_forcelist=RETRY_STATUSES):
+    """
+    Whether a failed request is worth sending again: connection errors, timeouts
+    and error responses with a status in `status_forcelist`.
+    """
+    if isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(exc, requests.exceptions.HTTPError) and exc.response is not None:
+        return exc.response.status_code in status_forcelist
+    return False
+
+
+def send_with_retry(session, method, url, policy, idempotent=None, before_attempt=None, **kwargs):
+    """
+    Send a request with `session`, retrying transient failures according to `policy`.
+
+    `before_attempt` is called before every attempt (e.g. to wait for a rate limiter).
+    Returns the final `requests.Response`; raises `requests.HTTPError` for error
+    responses that are not retried and re-raises the last connection error.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        if before_attempt is not None:
+            before_attempt()
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if not policy.can_retry(method, attempt, idempotent):
+                raise
+            policy.sleep(attempt)
+            continue
+
+        if policy.is_retryable_response(response) and policy.can_retry(
+            method, attempt, idempotent
+        ):
+            response.close()
+            policy.sleep(attempt, response)
+            continue
+
+        response.raise_for_status()
+        return response
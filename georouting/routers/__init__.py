@@ -52,8 +52,10 @@ class Router:
     """
     Router class.
 
+    Extra keyword arguments (e.g. `session`, `pool_maxsize`, `rate_limit`, `retry`) are passed to the underlying router.
+
     """
-    def __init__(self, router, api_key=None, area = "Cambridge, Massachusetts, USA", mode="driving", timeout=10, language="en"):
+    def __init__(self, router, api_key=None, area = "Cambridge, Massachusetts, USA", mode="driving", timeout=10, language="en", **kwargs):
 
         self.router = router
         self.api_key = api_key
@@ -63,25 +65,25 @@ class Router:
         self.language = language
 
         if self.router == "osrm":
-            self.router = OSRMRouter(mode = self.mode, timeout = self.timeout,language= self.language)
+            self.router = OSRMRouter(mode = self.mode, timeout = self.timeout,language= self.language, **kwargs)
         elif self.router == "google":
-            self.router = GoogleRouter(api_key = self.api_key,mode= self.mode, timeout = self.timeout, language = self.language)
+            self.router = GoogleRouter(api_key = self.api_key,mode= self.mode, timeout = self.timeout, language = self.language, **kwargs)
         elif self.router == "bing":
-            self.router = BingRouter(api_key = self.api_key,mode= self.mode, timeout = self.timeout, language = self.language)
+            self.router = BingRouter(api_key = self.api_key,mode= self.mode, timeout = self.timeout, language = self.language, **kwargs)
         elif self.router == "baidu":
-            self.router = BaiduRouter(api_key = self.api_key,mode= self.mode, timeout = self.timeout, language = self.language)
+            self.router = BaiduRouter(api_key = self.api_key,mode= self.mode, timeout = self.timeout, language = self.language, **kwargs)
         elif self.router == "tomtom":
-            self.router = TomTomRouter(api_key = self.api_key,mode= self.mode, timeout = self.timeout, language = self.language)
+            self.router = TomTomRouter(api_key = self.api_key,mode= self.mode, timeout = self.timeout, language = self.language, **kwargs)
         elif self.router == "mapbox":
-            self.router = MapboxRouter(api_key = self.api_key,mode= self.mode, timeout = self.timeout, language = self.language)
+            self.router = MapboxRouter(api_key = self.api_key,mode= self.mode, timeout = self.timeout, language = self.language, **kwargs)
         elif self.router == "here":
-            self.router = HereRouter(api_key = self.api_key,mode= self.mode, timeout = self.timeout, language = self.language)
+            self.router = HereRouter(api_key = self.api_key,mode= self.mode, timeout = self.timeout, language = self.language, **kwargs)
         elif self.router == "openrouteservice":
-            self.router = ORSRouter(api_key = self.api_key,mode= self.mode, timeout = self.timeout, language = self.language)
+            self.router = ORSRouter(api_key = self.api_key,mode= self.mode, timeout = self.timeout, language = self.language, **kwargs)
         elif self.router == "esri":
-            self.router = EsriRouter(api_key = self.api_key,mode= self.mode, timeout = self.timeout, language = self.language)
+            self.router = EsriRouter(api_key = self.api_key,mode= self.mode, timeout = self.timeout, language = self.language, **kwargs)
         elif self.router == "osmnx":
-            self.router = OSMNXRouter(area=self.area, mode=self.mode, timeout=self.timeout, language=self.language)
+            self.router = OSMNXRouter(area=self.area, mode=self.mode, timeout=self.timeout, language=self.language, **kwargs)
         else:
             raise ValueError("Router not supported.")
 
@@ -91,6 +93,14 @@ class Router:
         """
         return SERVICE_TO_GEOROUTOR.keys()
 
+    def cache_info(self):
+        """
+        Returns the statistics of the router's cache, or None without a cache.
+        """
+        if not hasattr(self.router, "cache_info"):
+            return None
+        return self.router.cache_info()
+
     def get_route(self, origin, destination):
         """
         Returns a route object.
@@ -103,10 +113,49 @@ class Router:
         """
         return self.router.get_distance_matrix(origins, destinations, append_od, **kwargs)
 
-    def get_distances_batch(self, origins, destinations, append_od=False):
+    def get_distances_batch(self, origins, destinations, append_od=False, **kwargs):
         """
         Returns a list of distances.
+        Extra options such as `workers=8` are passed to the router's `get_distances_batch`.
         """
-        return self.router.get_distances_batch(origins, destinations, append_od=append_od)
+        return self.router.get_distances_batch(origins, destinations, append_od=append_od, **kwargs)
 
-    
+    def iter_distances_batch(self, origins, destinations, chunk_size=10000, **kwargs):
+        """
+        Yields the distances of consecutive chunks of pairs, see the router's `iter_distances_batch`.
+        """
+        return self.router.iter_distances_batch(
+            origins, destinations, chunk_size=chunk_size, **kwargs
+        )
+
+    def write_distances_parquet(self, origins, destinations, path, **kwargs):
+        """
+        Writes the distances of the pairs to a directory of Parquet files, see the router's `write_distances_parquet`.
+        """
+        return self.router.write_distances_parquet(origins, destinations, path, **kwargs)
+
+    def plan_distances_batch(self, origins, destinations, **kwargs):
+        """
+        Returns the request plan of `get_distances_batch` without sending requests.
+        """
+        return self.router.plan_distances_batch(origins, destinations, **kwargs)
+
+    async def aget_route(self, origin, destination):
+        """
+        Returns a route object without blocking the event loop.
+        """
+        return await self.router.aget_route(origin, destination)
+
+    async def aget_distance_matrix(self, origins, destinations, append_od=False, **kwargs):
+        """
+        Returns a distance matrix without blocking the event loop.
+        """
+        return await self.router.aget_distance_matrix(
+            origins, destinations, append_od, **kwargs
+        )
+
+    async def aget_distances_batch(self, origins, destinations, append_od=False, **kwargs):
+        """
+        Returns a list of distances, requesting the batches concurrently.
+        """
+        return await self.router.aget_distances_batch(origins, destinations, append_od=append_od, **kwargs)
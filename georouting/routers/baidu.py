@@ -1,7 +1,5 @@
 import pandas as pd
-import numpy as np
-import georouting.utils as gtl
-from georouting.routers.base import WebRouter, Route, BaiduRoute
+from georouting.routers.base import WebRouter, BaiduRoute
 
 
 class BaiduRouter(WebRouter):
@@ -27,6 +25,9 @@ class BaiduRouter(WebRouter):
     - `language` : str
         The language to be used in API requests.
 
+    - `**kwargs` :
+        Options passed to `WebRouter`, e.g. `session`, `pool_maxsize`, `rate_limit`, `retry`, `cache`, `json_decoder`.
+
     
     Returns
     -------
@@ -35,8 +36,18 @@ class BaiduRouter(WebRouter):
 
     """
     
-    def __init__(self, api_key, mode="driving", timeout=10, language="en"):
-        super().__init__(api_key, mode=mode, timeout=timeout, language=language)
+    # Baidu routematrix API has a limit of 50 origins/destinations
+    max_batch_size = 50
+
+    # default concurrency quota of a Baidu developer key
+    rate_limit = {"requests_per_second": 30}
+
+    route_class = BaiduRoute
+
+    def __init__(self, api_key, mode="driving", timeout=10, language="en", **kwargs):
+        super().__init__(
+            api_key, mode=mode, timeout=timeout, language=language, **kwargs
+        )
         self.base_url = "https://api.map.baidu.com/direction/v2/"
         self.matrix_url = "https://api.map.baidu.com/routematrix/v2/"
     
@@ -92,6 +103,15 @@ class BaiduRouter(WebRouter):
         df = pd.DataFrame({"distance (m)": distances, "duration (s)": durations})
         return df
     
+    def _get_route(self, origin, destination):
+        url = self._get_directions_url(origin, destination)
+        return self._get_request(url)
+
+    def _get_distance_matrix(self, origins, destinations):
+        url = self._get_matrix_distance_url(origins, destinations)
+        res = self._get_request(url, elements=len(origins) * len(destinations))
+        return self._parse_distance_matrix(res)
+
     def get_route(self,origin,destination):
         """
         This method returns a Route object representing the route between the origin and destination points.
@@ -120,13 +140,9 @@ class BaiduRouter(WebRouter):
         - `get_route_geodataframe()` returns the route as a GeoDataFrame.
 
         """
+        return super().get_route(origin, destination)
 
-        url = self._get_directions_url(origin, destination)
-        route = super()._get_request(url)
-        route = Route(BaiduRoute(route), origin=origin, destination=destination)
-        return route
-
-    def get_distance_matrix(self, origins, destinations, append_od=False):
+    def get_distance_matrix(self, origins, destinations, append_od=False, **kwargs):
         """
         This method returns a Pandas dataframe representing a distance matrix between the origins and destinations.
         It returns the duration and distance for all possible combinations between each origin and each destination.
@@ -142,25 +158,20 @@ class BaiduRouter(WebRouter):
         - `append_od` : bool
             If True, the method also returns a matrix of origin-destination pairs.
 
+        - `**kwargs` :
+            Further options of `BaseRouter.get_distance_matrix`, e.g. `output="array"` to
+            get (distances, durations) NumPy arrays.
+
         Returns
         -------
         - `distance_matrix` : pandas.DataFrame
             A pandas DataFrame containing the distance matrix.
         """
-        origins = gtl.convert_to_list(origins)
-        destinations = gtl.convert_to_list(destinations)
-
-        url = self._get_matrix_distance_url(origins, destinations)
-        res = super()._get_request(url)
-        distance_matrix = self._parse_distance_matrix(res)
-
-        if append_od:
-            od_matrix = super()._get_OD_matrix(origins, destinations)
-            distance_matrix = pd.concat([od_matrix, distance_matrix], axis=1)
-
-        return distance_matrix
+        return super().get_distance_matrix(
+            origins, destinations, append_od=append_od, **kwargs
+        )
 
-    def get_distances_batch(self, origins, destinations, append_od=False):
+    def get_distances_batch(self, origins, destinations, append_od=False, **kwargs):
         """
         This method returns a Pandas dataframe contains duration and distance for all the origins and destinations pairs.
         Use this function if you don't want to get duration and distance for all possible combinations.
@@ -176,13 +187,21 @@ class BaiduRouter(WebRouter):
         - `append_od` : bool
             If True, the method also returns the input origin-destination pairs.
 
+        - `**kwargs` :
+            Further options of `BaseRouter.get_distances_batch`, e.g. `workers` to
+            request the batches from a pool of threads.
+
         Returns
         -------
         - `distance_matrix` : pandas.DataFrame
             A pandas DataFrame containing the distances for each OD pair.
         """
         # Baidu routematrix API has a limit of 50 origins/destinations
+        kwargs["max_batch_size"] = self._limit_batch_size(kwargs.get("max_batch_size"))
         df = super().get_distances_batch(
-            origins, destinations, max_batch_size=50, append_od=append_od
+            origins,
+            destinations,
+            append_od=append_od,
+            **kwargs,
         )
         return df
\ No newline at end of file
@@ -6,9 +6,18 @@ import pandas as pd
 import shapely.geometry as sg
 from shapely.geometry import LineString
 import numpy as np
-import requests
 import json
+import asyncio
+import itertools
+import warnings
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.exceptions import RequestException
 import georouting.utils as gtl
+from georouting.ratelimit import RateLimiter, get_shared_rate_limiter
+from georouting.retry import RETRY_STATUSES, RetryPolicy, is_transient_error, send_with_retry
+from georouting.cache import make_cache
 import folium
 import networkx as nx
 import osmnx as ox
@@ -314,6 +323,8 @@ class OSMNXRoute:
     def __init__(self, route):
         self.route = route[0]
         self.G = route[1]
+        # the (duration, distance) on partial edges, for points snapped onto edges
+        self.offsets = route[2] if len(route) > 2 and route[2] is not None else (0, 0)
 
     def _get_durations(self):
         # OSMnx 2.0+ compatible: manually extract edge attributes
@@ -340,12 +351,12 @@ class OSMNXRoute:
     def get_duration(self):
         durations = self._get_durations()
 
-        return round(sum(durations))
+        return round(sum(durations) + self.offsets[0])
 
     def get_distance(self):
         edge_lengths = self._get_distances()
 
-        return round(sum(edge_lengths))
+        return round(sum(edge_lengths) + self.offsets[1])
 
     def get_route(self):
         return self.route
@@ -830,36 +841,360 @@ class Route(object):
         return m
 
 
+# default number of concurrent requests for the asynchronous batch methods
+DEFAULT_CONCURRENCY = 8
+
+OD_COLUMNS = ["origin_lat", "origin_lon", "destination_lat", "destination_lon"]
+
+
 # base class for routers
 class BaseRouter(object):
 
     """
     The class BaseRouter serves as a base class for routers, which are used to compute the optimal route between two points. The class has an instance variable mode, which is a string that defines the mode of transportation (e.g. "driving").
 
-    The BaseRouter class has a single method _get_OD_matrix, which takes two arguments origins and destinations and returns an origin-destination matrix. The method creates an empty list items and loops through each origin and destination pair, appending the concatenated origin and destination to the list. The origin-destination matrix is then created from the list items and returned.
+    The BaseRouter class has a method _get_OD_matrix, which takes two arguments origins and destinations and returns an origin-destination matrix, with one row of origin and destination coordinates for each origin and destination pair, origin-major. The rows are built with NumPy broadcasting; `_get_OD_ids` gives the same matrix as integer origin and destination indices.
     """
 
-    def __init__(self, mode="driving"):
+    # maximum number of origin-destination pairs grouped into one matrix request
+    max_batch_size = 25
+
+    # limits of a matrix request for plan="blocks" (None: no limit, and for
+    # max_elements the batch size), and the share of its elements that must be needed
+    max_origins = None
+    max_destinations = None
+    max_elements = None
+    min_fill = 1.0
+
+    # the limit of origins plus destinations of a matrix request (None: no limit)
+    max_coordinates = None
+
+    # how many more times a failed batch is retried by get_distances_batch
+    batch_retries = 2
+
+    # the exceptions of a failed matrix request, which fail only its batch
+    batch_errors = (RequestException,)
+
+    # the class wrapping the raw route response of the service, e.g. OSRMRoute
+    route_class = None
+
+    def __init__(self, mode="driving", cache=None, quantize=None):
         self.mode = mode
+        self.cache = make_cache(cache)
+        self.quantize = self._get_quantize(quantize)
+        # counts of the last get_distances_batch run, see `_get_batches`
+        self.batch_stats = None
+
+    def _get_quantize(self, quantize=None):
+        """
+        Resolve the `quantize` option to the keyword arguments of
+        `gtl.quantize_coordinates` (or None for no quantization).
+        """
+        if quantize is None or quantize is False:
+            return None
+        if isinstance(quantize, dict):
+            unknown = set(quantize) - {"grid_size", "geohash_precision"}
+            if unknown:
+                raise ValueError("Unknown quantize options: %s" % sorted(unknown))
+            return dict(quantize)
+        return {"grid_size": float(quantize)}
+
+    def _quantize(self, points):
+        """
+        Snap points as configured by the `quantize` option.
+        """
+        if self.quantize is None:
+            return points
+        return gtl.quantize_coordinates(points, **self.quantize).tolist()
+
+    @staticmethod
+    def _stack_pairs(origins, destinations):
+        """
+        Return the origin-destination pairs as an (n, 4) float array.
+        """
+        return np.hstack(
+            [
+                np.asarray(origins, dtype=float).reshape(-1, 2),
+                np.asarray(destinations, dtype=float).reshape(-1, 2),
+            ]
+        )
+
+    def _get_pair_keys(self, origins, destinations):
+        """
+        Return the quantized origin-destination pairs as an (n, 4) float array.
+        """
+        return self._stack_pairs(self._quantize(origins), self._quantize(destinations))
 
     def _get_OD_matrix(self, origins, destinations):
-        items = []
-        for i in origins:
-            for j in destinations:
-                item = i + j
-                items.append(item)
+        origins = np.asarray(origins, dtype=float).reshape(-1, 2)
+        destinations = np.asarray(destinations, dtype=float).reshape(-1, 2)
+        shape = (len(origins), len(destinations))
         od_matrix = pd.DataFrame(
-            items,
-            columns=["origin_lat", "origin_lon", "destination_lat", "destination_lon"],
+            {
+                "origin_lat": np.broadcast_to(origins[:, :1], shape).ravel(),
+                "origin_lon": np.broadcast_to(origins[:, 1:], shape).ravel(),
+                "destination_lat": np.broadcast_to(destinations[:, 0], shape).ravel(),
+                "destination_lon": np.broadcast_to(destinations[:, 1], shape).ravel(),
+            },
+            columns=OD_COLUMNS,
         )
 
         return od_matrix
 
-    # def get_route(self, origin, destination):
-    #     return Route(self._get_request(origin, destination))
+    @staticmethod
+    def _get_OD_ids(num_origins, num_destinations):
+        """
+        Return the origin and destination indices of all combinations, origin-major,
+        as two int32 arrays.
+        """
+        shape = (num_origins, num_destinations)
+        return (
+            np.broadcast_to(np.arange(num_origins, dtype=np.int32)[:, None], shape).ravel(),
+            np.broadcast_to(np.arange(num_destinations, dtype=np.int32), shape).ravel(),
+        )
+
+    @staticmethod
+    def _append_OD_ids(df, origin_ids, origin_points, destination_ids, destination_points):
+        """
+        Add the "origin_id" and "destination_id" columns to the dataframe and return it
+        with the origin and destination coordinate tables, indexed by id.
+        """
+        df.insert(0, "origin_id", np.asarray(origin_ids, dtype=np.int32))
+        df.insert(1, "destination_id", np.asarray(destination_ids, dtype=np.int32))
+        origins = pd.DataFrame(
+            np.asarray(origin_points, dtype=float).reshape(-1, 2), columns=["lat", "lon"]
+        ).rename_axis("origin_id")
+        destinations = pd.DataFrame(
+            np.asarray(destination_points, dtype=float).reshape(-1, 2),
+            columns=["lat", "lon"],
+        ).rename_axis("destination_id")
+        return df, origins, destinations
+
+    def cache_info(self):
+        """
+        Return the statistics of the router's cache (hits, misses, hit rate, number
+        of entries), or None if the router has no cache.
+        """
+        if self.cache is None:
+            return None
+        return self.cache.stats()
+
+    def _cache_provider(self):
+        """
+        The name under which results of this router are cached.
+        """
+        return type(self).__name__
+
+    def _get_route(self, origin, destination):
+        """
+        Request the route from the service and return the raw response.
+        """
+        raise NotImplementedError
+
+    def _get_distance_matrix(self, origins, destinations):
+        """
+        Request the distance matrix from the service and return a dataframe with
+        `distance (m)` and `duration (s)` for every origin x destination, origin-major.
+        """
+        raise NotImplementedError
+
+    def _get_distance_matrix_arrays(self, origins, destinations):
+        """
+        Request the distance matrix from the service and return (distances, durations)
+        as (n_origins, n_destinations) float arrays, NaN where no route was found.
+
+        Routers whose responses hold the matrices as nested lists override this to
+        parse them straight into arrays.
+        """
+        distance_matrix = self._get_distance_matrix(origins, destinations)
+        return self._frame_to_arrays(distance_matrix, len(origins), len(destinations))
+
+    @staticmethod
+    def _arrays_to_frame(distances, durations):
+        """
+        Turn (distances, durations) matrices into the origin-major dataframe.
+        """
+        return pd.DataFrame(
+            {"distance (m)": distances.ravel(), "duration (s)": durations.ravel()},
+            copy=False,
+        )
+
+    @staticmethod
+    def _frame_to_arrays(distance_matrix, num_origins, num_destinations):
+        """
+        Turn an origin-major dataframe into (distances, durations) matrices.
+        """
+        shape = (num_origins, num_destinations)
+        return (
+            distance_matrix["distance (m)"].to_numpy(dtype=float).reshape(shape),
+            distance_matrix["duration (s)"].to_numpy(dtype=float).reshape(shape),
+        )
+
+    def get_route(self, origin, destination):
+        """
+        Return a Route object for the route between the origin and destination points.
+        If the router has a cache, the raw response is served from / stored in it.
+        With the `quantize` option, the route between the snapped points is requested.
+        """
+        start, end = self._quantize([origin, destination])
+        if self.cache is None:
+            route = self._get_route(start, end)
+        else:
+            provider = self._cache_provider()
+            route = self.cache.get_route(provider, self.mode, start, end)
+            if route is None:
+                route = self._get_route(start, end)
+                self.cache.set_route(provider, self.mode, start, end, route)
+        return Route(self.route_class(route), origin, destination)
+
+    def get_distance_matrix(
+        self, origins, destinations, append_od=False, output="dataframe", dtype=None
+    ):
+        """
+        Return a dataframe with the duration and distance for all combinations of
+        `origins` and `destinations`, origin-major. If `append_od` is True the
+        origin-destination coordinates are added as the first four columns.
+
+        With `append_od="ids"`, the int32 "origin_id" and "destination_id" columns
+        (positions in `origins` and `destinations`) are added instead, and a
+        (dataframe, origins, destinations) tuple is returned, where `origins` and
+        `destinations` are "lat"/"lon" coordinate tables indexed by id. This keeps
+        large matrices compact: two int32 columns instead of four float64 ones.
+
+        With `output="array"`, return a (distances, durations) tuple of
+        (n_origins, n_destinations) NumPy arrays of `dtype` (float64 by default)
+        instead, with NaN where no route was found. Routers with matrix responses
+        (OSRM, Mapbox, ORS) parse these straight from the response, without a
+        dataframe or per-element Python objects.
+
+        With `output="arrow"`, return a `pyarrow.Table` with `dtype` (float32 by
+        default) distance and duration columns and nulls where no route was found,
+        built from the arrays without a dataframe. With `append_od`, it has int32
+        "origin_id" and "destination_id" columns as with `append_od="ids"`, and a
+        (table, origins, destinations) tuple is returned, `origins` and
+        `destinations` being Arrow tables of the points by id (see
+        `gtl.points_to_arrow`). Write them with `pyarrow.parquet.write_table`.
+
+        If the router has a cache, only the pairs missing from it are requested.
+        """
+        if output not in ("dataframe", "array", "arrow"):
+            raise ValueError('output should be "dataframe", "array" or "arrow".')
+        if output == "array" and append_od:
+            raise ValueError('append_od is not supported with output="array".')
+
+        origins = gtl.convert_to_list(origins)
+        destinations = gtl.convert_to_list(destinations)
+
+        if output == "arrow":
+            gtl.import_pyarrow()
+            distances, durations = self.get_distance_matrix(
+                origins, destinations, output="array"
+            )
+            if not append_od:
+                return gtl.distances_to_arrow(
+                    distances.ravel(), durations.ravel(), dtype=dtype or np.float32
+                )
+            origin_ids, destination_ids = self._get_OD_ids(len(origins), len(destinations))
+            return (
+                gtl.distances_to_arrow(
+                    distances.ravel(),
+                    durations.ravel(),
+                    origin_ids,
+                    destination_ids,
+                    dtype=dtype or np.float32,
+                ),
+                gtl.points_to_arrow(origins, "origin_id"),
+                gtl.points_to_arrow(destinations, "destination_id"),
+            )
+
+        # the matrix is requested (and cached) for the snapped points
+        query_origins = self._quantize(origins)
+        query_destinations = self._quantize(destinations)
+        if output == "array":
+            if self.cache is None:
+                distances, durations = self._get_distance_matrix_arrays(
+                    query_origins, query_destinations
+                )
+            else:
+                distances, durations = self._frame_to_arrays(
+                    self._get_cached_distance_matrix(query_origins, query_destinations),
+                    len(origins),
+                    len(destinations),
+                )
+            dtype = dtype or np.float64
+            return (
+                distances.astype(dtype, copy=False),
+                durations.astype(dtype, copy=False),
+            )
+
+        if self.cache is None:
+            distance_matrix = self._get_distance_matrix(query_origins, query_destinations)
+        else:
+            distance_matrix = self._get_cached_distance_matrix(
+                query_origins, query_destinations
+            )
+
+        if append_od == "ids":
+            origin_ids, destination_ids = self._get_OD_ids(len(origins), len(destinations))
+            return self._append_OD_ids(
+                distance_matrix, origin_ids, origins, destination_ids, destinations
+            )
+        if append_od:
+            od_matrix = self._get_OD_matrix(origins, destinations)
+            distance_matrix = pd.concat([od_matrix, distance_matrix], axis=1)
+
+        return distance_matrix
+
+    def _fetch_distance_matrix(self, origins, destinations):
+        """
+        Request the distance matrix from the service, storing the result in the cache.
+        """
+        distance_matrix = self._get_distance_matrix(origins, destinations)
+        if self.cache is not None:
+            od_matrix = self._get_OD_matrix(origins, destinations)
+            self.cache.set_distances(
+                self._cache_provider(),
+                self.mode,
+                od_matrix.values,
+                distance_matrix["duration (s)"].values,
+                distance_matrix["distance (m)"].values,
+            )
+        return distance_matrix
+
+    def _get_cached_distance_matrix(self, origins, destinations):
+        """
+        Serve the matrix from the cache, requesting only the sub-matrix of the origins
+        and destinations that have missing pairs.
+        """
+        od_matrix = self._get_OD_matrix(origins, destinations)
+        found, durations, distances = self.cache.get_distances(
+            self._cache_provider(), self.mode, od_matrix.values
+        )
+
+        missing = ~found.reshape(len(origins), len(destinations))
+        if missing.any():
+            rows = np.flatnonzero(missing.any(axis=1))
+            cols = np.flatnonzero(missing.any(axis=0))
+            fresh = self._fetch_distance_matrix(
+                [origins[i] for i in rows], [destinations[j] for j in cols]
+            )
+            # positions of the fresh sub-matrix in the full, origin-major matrix
+            index = (rows[:, None] * len(destinations) + cols[None, :]).ravel()
+            durations[index] = fresh["duration (s)"].values
+            distances[index] = fresh["distance (m)"].values
+
+        return pd.DataFrame({"distance (m)": distances, "duration (s)": durations})
 
     def get_distances_batch(
-        self, origins, destinations, max_batch_size=25, append_od=False
+        self,
+        origins,
+        destinations,
+        max_batch_size=None,
+        append_od=False,
+        workers=1,
+        errors="raise",
+        plan="rows",
+        output="dataframe",
     ):
         """
         This method returns a Pandas dataframe contains duration and disatnce for all the `origins` and `destinations` pairs. Use this function if you don't want to get duration and distance for all possible combinations between each origin and each destination.
@@ -867,6 +1202,355 @@ class BaseRouter(object):
         The origins and destinations parameters are lists of origin-destination pairs. They should be the same length.
 
         If the `append_od` parameter is set to True, the method also returns the input origin-destination pairs.
+        With `append_od="ids"` it returns a (dataframe, origins, destinations) tuple
+        instead: the dataframe has int32 "origin_id" and "destination_id" columns
+        indexing the unique points in the `origins` and `destinations` coordinate tables.
+
+        `max_batch_size` defaults to the router's `max_batch_size` attribute.
+
+        With `workers` greater than 1 the batches are requested in parallel from a pool
+        of that many threads. The rows of the result always follow the order of the input pairs.
+
+        A batch that fails is retried on its own (up to `batch_retries` times) once the
+        other batches are done. If it still fails, `errors="raise"` raises a RuntimeError,
+        while `errors="coerce"` warns and leaves NaN for the pairs of that batch.
+
+        If the router has a cache, only the pairs missing from it are requested.
+
+        With `plan="rows"` each request is one origin (or destination) and up to
+        `max_batch_size` pairs. `plan="blocks"` packs the pairs into rectangular
+        origins x destinations requests within the router's `max_origins`,
+        `max_destinations`, `max_elements` and `max_coordinates`, usually needing
+        fewer requests, see `gtl.get_batch_od_blocks` and `plan_distances_batch`.
+
+        Each unique pair is requested once. With the `quantize` option pairs whose
+        points snap to the same cells count as one; the `batch_stats` attribute tells
+        how many pairs were collapsed, served from the cache and requested.
+
+        With `output="arrow"` a `pyarrow.Table` with float32 distance and duration
+        columns is returned instead, assembled from the batch results without a
+        dataframe of the pairs. With `append_od` (True or "ids") it has the int32
+        "origin_id" and "destination_id" columns of `append_od="ids"`, and a
+        (table, origins, destinations) tuple is returned, see `get_distance_matrix`.
+        To write large results without holding them in memory, use
+        `write_distances_parquet`.
+        """
+        self._check_batch_output(output)
+        origins, destinations, batches, cached = self._get_batches(
+            origins, destinations, max_batch_size, plan
+        )
+        results = self._map_batches(batches, workers)
+        results = self._retry_failed_batches(batches, results, errors)
+        return self._finish_distances_batch(
+            batches, results, origins, destinations, cached, append_od, output
+        )
+
+    @staticmethod
+    def _check_batch_output(output):
+        """Check the `output` option of `get_distances_batch`."""
+        if output not in ("dataframe", "arrow"):
+            raise ValueError('output should be "dataframe" or "arrow".')
+        if output == "arrow":
+            gtl.import_pyarrow()
+
+    def _finish_distances_batch(
+        self, batches, results, origins, destinations, cached, append_od, output
+    ):
+        """
+        Build the result of `get_distances_batch` from the batch results, as asked
+        by its `append_od` and `output` options.
+        """
+        if output == "arrow":
+            distances, durations = self._assemble_batch_arrays(
+                batches, results, origins, destinations, cached
+            )
+            if not append_od:
+                return gtl.distances_to_arrow(distances, durations)
+            origin_ids, origin_points = gtl.factorize_points(origins)
+            destination_ids, destination_points = gtl.factorize_points(destinations)
+            return (
+                gtl.distances_to_arrow(distances, durations, origin_ids, destination_ids),
+                gtl.points_to_arrow(origin_points, "origin_id"),
+                gtl.points_to_arrow(destination_points, "destination_id"),
+            )
+
+        df = self._assemble_batches(
+            batches,
+            results,
+            origins,
+            destinations,
+            bool(append_od) and append_od != "ids",
+            cached,
+        )
+        if append_od == "ids":
+            return self._append_OD_ids(
+                df,
+                *gtl.factorize_points(origins),
+                *gtl.factorize_points(destinations),
+            )
+        return df
+
+    def write_distances_parquet(
+        self, origins, destinations, path, chunk_size=100000, append_od=True, **kwargs
+    ):
+        """
+        Get the distances of the origin-destination pairs like `get_distances_batch`
+        and write them to a directory of Parquet files, one file per `chunk_size`
+        pairs (`part-00000.parquet`, ...), as the chunks complete. Only one chunk is
+        held in memory at a time, so the result can be larger than memory.
+
+        The files have an int64 "row" column with the position of the pair in the
+        input, int32 "origin_id" and "destination_id" columns (if `append_od` is
+        True) and float32 "distance (m)" and "duration (s)" columns. The ids are the
+        same in all files: the points behind them are written once, at the end, to
+        `_origins.parquet` and `_destinations.parquet` (see `gtl.points_to_arrow`).
+        Read the pairs back with e.g. `pyarrow.parquet.read_table(path)`, Spark or
+        DuckDB, which skip files starting with an underscore.
+
+        Parameters
+        ----------
+        - `origins`, `destinations` : iterable objects
+            The origin-destination pairs, read one chunk at a time.
+
+        - `path` : str or Path
+            The output directory, created if needed.
+
+        - `chunk_size` : int
+            Number of pairs per file.
+
+        - `append_od` : bool
+            Whether to write the origin and destination columns.
+
+        - `**kwargs` :
+            Options passed to `iter_distances_batch`, e.g. `workers`, `plan`, `errors`.
+
+        Returns
+        -------
+        - `files` : list of Path
+            The files written, the pair files and then the point files.
+        """
+        pa = gtl.import_pyarrow()
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        files = []
+        origin_ids, destination_ids = gtl.PointIds(), gtl.PointIds()
+        chunks = self.iter_distances_batch(
+            origins, destinations, chunk_size, append_od=bool(append_od), **kwargs
+        )
+        for df in chunks:
+            od = ()
+            if append_od:
+                od = (
+                    origin_ids.encode(df[OD_COLUMNS[:2]].to_numpy()),
+                    destination_ids.encode(df[OD_COLUMNS[2:]].to_numpy()),
+                )
+            table = gtl.distances_to_arrow(
+                df["distance (m)"].to_numpy(), df["duration (s)"].to_numpy(), *od
+            )
+            table = table.add_column(0, "row", pa.array(df.index.to_numpy(np.int64)))
+            files.append(path / ("part-%05d.parquet" % len(files)))
+            pa.parquet.write_table(table, files[-1])
+        if append_od:
+            for name, ids, id_column in (
+                ("_origins.parquet", origin_ids, "origin_id"),
+                ("_destinations.parquet", destination_ids, "destination_id"),
+            ):
+                files.append(path / name)
+                pa.parquet.write_table(gtl.points_to_arrow(ids.points, id_column), files[-1])
+        return files
+
+    def iter_distances_batch(
+        self,
+        origins,
+        destinations,
+        chunk_size=10000,
+        max_batch_size=None,
+        append_od=False,
+        workers=1,
+        errors="raise",
+        plan="rows",
+    ):
+        """
+        Streaming version of `get_distances_batch`: yields one dataframe per
+        `chunk_size` consecutive input pairs, in input order, as soon as the chunk is
+        complete. The index of each dataframe holds the positions of its pairs in the
+        input, so chunks can be written out (e.g. appended to a file) as they come and
+        memory stays bounded by the chunk size.
+
+        `origins` and `destinations` may be any iterables of points, including
+        generators; they are read one chunk at a time. With `workers` greater than 1,
+        the requests of the next chunk are already running while a chunk is consumed.
+
+        Pairs are deduplicated (and `batch_stats` computed) within a chunk. The other
+        options are the same as for `get_distances_batch`, except `append_od="ids"`:
+        point ids would only be unique within a chunk (`write_distances_parquet`
+        numbers the points of all chunks).
+        """
+        if append_od == "ids":
+            raise ValueError(
+                'append_od="ids" is not supported when streaming, use append_od=True.'
+            )
+        executor = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+
+        def start_chunk(start, chunk):
+            chunk = self._get_batches(*chunk, max_batch_size=max_batch_size, plan=plan)
+            futures = None
+            if executor is not None:
+                futures = [
+                    executor.submit(self._try_distance_matrix, batch)
+                    for batch in chunk[2]
+                ]
+            return start, chunk, futures
+
+        def finish_chunk(start, chunk, futures):
+            chunk_origins, chunk_destinations, batches, cached = chunk
+            if futures is None:
+                results = self._map_batches(batches)
+            else:
+                results = [future.result() for future in futures]
+            results = self._retry_failed_batches(batches, results, errors)
+            df = self._assemble_batches(
+                batches, results, chunk_origins, chunk_destinations, append_od, cached
+            )
+            df.index = pd.RangeIndex(start, start + len(df))
+            return df
+
+        try:
+            pending = deque()
+            start = 0
+            for chunk in self._iter_chunks(origins, destinations, chunk_size):
+                pending.append(start_chunk(start, chunk))
+                start += len(chunk[0])
+                # keep one chunk in flight while the previous one is consumed
+                if len(pending) > 1 or executor is None:
+                    yield finish_chunk(*pending.popleft())
+            while pending:
+                yield finish_chunk(*pending.popleft())
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    @staticmethod
+    def _iter_chunks(origins, destinations, chunk_size):
+        """
+        Read (origins, destinations) lists of at most `chunk_size` pairs from two iterables.
+        Arrays and dataframes are read row by row.
+        """
+        origins = gtl.convert_to_list(origins)
+        destinations = gtl.convert_to_list(destinations)
+        missing = object()
+        pairs = itertools.zip_longest(origins, destinations, fillvalue=missing)
+        while True:
+            chunk = list(itertools.islice(pairs, chunk_size))
+            if not chunk:
+                return
+            chunk_origins, chunk_destinations = zip(*chunk)
+            if any(p is missing for p in chunk_origins + chunk_destinations):
+                raise ValueError(
+                    "The origins and destinations should have the same length."
+                )
+            yield list(chunk_origins), list(chunk_destinations)
+
+    def _limit_batch_size(self, max_batch_size=None):
+        """
+        The `max_batch_size` asked by the caller, at most the router's own limit.
+        """
+        if max_batch_size is None:
+            return self.max_batch_size
+        return min(max_batch_size, self.max_batch_size)
+
+    def _try_distance_matrix(self, batch):
+        """
+        Get the distance matrix of one batch, returning the exception instead of raising it
+        if the request failed. Other errors (a bad response, a bug) are raised.
+        """
+        try:
+            return self._fetch_distance_matrix(batch[0], batch[1])
+        except self.batch_errors as exc:
+            return exc
+
+    def _is_transient_error(self, exc):
+        """
+        Whether a failed request (one of `batch_errors`) is worth sending again,
+        see `is_transient_error`.
+        """
+        retry = getattr(self, "retry", None)
+        status_forcelist = retry.status_forcelist if retry else RETRY_STATUSES
+        return is_transient_error(exc, status_forcelist)
+
+    def _is_transient_failure(self, result):
+        """
+        Whether a batch result is a failure worth retrying.
+        """
+        return isinstance(result, Exception) and self._is_transient_error(result)
+
+    def _map_batches(self, batches, workers=1):
+        """
+        Get the distance matrix for each batch, using a thread pool if `workers` > 1.
+        The results are returned in the order of the batches; failed batches hold the exception.
+        """
+        if workers > 1 and len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(self._try_distance_matrix, batches))
+        return [self._try_distance_matrix(batch) for batch in batches]
+
+    def _retry_failed_batches(self, batches, results, errors="raise"):
+        """
+        Retry the batches that failed transiently one by one, then handle those that
+        still fail. Permanent failures, such as a 4xx response, are not sent again.
+        """
+        for _ in range(self.batch_retries):
+            failed = [i for i, res in enumerate(results) if self._is_transient_failure(res)]
+            if not failed:
+                break
+            for i in failed:
+                results[i] = self._try_distance_matrix(batches[i])
+        return self._check_failed_batches(batches, results, errors)
+
+    def _check_failed_batches(self, batches, results, errors="raise"):
+        """
+        Raise for batches that failed after all retries, or replace them with NaN if `errors="coerce"`.
+        """
+        failed = [i for i, res in enumerate(results) if isinstance(res, Exception)]
+        if not failed:
+            return results
+
+        message = "%d of %d batches failed after %d retries: %r" % (
+            len(failed),
+            len(batches),
+            self.batch_retries,
+            results[failed[0]],
+        )
+        if errors != "coerce":
+            raise RuntimeError(message) from results[failed[0]]
+
+        warnings.warn(message + "; their pairs are left as NaN.")
+        results = list(results)
+        for i in failed:
+            n = len(batches[i][0]) * len(batches[i][1])
+            results[i] = pd.DataFrame(
+                {"distance (m)": [np.nan] * n, "duration (s)": [np.nan] * n}
+            )
+        return results
+
+    def plan_distances_batch(
+        self, origins, destinations, max_batch_size=None, plan="blocks"
+    ):
+        """
+        Plan the requests of `get_distances_batch` without sending them, and return
+        the counts of `batch_stats`. Its "plan" entry reports the number of requests,
+        elements, wasted elements and efficiency, compared to the default plan.
+        """
+        self._get_batches(origins, destinations, max_batch_size, plan)
+        return self.batch_stats
+
+    def _get_batches(self, origins, destinations, max_batch_size=None, plan="rows"):
+        """
+        Validate the origin-destination pairs and divide them into batches.
+
+        Only the unique (quantized) pairs are divided into batches. With a cache, the
+        pairs found in it are returned as a dataframe (`cached`) and only the others
+        are divided into batches. The counts are kept in `batch_stats`.
         """
 
         # convert the origins and destinations to lists
@@ -879,42 +1563,138 @@ class BaseRouter(object):
                 "The origins and destinations should have the same length."
             )
 
+        if max_batch_size is None:
+            max_batch_size = self.max_batch_size
+        if self.max_coordinates is not None:
+            # a request of one origin (or destination) and its batch of points
+            max_batch_size = min(max_batch_size, self.max_coordinates - 1)
+        if plan not in ("rows", "blocks"):
+            raise ValueError('plan should be "rows" or "blocks".')
+
+        pairs = np.unique(self._get_pair_keys(origins, destinations), axis=0)
+        if self.quantize is None:
+            unique_pairs = len(pairs)
+        else:
+            unique_pairs = len(np.unique(self._stack_pairs(origins, destinations), axis=0))
+        stats = {
+            "pairs": len(origins),
+            "unique_pairs": unique_pairs,
+            "collapsed_pairs": unique_pairs - len(pairs),
+            "cached_pairs": 0,
+        }
+
+        cached = None
+        if self.cache is not None and len(pairs) > 0:
+            found, durations, distances = self.cache.get_distances(
+                self._cache_provider(), self.mode, pairs
+            )
+            cached = pd.DataFrame(pairs[found], columns=OD_COLUMNS)
+            cached["distance (m)"] = distances[found]
+            cached["duration (s)"] = durations[found]
+            stats["cached_pairs"] = int(found.sum())
+            pairs = pairs[~found]
+        stats["requested_pairs"] = len(pairs)
+        self.batch_stats = stats
+
         # divide the origins and destinations into batches
+        batches = []
+        if len(pairs) > 0:
+            batches = gtl.get_batch_od_pairs(pairs[:, :2], pairs[:, 2:], max_batch_size)
+        baseline = None
+        if plan == "blocks" and len(pairs) > 0:
+            baseline = batches
+            origin_points, destination_points, blocks = gtl.get_batch_od_blocks(
+                pairs[:, :2],
+                pairs[:, 2:],
+                max_origins=self.max_origins,
+                max_destinations=self.max_destinations,
+                max_elements=(
+                    max_batch_size if self.max_elements is None else self.max_elements
+                ),
+                min_fill=self.min_fill,
+                max_coordinates=self.max_coordinates,
+            )
+            batches = gtl.batch_ids_to_points(origin_points, destination_points, blocks)
+        stats["plan"] = gtl.get_batch_plan_report(batches, len(pairs), baseline)
+        return origins, destinations, batches, cached
 
-        batches = gtl.get_batch_od_pairs(origins, destinations, max_batch_size)
+    def _assemble_batches(
+        self, batches, results, origins, destinations, append_od=False, cached=None
+    ):
+        """
+        Combine the per-batch distance matrices (and the pairs served from the cache)
+        into the result of `get_distances_batch`.
 
-        # get the distance matrix for each batch
-        results = []
-        for batch in batches:
-            res = self.get_distance_matrix(batch[0], batch[1])
-            results.append(res)
+        Every batch result is a full origin x destination matrix. Its rows are keyed by
+        their coordinates and looked up for each input pair, so the output has one row
+        per input pair, in input order.
+        """
+        distances, durations = self._assemble_batch_arrays(
+            batches, results, origins, destinations, cached
+        )
+        df = pd.DataFrame({"distance (m)": distances, "duration (s)": durations})
+        if append_od:
+            # report the input coordinates rather than the snapped ones
+            od = self._stack_pairs(origins, destinations)
+            df = pd.concat([pd.DataFrame(od, columns=OD_COLUMNS), df], axis=1)
+        return df
 
-        # concatenate the results
-        df = pd.concat(results, axis=0)
-        # revert the order of the rows
-        df = df.iloc[::-1]
+    def _assemble_batch_arrays(self, batches, results, origins, destinations, cached=None):
+        """
+        The (distances, durations) arrays of `_assemble_batches`, one value per input
+        pair, NaN for pairs without a result.
+        """
+        keys, _ = self._batch_keys(batches, cached)
+        distances, durations = [np.zeros(0)], [np.zeros(0)]
+        for res in ([] if cached is None else [cached]) + list(results):
+            distances.append(res["distance (m)"].to_numpy(dtype=float))
+            durations.append(res["duration (s)"].to_numpy(dtype=float))
+        position = self._match_pairs(keys, self._get_pair_keys(origins, destinations))
+        found = position >= 0
+        return (
+            np.where(found, np.concatenate(distances)[position], np.nan),
+            np.where(found, np.concatenate(durations)[position], np.nan),
+        )
 
-        if append_od:
-            # convert the origins and destinations to numpy arrays
-            origins = np.array(origins)
-            destinations = np.array(destinations)
-            df["origin_lat"] = origins[:, 0]
-            df["origin_lon"] = origins[:, 1]
-            df["destination_lat"] = destinations[:, 0]
-            df["destination_lon"] = destinations[:, 1]
-
-            df = df[
-                [
-                    "origin_lat",
-                    "origin_lon",
-                    "destination_lat",
-                    "destination_lon",
-                    "distance (m)",
-                    "duration (s)",
-                ]
-            ]
+    def _batch_keys(self, batches, cached=None):
+        """
+        The (quantized) coordinates of the pairs of the cached dataframe and of the
+        batch matrices (origin-major), as an (n, 4) array, in the order of their
+        results, and the batch of each pair (-1 for cached pairs).
+        """
+        keys, owners = [np.zeros((0, 4))], [np.zeros(0, dtype=np.int64)]
+        if cached is not None:
+            keys.append(cached[OD_COLUMNS].to_numpy(dtype=float))
+            owners.append(np.full(len(cached), -1))
+        for i, batch in enumerate(batches):
+            batch_origins = np.asarray(batch[0], dtype=float).reshape(-1, 2)
+            batch_destinations = np.asarray(batch[1], dtype=float).reshape(-1, 2)
+            keys.append(
+                self._stack_pairs(
+                    np.repeat(batch_origins, len(batch_destinations), axis=0),
+                    np.tile(batch_destinations, (len(batch_origins), 1)),
+                )
+            )
+            owners.append(np.full(len(batch_origins) * len(batch_destinations), i))
+        return np.concatenate(keys), np.concatenate(owners)
 
-        return df
+    @staticmethod
+    def _match_pairs(keys, pair_keys):
+        """
+        The position in `keys` of the first row equal to each row of `pair_keys`, -1
+        if there is none.
+
+        Both are encoded as integer keys with one `np.unique`, so the pairs are
+        matched without a dataframe join.
+        """
+        # + 0.0 turns -0.0 into 0.0, which a join treats as equal
+        _, codes = np.unique(
+            np.concatenate([keys, pair_keys]) + 0.0, axis=0, return_inverse=True
+        )
+        codes = codes.ravel()
+        first = np.full(codes.max() + 1 if len(codes) else 0, -1)
+        first[codes[: len(keys)][::-1]] = np.arange(len(keys))[::-1]
+        return first[codes[len(keys) :]]
 
 
 # add documenation for the class
@@ -922,28 +1702,239 @@ class WebRouter(BaseRouter):
     """
     The WebRouter class is a class for handling a route obtained from a web-based routing service.
 
+    All requests go through a pooled `requests.Session`. By default routers share one
+    process-wide session per pool configuration, so TCP/TLS connections are kept alive
+    and reused across requests and across router instances.
+
+    Parameters
+    ----------
+    - `session` : requests.Session
+        A session to use for all requests. If None, a shared pooled session is used.
+
+    - `pool_connections` : int
+        Number of per-host connection pools to keep.
+
+    - `pool_maxsize` : int
+        Maximum number of keep-alive connections per host.
+
+    - `keep_alive` : bool
+        Whether to keep connections open between requests.
+
+    - `rate_limit` : dict, RateLimiter or bool
+        Client-side rate limit. By default all routers of the same class share one
+        limiter built from the class attribute `rate_limit`. Pass a dict such as
+        `{"requests_per_second": 10, "elements_per_second": 500}` or a `RateLimiter`
+        to override it for this instance, or False to disable rate limiting.
+
+    - `retry` : RetryPolicy or bool
+        How transient failures (connection errors, timeouts, 429 and 5xx responses)
+        are retried. Defaults to `RetryPolicy()`; pass False to never retry.
+
+    - `cache` : str, SQLiteCache, MemoryCache or None
+        Where results are cached. "memory" keeps them in an in-process LRU cache, a
+        path opens a `SQLiteCache` at that file; None disables caching. See
+        `cache_info()` for the cache statistics.
+
+    - `quantize` : float or dict
+        Snap coordinates before caching and requesting them, so near-identical points
+        share one query. A number is the grid size in meters; a dict is passed to
+        `gtl.quantize_coordinates`, e.g. `{"geohash_precision": 9}`.
+
+    - `json_decoder` : str or callable
+        How response bodies are decoded: "orjson", "simdjson", "ujson", "json" or a
+        function taking the body bytes. Defaults to the fastest installed decoder,
+        see `gtl.get_json_decoder`.
+
     """
 
+    # provider limits, e.g. {"requests_per_second": 10, "elements_per_second": 1000}
+    rate_limit = None
+
     def __init__(
-        self, api_key, mode="driving", timeout=10, language="en", base_url=None
+        self,
+        api_key,
+        mode="driving",
+        timeout=10,
+        language="en",
+        base_url=None,
+        session=None,
+        pool_connections=gtl.DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize=gtl.DEFAULT_POOL_MAXSIZE,
+        keep_alive=True,
+        rate_limit=None,
+        retry=None,
+        cache=None,
+        quantize=None,
+        json_decoder=None,
     ):
         self.api_key = api_key
         self.timeout = timeout
         self.language = language
-        super().__init__(mode=mode)
+        if session is None:
+            session = gtl.get_http_session(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                keep_alive=keep_alive,
+            )
+        self.session = session
+        self.rate_limiter = self._get_rate_limiter(rate_limit)
+        if retry is None or retry is True:
+            retry = RetryPolicy()
+        elif retry is False:
+            retry = RetryPolicy(max_attempts=1)
+        self.retry = retry
+        self.json_decoder = gtl.get_json_decoder(json_decoder)
+        super().__init__(mode=mode, cache=cache, quantize=quantize)
+
+    def _get_rate_limiter(self, rate_limit=None):
+        """
+        Resolve the `rate_limit` option to a `RateLimiter` (or None for no limit).
+        """
+        if rate_limit is False:
+            return None
+        if isinstance(rate_limit, RateLimiter):
+            return rate_limit
+        if isinstance(rate_limit, dict):
+            return RateLimiter(**rate_limit)
+        if self.rate_limit:
+            return get_shared_rate_limiter(type(self).__name__, **self.rate_limit)
+        return None
+
+    def _throttle(self, elements=1):
+        """
+        Wait until a request for `elements` matrix elements is allowed by the rate limiter.
+        """
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(elements)
 
-    def _get_request(self, url):
+    def _send(self, method, url, elements=1, idempotent=None, **kwargs):
+        """
+        Send a request through the pooled session, applying the rate limit before
+        every attempt and retrying transient failures according to `self.retry`.
+        """
+        response = send_with_retry(
+            self.session,
+            method,
+            url,
+            self.retry,
+            idempotent=idempotent,
+            before_attempt=lambda: self._throttle(elements),
+            timeout=self.timeout,
+            **kwargs,
+        )
+        return self.json_decoder(response.content)
+
+    def _get_request(self, url, elements=1):
         """
         Helper function to make a request to the web-based routing service.
+        `elements` is the number of matrix elements the request asks for, used for rate limiting.
+        Raises `requests.HTTPError` if the service still answers with an error after retrying.
         """
+        return self._send("GET", url, elements=elements)
 
-        try:
-            response = requests.get(url, timeout=self.timeout)
-            response.raise_for_status()
-        except requests.exceptions.HTTPError as errh:
-            print("Http Error:", errh)
+    def _post_request(self, url, payload, headers=None, elements=1):
+        """
+        Helper function to send a JSON POST request to the web-based routing service.
+        Routing queries do not change server state, so they are retried like GET requests.
+        """
+        return self._send(
+            "POST",
+            url,
+            elements=elements,
+            idempotent=True,
+            json=payload,
+            headers=headers,
+        )
+
+    async def aget_route(self, origin, destination):
+        """
+        Asynchronous version of `get_route`.
+
+        The request runs in a worker thread so that it does not block the event loop.
+        Use `await router.aget_route(...)` in Jupyter, or `asyncio.run(...)` in scripts.
+        """
+        return await asyncio.to_thread(self.get_route, origin, destination)
+
+    async def aget_distance_matrix(
+        self, origins, destinations, append_od=False, **kwargs
+    ):
+        """
+        Asynchronous version of `get_distance_matrix`.
+        """
+        return await asyncio.to_thread(
+            self.get_distance_matrix, origins, destinations, append_od, **kwargs
+        )
+
+    async def aget_distances_batch(
+        self,
+        origins,
+        destinations,
+        append_od=False,
+        max_batch_size=None,
+        concurrency=DEFAULT_CONCURRENCY,
+        errors="raise",
+        plan="rows",
+        output="dataframe",
+    ):
+        """
+        Asynchronous version of `get_distances_batch`.
+
+        The batches are requested concurrently from a pool of `concurrency` threads
+        of its own, so at most `concurrency` requests are in flight at a time. The
+        result is identical to `get_distances_batch`, with rows in the same order
+        as the input pairs.
 
-        return response.json()
+        Parameters
+        ----------
+        - `origins` : iterable objects
+            The origin points, one per origin-destination pair.
+
+        - `destinations` : iterable objects
+            The destination points, one per origin-destination pair.
+
+        - `append_od` : bool or "ids"
+            If True, the method also returns the input origin-destination pairs, see
+            `get_distances_batch`.
+
+        - `max_batch_size` : int
+            Maximum pairs per matrix request. Defaults to the router's `max_batch_size`.
+
+        - `concurrency` : int
+            Maximum number of requests in flight at the same time.
+
+        - `errors` : str
+            What to do with batches that still fail after retrying them, see `get_distances_batch`.
+
+        - `plan` : str
+            How pairs are grouped into requests, "rows" or "blocks", see `get_distances_batch`.
+
+        - `output` : str
+            "dataframe" or "arrow", see `get_distances_batch`.
+
+        Returns
+        -------
+        - `distance_matrix` : pandas.DataFrame
+            A pandas DataFrame containing the distances for each OD pair.
+        """
+        self._check_batch_output(output)
+        origins, destinations, batches, cached = self._get_batches(
+            origins, destinations, max_batch_size, plan
+        )
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=max(int(concurrency), 1)) as executor:
+            # gather keeps the results in the order of the batches
+            results = await asyncio.gather(
+                *(
+                    loop.run_in_executor(executor, self._try_distance_matrix, batch)
+                    for batch in batches
+                )
+            )
+            results = await loop.run_in_executor(
+                executor, self._retry_failed_batches, batches, list(results), errors
+            )
+        return self._finish_distances_batch(
+            batches, results, origins, destinations, cached, append_od, output
+        )
 
 
 # make a class for local router
@@ -1,8 +1,5 @@
-import requests
 import pandas as pd
-import georouting.utils as gtl
-from georouting.routers.base import WebRouter, Route, BingRoute
-import json
+from georouting.routers.base import WebRouter, BingRoute
 
 # from georouting.routers.base import BaseRouter
 
@@ -30,6 +27,9 @@ class BingRouter(WebRouter):
     - `language` : str
         The language to be used in API requests.
 
+    - `**kwargs` :
+        Options passed to `WebRouter`, e.g. `session`, `pool_maxsize`, `rate_limit`, `retry`, `cache`, `json_decoder`.
+
 
     Returns
     -------
@@ -38,8 +38,18 @@ class BingRouter(WebRouter):
 
     """
 
-    def __init__(self, api_key, mode="driving", timeout=10, language="en"):
-        super().__init__(api_key, mode=mode, timeout=timeout, language=language)
+    # Bing allows 650 pairs per request for all account types and travel modes
+    max_batch_size = 650
+
+    # Bing limits pairs per request (see max_batch_size), keep the request rate modest
+    rate_limit = {"requests_per_second": 10}
+
+    route_class = BingRoute
+
+    def __init__(self, api_key, mode="driving", timeout=10, language="en", **kwargs):
+        super().__init__(
+            api_key, mode=mode, timeout=timeout, language=language, **kwargs
+        )
         self.base_url = "https://dev.virtualearth.net/REST/v1/Routes/"
 
     def _get_directions_url(self, origin, destination):
@@ -83,6 +93,15 @@ class BingRouter(WebRouter):
         df.columns = ["distance (m)", "duration (s)"]
         return df
 
+    def _get_route(self, origin, destination):
+        url = self._get_directions_url(origin, destination)
+        return self._get_request(url)
+
+    def _get_distance_matrix(self, origins, destinations):
+        url = self._get_matrix_distance_url(origins, destinations)
+        res = self._get_request(url, elements=len(origins) * len(destinations))
+        return self._parse_distance_matrix(res)
+
     def get_route(self, origin, destination):
         """
         This method returns a Route object representing the route between the origin and destination points.
@@ -111,13 +130,9 @@ class BingRouter(WebRouter):
         - `get_route_geodataframe()` returns the route as a GeoDataFrame.
 
         """
+        return super().get_route(origin, destination)
 
-        url = self._get_directions_url(origin, destination)
-        route = super()._get_request(url)
-        route = Route(BingRoute(route), origin, destination)
-        return route
-
-    def get_distance_matrix(self, origins, destinations, append_od=False):
+    def get_distance_matrix(self, origins, destinations, append_od=False, **kwargs):
         """
         This method returns a Pandas dataframe representing a distance matrix between the `origins` and `destinations` points. It returns the duration and distance for
         all possible combinations between each origin and each destination. If you want just
@@ -152,27 +167,20 @@ class BingRouter(WebRouter):
         - `append_od` : bool
             If True, the method also returns a matrix of origin-destination pairs.
 
+        - `**kwargs` :
+            Further options of `BaseRouter.get_distance_matrix`, e.g. `output="array"` to
+            get (distances, durations) NumPy arrays.
+
         Returns
         -------
         - `distance_matrix` : pandas.DataFrame
             A pandas DataFrame containing the distance matrix.
         """
+        return super().get_distance_matrix(
+            origins, destinations, append_od=append_od, **kwargs
+        )
 
-        # check if the origins and destinations is numpy array
-        # if so, convert it to list
-        origins = gtl.convert_to_list(origins)
-        destinations = gtl.convert_to_list(destinations)
-
-        url = self._get_matrix_distance_url(origins, destinations)
-        res = super()._get_request(url)
-        distance_matrix = self._parse_distance_matrix(res)
-        if append_od:
-            od_matrix = super()._get_OD_matrix(origins, destinations)
-            distance_matrix = pd.concat([od_matrix, distance_matrix], axis=1)
-
-        return distance_matrix
-
-    def get_distances_batch(self, origins, destinations, append_od=False):
+    def get_distances_batch(self, origins, destinations, append_od=False, **kwargs):
         """
         This method returns a Pandas dataframe contains duration and disatnce for all the `origins` and `destinations` pairs. Use this function if you don't want to get duration and distance for all possible combinations between each origin and each destination.
 
@@ -195,12 +203,20 @@ class BingRouter(WebRouter):
         - `append_od` : bool
             If True, the method also returns the input origin-destination pairs.
 
+        - `**kwargs` :
+            Further options of `BaseRouter.get_distances_batch`, e.g. `workers` to
+            request the batches from a pool of threads.
+
         Returns
         -------
         - `distance_matrix` : pandas.DataFrame
             A pandas DataFrame containing the distance matrix.
 
         """
+        kwargs["max_batch_size"] = self._limit_batch_size(kwargs.get("max_batch_size"))
         return super().get_distances_batch(
-            origins, destinations, max_batch_size=650, append_od=append_od
+            origins,
+            destinations,
+            append_od=append_od,
+            **kwargs,
         )
@@ -1,7 +1,4 @@
-import requests
-import json
-from georouting.routers.base import WebRouter, Route, EsriRoute
-import georouting.utils as gtl
+from georouting.routers.base import WebRouter, EsriRoute
 import pandas as pd
 
 
@@ -26,6 +23,9 @@ class EsriRouter(WebRouter):
     - `language` : str
         The language to be used in API requests.
 
+    - `**kwargs` :
+        Options passed to `WebRouter`, e.g. `session`, `pool_maxsize`, `rate_limit`, `retry`, `cache`, `json_decoder`.
+
     Returns
     -------
     - `EsriRouter`:
@@ -33,7 +33,12 @@ class EsriRouter(WebRouter):
 
     """
 
-    def __init__(self, api_key, mode="driving", timeout=10, language="en"):
+    # ArcGIS location services do not publish a per-second limit
+    rate_limit = None
+
+    route_class = EsriRoute
+
+    def __init__(self, api_key, mode="driving", timeout=10, language="en", **kwargs):
         """
         This is the constructor method for the EsriRouter class.
         It initializes the class by calling the super() method and setting up
@@ -42,7 +47,9 @@ class EsriRouter(WebRouter):
         The timeout parameter sets the timeout in seconds for API requests, and the language
         parameter sets the language to be used in API requests.
         """
-        super().__init__(api_key, mode=mode, timeout=timeout, language=language)
+        super().__init__(
+            api_key, mode=mode, timeout=timeout, language=language, **kwargs
+        )
         self.base_url = "https://route-api.arcgis.com/arcgis/rest/services/World/Route/NAServer/Route_World/solve"
 
     def _get_directions_url(self, origin, destination):
@@ -121,6 +128,15 @@ class EsriRouter(WebRouter):
 
         return df
 
+    def _get_route(self, origin, destination):
+        url = self._get_directions_url(origin, destination)
+        return self._get_request(url)
+
+    def _get_distance_matrix(self, origins, destinations):
+        url = self._get_matrix_distance_url(origins, destinations)
+        res = self._get_request(url, elements=len(origins) * len(destinations))
+        return self._parse_distance_matrix(res, len(origins), len(destinations))
+
     def get_route(self, origin, destination):
         """
         This method returns a Route object representing the route between the origin and destination points.
@@ -149,13 +165,9 @@ class EsriRouter(WebRouter):
         - `get_route_geodataframe()` returns the route as a GeoDataFrame.
 
         """
-        url = self._get_directions_url(origin, destination)
-        route = super()._get_request(url)
-        route = Route(EsriRoute(route), origin=origin, destination=destination)
+        return super().get_route(origin, destination)
 
-        return route
-
-    def get_distance_matrix(self, origins, destinations, append_od=False):
+    def get_distance_matrix(self, origins, destinations, append_od=False, **kwargs):
         """
         This method returns a distance matrix between the origins and destinations.
         The origins and destinations parameters are lists of tuples/lists/arrays representing the starting and ending points for the route.
@@ -173,25 +185,16 @@ class EsriRouter(WebRouter):
         - `append_od` : bool
             If True, the origins and destinations will be appended to the distance matrix as the first two columns.
 
+        - `**kwargs` :
+            Further options of `BaseRouter.get_distance_matrix`, e.g. `output="array"` to
+            get (distances, durations) NumPy arrays.
+
         Returns
         -------
         - `distance_matrix` : list of lists
             The distance matrix between the origins and destinations.
 
         """
-
-        # check if the origins and destinations is numpy array
-        # if so, convert it to list
-        origins = gtl.convert_to_list(origins)
-        destinations = gtl.convert_to_list(destinations)
-
-        url = self._get_matrix_distance_url(origins, destinations)
-        res = super()._get_request(url)
-
-        distance_matrix = self._parse_distance_matrix(res, len(origins), len(destinations))
-
-        if append_od:
-            od_matrix = super()._get_OD_matrix(origins, destinations)
-            distance_matrix = pd.concat([od_matrix, distance_matrix], axis=1)
-
-        return distance_matrix
+        return super().get_distance_matrix(
+            origins, destinations, append_od=append_od, **kwargs
+        )
@@ -1,8 +1,8 @@
 import googlemaps
+import googlemaps.exceptions
 import pandas as pd
-from georouting.routers.base import WebRouter, Route, GoogleRoute
-import georouting.utils as gtl
-import numpy as np
+from requests.exceptions import RequestException
+from georouting.routers.base import WebRouter, GoogleRoute
 
 
 class GoogleRouter(WebRouter):
@@ -27,6 +27,9 @@ class GoogleRouter(WebRouter):
     - `language` : str
         The language to be used in API requests.
 
+    - `**kwargs` :
+        Options passed to `WebRouter`, e.g. `session`, `pool_maxsize`, `rate_limit`, `retry`, `cache`, `json_decoder`.
+
     Returns
     -------
     - `GoogleRouter`:
@@ -34,7 +37,31 @@ class GoogleRouter(WebRouter):
 
     """
 
-    def __init__(self, api_key, mode="driving", timeout=10, language="en"):
+    # Google allows at most 25 origins or 25 destinations per request
+    max_batch_size = 25
+
+    # and at most 100 elements (origins x destinations) per request
+    max_origins = 25
+    max_destinations = 25
+    max_elements = 100
+
+    # Distance Matrix API allows 1000 elements per second
+    rate_limit = {"requests_per_second": 50, "elements_per_second": 1000}
+
+    route_class = GoogleRoute
+
+    # the googlemaps client raises its own exceptions for failed requests
+    batch_errors = (
+        RequestException,
+        googlemaps.exceptions.ApiError,
+        googlemaps.exceptions.TransportError,
+        googlemaps.exceptions.Timeout,
+    )
+
+    # API statuses of a request that may succeed when sent again
+    transient_statuses = ("OVER_QUERY_LIMIT", "UNKNOWN_ERROR")
+
+    def __init__(self, api_key, mode="driving", timeout=10, language="en", **kwargs):
         """
         This is the constructor method for the GoogleRouter class.
         It initializes the class by calling the super() method and setting up
@@ -43,8 +70,24 @@ class GoogleRouter(WebRouter):
         The timeout parameter sets the timeout in seconds for API requests, and the language
         parameter sets the language to be used in API requests.
         """
-        super().__init__(api_key, mode=mode)
-        self.client = googlemaps.Client(key=self.api_key)
+        super().__init__(
+            api_key, mode=mode, timeout=timeout, language=language, **kwargs
+        )
+        self.client = googlemaps.Client(key=self.api_key, requests_session=self.session)
+
+    def _is_transient_error(self, exc):
+        """
+        Whether a failed request is worth sending again: timeouts, transport
+        errors, HTTP errors with a retried status and API errors with one of
+        `transient_statuses`.
+        """
+        if isinstance(exc, googlemaps.exceptions.HTTPError):
+            return exc.status_code in self.retry.status_forcelist
+        if isinstance(exc, (googlemaps.exceptions.Timeout, googlemaps.exceptions.TransportError)):
+            return True
+        if isinstance(exc, googlemaps.exceptions.ApiError):
+            return exc.status in self.transient_statuses
+        return super()._is_transient_error(exc)
 
     def _get_directions_request(self, origin, destination):
         """
@@ -52,6 +95,7 @@ class GoogleRouter(WebRouter):
         It takes two parameters, origin and destination, which represent the starting and ending
         points for the route.
         """
+        self._throttle()
         return self.client.directions(origin, destination, self.mode)
 
     def _get_distance_matrix_request(self, origins, destinations):
@@ -60,6 +104,7 @@ class GoogleRouter(WebRouter):
         It takes two parameters, origins and destinations, which represent the starting and ending
         points for each pair of routes in the matrix.
         """
+        self._throttle(len(origins) * len(destinations))
         return self.client.distance_matrix(origins, destinations, self.mode)
 
     def _parse_distance_matrix(self, json_data):
@@ -83,6 +128,13 @@ class GoogleRouter(WebRouter):
 
         return df
 
+    def _get_route(self, origin, destination):
+        return self._get_directions_request(origin, destination)
+
+    def _get_distance_matrix(self, origins, destinations):
+        res = self._get_distance_matrix_request(origins, destinations)
+        return self._parse_distance_matrix(res)
+
     def get_route(self, origin, destination):
         """
         This method returns a Route object representing the route between the origin and destination points.
@@ -111,13 +163,9 @@ class GoogleRouter(WebRouter):
         - `get_route()` returns the raw route data returned as a dictionary.
         - `get_route_geodataframe()` returns the route as a GeoDataFrame.
         """
+        return super().get_route(origin, destination)
 
-        route = self._get_directions_request(origin, destination)
-        route = Route(GoogleRoute(route), origin, destination)
-
-        return route
-
-    def get_distance_matrix(self, origins, destinations, append_od=False):
+    def get_distance_matrix(self, origins, destinations, append_od=False, **kwargs):
         """
         This method returns a Pandas dataframe representing a distance matrix between the `origins` and `destinations` points. It returns the duration and distance for
         all possible combinations between each origin and each destination. If you want just
@@ -151,6 +199,10 @@ class GoogleRouter(WebRouter):
         - `append_od` : bool
             If True, the method also returns a matrix of origin-destination pairs.
 
+        - `**kwargs` :
+            Further options of `BaseRouter.get_distance_matrix`, e.g. `output="array"` to
+            get (distances, durations) NumPy arrays.
+
         Returns
         -------
         - `distance_matrix` : pandas.DataFrame
@@ -160,20 +212,11 @@ class GoogleRouter(WebRouter):
         # TODO: add example
 
         """
+        return super().get_distance_matrix(
+            origins, destinations, append_od=append_od, **kwargs
+        )
 
-        # Check if the origins and destinations parameters are lists
-        # if ther are numpy arrays, convert them to lists
-        origins = gtl.convert_to_list(origins)
-        destinations = gtl.convert_to_list(destinations)
-
-        res = self._get_distance_matrix_request(origins, destinations)
-        df = self._parse_distance_matrix(res)
-        if append_od:
-            od_matrix = super()._get_OD_matrix(origins, destinations)
-            df = pd.concat([od_matrix, df], axis=1)
-        return df
-
-    def get_distances_batch(self, origins, destinations, append_od=False):
+    def get_distances_batch(self, origins, destinations, append_od=False, **kwargs):
         """
         This method returns a Pandas dataframe contains duration and disatnce for all the `origins` and `destinations` pairs. Use this function if you don't want to get duration and distance for all possible combinations between each origin and each destination.
 
@@ -196,12 +239,20 @@ class GoogleRouter(WebRouter):
         - `append_od` : bool
             If True, the method also returns the input origin-destination pairs.
 
+        - `**kwargs` :
+            Further options of `BaseRouter.get_distances_batch`, e.g. `workers` to
+            request the batches from a pool of threads.
+
         Returns
         -------
         - `distance_matrix` : pandas.DataFrame
             A pandas DataFrame containing the distance matrix.
 
         """
+        kwargs["max_batch_size"] = self._limit_batch_size(kwargs.get("max_batch_size"))
         return super().get_distances_batch(
-            origins, destinations, max_batch_size=25, append_od=append_od
+            origins,
+            destinations,
+            append_od=append_od,
+            **kwargs,
         )
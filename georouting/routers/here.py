@@ -1,8 +1,6 @@
 import pandas as pd
-import requests
 
-import georouting.utils as gtl
-from georouting.routers.base import WebRouter, Route, HereRoute
+from georouting.routers.base import WebRouter, HereRoute
 
 
 class HereRouter(WebRouter):
@@ -11,8 +9,15 @@ class HereRouter(WebRouter):
     Provides route and matrix queries.
     """
 
-    def __init__(self, api_key, mode="driving", timeout=10, language="en"):
-        super().__init__(api_key, mode=mode, timeout=timeout, language=language)
+    # the HERE base plan allows 10 routing requests per second
+    rate_limit = {"requests_per_second": 10}
+
+    route_class = HereRoute
+
+    def __init__(self, api_key, mode="driving", timeout=10, language="en", **kwargs):
+        super().__init__(
+            api_key, mode=mode, timeout=timeout, language=language, **kwargs
+        )
         self.route_url = "https://route.ls.hereapi.com/routing/7.2/calculateroute.json"
         self.matrix_url = (
             "https://matrix.route.ls.hereapi.com/routing/7.2/calculatematrix.json"
@@ -66,29 +71,25 @@ class HereRouter(WebRouter):
 
         return pd.DataFrame({"distance (m)": distances, "duration (s)": durations})
 
+    def _get_route(self, origin, destination):
+        url = self._get_directions_url(origin, destination)
+        return self._get_request(url)
+
+    def _get_distance_matrix(self, origins, destinations):
+        url = self._get_matrix_distance_url(origins, destinations)
+        res = self._get_request(url, elements=len(origins) * len(destinations))
+        return self._parse_distance_matrix(res, len(origins), len(destinations))
+
     def get_route(self, origin, destination):
         """
         Return a Route object representing the route between origin and destination.
         """
-        url = self._get_directions_url(origin, destination)
-        route = super()._get_request(url)
-        return Route(HereRoute(route), origin, destination)
+        return super().get_route(origin, destination)
 
-    def get_distance_matrix(self, origins, destinations, append_od=False):
+    def get_distance_matrix(self, origins, destinations, append_od=False, **kwargs):
         """
         Return duration/distance for all origin-destination pairs.
         """
-        origins = gtl.convert_to_list(origins)
-        destinations = gtl.convert_to_list(destinations)
-
-        url = self._get_matrix_distance_url(origins, destinations)
-        res = super()._get_request(url)
-        distance_matrix = self._parse_distance_matrix(
-            res, len(origins), len(destinations)
+        return super().get_distance_matrix(
+            origins, destinations, append_od=append_od, **kwargs
         )
-
-        if append_od:
-            od_matrix = super()._get_OD_matrix(origins, destinations)
-            distance_matrix = pd.concat([od_matrix, distance_matrix], axis=1)
-
-        return distance_matrix
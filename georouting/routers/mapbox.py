@@ -1,9 +1,5 @@
-import json
-import pandas as pd
-import requests
-
 import georouting.utils as gtl
-from georouting.routers.base import WebRouter, Route, MapboxRoute
+from georouting.routers.base import WebRouter, MapboxRoute
 
 
 class MapboxRouter(WebRouter):
@@ -13,8 +9,18 @@ class MapboxRouter(WebRouter):
     Uses Mapbox Directions and Matrix APIs to fetch routes and distance matrices.
     """
 
-    def __init__(self, api_key, mode="driving", timeout=10, language="en"):
-        super().__init__(api_key, mode=mode, timeout=timeout, language=language)
+    # Matrix API allows 60 requests per minute (Directions API allows 300)
+    rate_limit = {"requests_per_second": 1}
+
+    # and at most 25 coordinates (origins + destinations) per matrix request
+    max_coordinates = 25
+
+    route_class = MapboxRoute
+
+    def __init__(self, api_key, mode="driving", timeout=10, language="en", **kwargs):
+        super().__init__(
+            api_key, mode=mode, timeout=timeout, language=language, **kwargs
+        )
         self.base_url = "https://api.mapbox.com"
 
     def _map_mode(self):
@@ -37,37 +43,36 @@ class MapboxRouter(WebRouter):
             f"?geometries=geojson&steps=true&access_token={self.api_key}"
         )
 
-    def _get_matrix_distance_url(self, coords):
+    def _get_matrix_distance_url(self, origins, destinations):
+        coords = self._format_coords(origins + destinations)
+        # the origins come first in the coordinates, then the destinations
+        sources = ";".join(str(i) for i in range(len(origins)))
+        targets = ";".join(str(len(origins) + i) for i in range(len(destinations)))
         return (
             f"{self.base_url}/directions-matrix/v1/mapbox/{self._map_mode()}/{coords}"
-            f"?annotations=distance,duration&access_token={self.api_key}"
+            f"?annotations=distance,duration&sources={sources}&destinations={targets}"
+            f"&access_token={self.api_key}"
         )
 
     def _parse_distance_matrix(self, json_data):
-        durations = json_data.get("durations", [])
-        distances = json_data.get("distances", [])
-
-        durations = [item for sublist in durations for item in sublist]
-        distances = [item for sublist in distances for item in sublist]
+        return self._arrays_to_frame(*self._parse_distance_matrix_arrays(json_data))
 
-        return pd.DataFrame({"distance (m)": distances, "duration (s)": durations})
+    def _parse_distance_matrix_arrays(self, json_data, shape=None):
+        return (
+            gtl.matrix_to_array(json_data.get("distances"), shape),
+            gtl.matrix_to_array(json_data.get("durations"), shape),
+        )
 
-    def get_route(self, origin, destination):
+    def _get_route(self, origin, destination):
         url = self._get_directions_url(origin, destination)
-        route = super()._get_request(url)
-        return Route(MapboxRoute(route), origin, destination)
-
-    def get_distance_matrix(self, origins, destinations, append_od=False):
-        origins = gtl.convert_to_list(origins)
-        destinations = gtl.convert_to_list(destinations)
+        return self._get_request(url)
 
-        coords = self._format_coords(origins + destinations)
-        url = self._get_matrix_distance_url(coords)
-        res = super()._get_request(url)
-        distance_matrix = self._parse_distance_matrix(res)
-
-        if append_od:
-            od_matrix = super()._get_OD_matrix(origins, destinations)
-            distance_matrix = pd.concat([od_matrix, distance_matrix], axis=1)
+    def _get_distance_matrix(self, origins, destinations):
+        return self._arrays_to_frame(
+            *self._get_distance_matrix_arrays(origins, destinations)
+        )
 
-        return distance_matrix
+    def _get_distance_matrix_arrays(self, origins, destinations):
+        url = self._get_matrix_distance_url(origins, destinations)
+        res = self._get_request(url, elements=len(origins) * len(destinations))
+        return self._parse_distance_matrix_arrays(res, (len(origins), len(destinations)))
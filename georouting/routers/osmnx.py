@@ -1,11 +1,20 @@
 import osmnx as ox
 import networkx as nx
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 import igraph as ig
+import glob
 import os
+import re
+import shutil
+import tempfile
 import warnings
+import weakref
 from georouting.routers.base import BaseRouter, Route, OSMNXRoute
+from georouting.graph import CSRGraph, parallel_costs
+from georouting.ch import ContractionHierarchy
+from georouting.snapping import EdgeIndex, NodeIndex
 import georouting.utils as gtl
 
 
@@ -23,11 +32,48 @@ class OSMNXRouter(object):
     - `mode` : str
         The routing mode. Can be "driving", "drive", "walking", "walk", "biking", "bike"
     - `engine` : str
-        The graph engine to use. Currently supports "networkx". "igraph" support planned.
+        The graph engine used for the shortest paths, "networkx", "igraph" or "scipy".
+        The igraph engine converts the road network once into an igraph graph. The
+        scipy engine converts it once into compact CSR arrays (`georouting.graph.CSRGraph`,
+        int32 node indices and float32 weights) searched with `scipy.sparse.csgraph`;
+        it is the fastest and needs the least memory on large networks. The "ch"
+        engine preprocesses the network into a contraction hierarchy
+        (`georouting.ch.ContractionHierarchy`), which takes a while once but then
+        answers routes and matrices with small bidirectional searches; see `ch_path`.
     - `use_cache` : bool
         Whether to cache downloaded road network data
     - `log_console` : bool
         Whether to log OSMnx messages to console
+    - `graph` : networkx.MultiDiGraph
+        A road network with `travel_time` and `length` edge attributes, e.g. from
+        `ox.graph_from_place` and `ox.add_edge_travel_times`, used instead of
+        downloading the network of `area`.
+    - `ch_path` : str or Path
+        With `engine="ch"`, the `.npz` file the contraction hierarchy is loaded from
+        if it exists, or saved to after building it, so it is built only once.
+        Defaults to a `ch.npz` file next to the saved road network with `graph_dir`.
+    - `snap_to` : str
+        "node" to route between the nearest nodes of the points (the default), or
+        "edge" to snap the points onto their nearest edges and route from and to
+        the snapped points, counting the part of the edges travelled (see
+        `georouting.snapping.EdgeIndex`). Edge snapping avoids the error of long
+        edges and zero-length short trips.
+    - `algorithm` : str
+        The search of `get_route`: "dijkstra" (the search of the engine, the
+        default), "astar" for A* with a great-circle heuristic (the distance to the
+        destination at the highest speed of the network), or "alt" for A* with
+        landmark (ALT) lower bounds instead. Both A* searches settle fewer nodes
+        than Dijkstra for the same route; they run on the CSR graph of the network
+        (`georouting.graph.CSRGraph.astar`).
+    - `landmarks` : int
+        The number of landmarks of the "alt" algorithm, chosen and measured once
+        per network (and saved next to the road network with `graph_dir`).
+    - `graph_dir` : str or Path
+        A directory of preprocessed road networks, one subdirectory per area and
+        mode (see `georouting.graph.CSRGraph.save`). The network of `area` is loaded
+        from it, memory-mapped, in well under a second, or downloaded, converted and
+        saved there the first time. The NetworkX graph (`G`) is then only rebuilt
+        from the saved arrays when a method needs it.
 
     Returns
     -------
@@ -45,6 +91,12 @@ class OSMNXRouter(object):
         "bike": "bike",
     }
 
+    ENGINES = ("networkx", "igraph", "scipy", "ch")
+
+    SNAP_TO = ("node", "edge")
+
+    ALGORITHMS = ("dijkstra", "astar", "alt")
+
     def __init__(
         self,
         area="Piedmont, California, USA",
@@ -54,18 +106,178 @@ class OSMNXRouter(object):
         log_console=False,
         timeout=10,
         language="en",
+        graph=None,
+        ch_path=None,
+        graph_dir=None,
+        snap_to="node",
+        algorithm="dijkstra",
+        landmarks=16,
     ):
+        if engine not in self.ENGINES:
+            raise ValueError("engine should be one of %s" % ", ".join(self.ENGINES))
+        if snap_to not in self.SNAP_TO:
+            raise ValueError("snap_to should be one of %s" % ", ".join(self.SNAP_TO))
+        if algorithm not in self.ALGORITHMS:
+            raise ValueError(
+                "algorithm should be one of %s" % ", ".join(self.ALGORITHMS)
+            )
         # Convert mode to OSMnx network type
         self.mode = self.MODE_MAPPING.get(mode, mode)
         self.area = area
         self.engine = engine
+        self.snap_to = snap_to
+        self.algorithm = algorithm
         self.use_cache = use_cache
         self.log_console = log_console
 
-        self.G = self._download_road_network()
+        self.graph_dir = graph_dir
+        self._G = graph
+        self.graph = None
+        # the directory `self.graph` was loaded from, None for a graph passed in
+        self._saved_path = None
+        if graph is None and graph_dir is not None:
+            self.graph = self._load_road_network(self.graph_path)
+            self._saved_path = self.graph_path
+            if ch_path is None:
+                ch_path = os.path.join(self.graph_path, "ch.npz")
+        elif graph is None:
+            self._G = self._download_road_network()
+
         if self.engine == "igraph":
             self.node_dict = self._get_node_dict()
-            self.G_ig = self._nx_to_ig(weight="travel_time")
+            self.G_ig = self._nx_to_ig()
+            # the edge weights as arrays, to sum them along the paths of igraph
+            self._ig_travel_time = np.asarray(self.G_ig.es["travel_time"], dtype=float)
+            self._ig_length = np.asarray(self.G_ig.es["length"], dtype=float)
+        if self.graph is None and (
+            self.engine in ("scipy", "ch") or snap_to == "edge" or algorithm != "dijkstra"
+        ):
+            self.graph = CSRGraph.from_networkx(self.G)
+        if self.engine == "ch":
+            self.ch = self._get_contraction_hierarchy(ch_path)
+        if self.graph is not None:
+            self.snap_index = NodeIndex(
+                self.graph.nodes,
+                self.graph.x,
+                self.graph.y,
+                projected=self.graph.projected,
+            )
+        else:
+            self.snap_index = NodeIndex.from_graph(self.G)
+        if (snap_to == "edge" or algorithm == "astar") and self.snap_index.projected:
+            raise ValueError(
+                'snap_to="edge" and algorithm="astar" need an unprojected '
+                "(longitude, latitude) road network."
+            )
+        if snap_to == "edge":
+            self.edge_index = EdgeIndex(self.graph)
+        if algorithm == "alt":
+            self.landmarks = self._get_landmarks(landmarks)
+
+    @property
+    def G(self):
+        """
+        The road network as an OSMnx `networkx.MultiDiGraph`, rebuilt from the saved
+        arrays on first use if the network was loaded from `graph_dir`.
+        """
+        if self._G is None:
+            self._G = self.graph.to_networkx()
+        return self._G
+
+    @property
+    def graph_path(self):
+        """
+        The directory of the saved road network of the area and mode in `graph_dir`.
+        """
+        if self.graph_dir is None:
+            return None
+        area = re.sub(r"[^a-z0-9]+", "-", str(self.area).lower()).strip("-")
+        return os.path.join(self.graph_dir, "%s_%s" % (area, self.mode))
+
+    def _load_road_network(self, path):
+        """
+        Load the saved road network from `path`, or download it and save it there.
+        """
+        if CSRGraph.is_saved(path):
+            return CSRGraph.load(path)
+        self._G = self._download_road_network()
+        graph = CSRGraph.from_networkx(self._G)
+        # the reversed graph and landmarks left by an earlier save belong to
+        # another download
+        shutil.rmtree(os.path.join(path, "reversed"), ignore_errors=True)
+        for name in glob.glob(os.path.join(glob.escape(path), "landmarks_*.npz")):
+            os.remove(name)
+        graph.save(path)
+        return graph
+
+    def _get_landmarks(self, count):
+        """
+        The landmarks of the "alt" algorithm (see `CSRGraph.landmarks`), loaded from
+        or saved to the saved road network of `graph_dir` if the graph was loaded
+        from it.
+        """
+        path = None
+        if self._saved_path is not None:
+            path = os.path.join(self._saved_path, "landmarks_%d.npz" % count)
+            if os.path.exists(path):
+                with np.load(path) as data:
+                    return (
+                        data["nodes"],
+                        data["from_landmarks"],
+                        data["to_landmarks"],
+                        float(data["slack"]),
+                    )
+        landmarks = self.graph.landmarks(count)
+        if path is not None:
+            np.savez(
+                path,
+                nodes=landmarks[0],
+                from_landmarks=landmarks[1],
+                to_landmarks=landmarks[2],
+                slack=landmarks[3],
+            )
+        return landmarks
+
+    def _shared_graph_path(self, reverse=False):
+        """
+        The directory of the saved CSR graph (or of its reversed graph) that worker
+        processes memory-map: the saved road network of `graph_dir` if the graph was
+        loaded from it, or a temporary copy removed with the router.
+
+        The reversed graph is saved next to it on first use; as for any saved
+        graph, its files are renamed into place and its manifest comes last, so a
+        partial save is never loaded.
+        """
+        path = self._saved_path
+        if path is None:
+            if getattr(self, "_shared_dir", None) is None:
+                self._shared_dir = tempfile.mkdtemp(prefix="georouting-graph-")
+                weakref.finalize(self, shutil.rmtree, self._shared_dir, True)
+                self.graph.save(self._shared_dir)
+            path = self._shared_dir
+        if reverse:
+            path = os.path.join(path, "reversed")
+            if not CSRGraph.is_saved(path):
+                self.graph.reversed().save(path)
+        return path
+
+    def _get_contraction_hierarchy(self, path=None):
+        """
+        Load the contraction hierarchy of the graph from `path`, or build it (and
+        save it to `path`).
+        """
+        if path is not None and os.path.exists(path):
+            ch = ContractionHierarchy.load(path)
+            if ch.fingerprint != self.graph.fingerprint():
+                raise ValueError(
+                    "The contraction hierarchy in %s was built for another road network."
+                    % path
+                )
+            return ch
+        ch = ContractionHierarchy.build(self.graph, verbose=self.log_console)
+        if path is not None:
+            ch.save(path)
+        return ch
 
     def _download_road_network(self):
         # Download road network
@@ -87,61 +299,266 @@ class OSMNXRouter(object):
         [node_dict.update({k: i}) for i, k in enumerate(node_dict)]
         return node_dict
 
-    def _nx_to_ig(self, weight="length"):
-        # print(node_dict)
-        nodes = [self.node_dict[item] for item in self.G.nodes]
-        edges = [(self.node_dict[u], self.node_dict[v]) for u, v in self.G.edges()]
-        w = [attr[weight] for u, v, attr in self.G.edges(data=True)]
-        G_ig = ig.Graph(directed=True)
-        G_ig.add_vertices(nodes)
-        G_ig.add_edges(edges)
-        G_ig.vs["osmid"] = nodes
-        G_ig.es[weight] = w
+    def _nx_to_ig(self, weights=("travel_time", "length")):
+        # vertex i is the i-th node of self.G, parallel edges are kept as they are
+        edges = list(self.G.edges(data=True))
+        G_ig = ig.Graph(
+            n=len(self.node_dict),
+            edges=[(self.node_dict[u], self.node_dict[v]) for u, v, _ in edges],
+            directed=True,
+        )
+        G_ig.vs["osmid"] = list(self.node_dict)
+        for weight in weights:
+            G_ig.es[weight] = [attr[weight] for _, _, attr in edges]
         return G_ig
 
     def _get_short_ig(self, source, target, weight):
-        sr = self.G_ig.shortest_paths(source=source, target=target, weights=weight)[0][
-            0
-        ]
+        sr = self.G_ig.distances(source=source, target=target, weights=weight)[0][0]
         return sr
 
-    def _get_OD_pairs(self, origins, destinations):
-        # switch longitude and latitude
-        origin_df = pd.DataFrame(origins, columns=["origin_lat", "origin_lon"])
-        destination_df = pd.DataFrame(
-            destinations, columns=["destination_lat", "destination_lon"]
+    def _get_route_ig(self, orig, dest):
+        """
+        Return the fastest route between two nodes as a list of node ids, or None if
+        there is no route.
+        """
+        path = self.G_ig.get_shortest_path(
+            self.node_dict[orig], self.node_dict[dest], weights="travel_time"
         )
+        if not path:
+            return None
+        return [self.G_ig.vs[i]["osmid"] for i in path]
 
-        origin_df["origin_node"] = ox.distance.nearest_nodes(
-            self.G, origin_df["origin_lon"], origin_df["origin_lat"]
+    def _get_costs(self, orig_nodes, dest_nodes, workers=1):
+        """
+        Return the duration and distance of the fastest route of each (orig, dest)
+        node pair as two float arrays (not rounded), NaN where there is no route.
+
+        One single-source search is run per unique origin node, reading off all of
+        its destinations at once; if there are fewer unique destination nodes, one
+        search is run per destination on the reversed graph instead. With the scipy
+        engine and `workers` greater than 1, the searches run in that many processes
+        sharing the memory-mapped graph (see `georouting.graph.parallel_costs`).
+        """
+        if workers > 1 and self.engine != "scipy":
+            raise ValueError("workers > 1 needs the scipy engine.")
+        orig_nodes = np.asarray(orig_nodes)
+        dest_nodes = np.asarray(dest_nodes)
+        durations = np.full(len(orig_nodes), np.nan)
+        distances = np.full(len(orig_nodes), np.nan)
+
+        if self.engine == "ch":
+            return self._get_costs_ch(orig_nodes, dest_nodes)
+
+        reverse = len(pd.unique(dest_nodes)) < len(pd.unique(orig_nodes))
+        sources, targets = (dest_nodes, orig_nodes) if reverse else (orig_nodes, dest_nodes)
+        if self.engine == "scipy":
+            sources = self.graph.node_index(sources)
+            targets = self.graph.node_index(targets)
+            if workers > 1:
+                durations, distances = parallel_costs(
+                    self._shared_graph_path(reverse), sources, targets, workers
+                )
+            else:
+                graph = self.graph.reversed() if reverse else self.graph
+                durations, distances = graph.costs(sources, targets)
+            return durations, distances
+
+        codes, uniques = pd.factorize(sources)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.cumsum(np.bincount(codes, minlength=len(uniques)))[:-1]
+        for source, rows in zip(uniques, np.split(order, bounds)):
+            source_targets, inverse = np.unique(targets[rows], return_inverse=True)
+            if self.engine == "igraph":
+                costs = self._one_to_many_ig(source, source_targets, reverse)
+            else:
+                costs = self._one_to_many_nx(source, source_targets, reverse)
+            durations[rows] = costs[0][inverse]
+            distances[rows] = costs[1][inverse]
+
+        return durations, distances
+
+    def _get_costs_ch(self, orig_nodes, dest_nodes):
+        """
+        `_get_costs` with the contraction hierarchy: a many-to-many query over the
+        unique nodes when the pairs cover most of their combinations (as for a
+        matrix), otherwise one bidirectional query per pair.
+        """
+        sources = self.graph.node_index(orig_nodes)
+        targets = self.graph.node_index(dest_nodes)
+        unique_sources, source_rows = np.unique(sources, return_inverse=True)
+        unique_targets, target_cols = np.unique(targets, return_inverse=True)
+        if len(unique_sources) * len(unique_targets) <= 2 * len(sources):
+            durations, distances = self.ch.many_to_many(unique_sources, unique_targets)
+            durations = durations[source_rows, target_cols]
+            distances = distances[source_rows, target_cols]
+        else:
+            durations, distances = self.ch.costs(sources.tolist(), targets.tolist())
+        return durations, distances
+
+    def _get_edge_costs(self, origins, destinations, workers=1, pairs=None):
+        """
+        Return the duration and distance of the fastest route between each pair of
+        `origins` and `destinations` points with edge snapping, as for `_get_costs`.
+        The pairs are the points in the same position, or the (origin, destination)
+        positions given as two arrays in `pairs`; every point is snapped once.
+
+        Each point leaves (or is reached by) its edge through one or two nodes, so
+        the node costs of up to four node pairs are looked up per point pair, with
+        one `_get_costs` call for all of them, and the cheapest total is kept.
+        """
+        o_edges, o_fractions, _ = self.edge_index.query(origins)
+        d_edges, d_fractions, _ = self.edge_index.query(destinations)
+        if pairs is not None:
+            o_edges, o_fractions = o_edges[pairs[0]], o_fractions[pairs[0]]
+            d_edges, d_fractions = d_edges[pairs[1]], d_fractions[pairs[1]]
+        o_nodes, o_durations, o_lengths = self.edge_index.exits(o_edges, o_fractions)
+        d_nodes, d_durations, d_lengths = self.edge_index.entries(d_edges, d_fractions)
+
+        durations, distances = self.edge_index.direct(
+            o_edges, o_fractions, d_edges, d_fractions
         )
-        destination_df["destination_node"] = ox.distance.nearest_nodes(
-            self.G, destination_df["destination_lon"], destination_df["destination_lat"]
+        combos = [(a, b) for a in (0, 1) for b in (0, 1)]
+        rows = [
+            np.flatnonzero(np.isfinite(o_durations[:, a] + d_durations[:, b]))
+            for a, b in combos
+        ]
+        node_durations, node_distances = self._get_costs(
+            self.graph.nodes[np.concatenate([o_nodes[r, a] for r, (a, _) in zip(rows, combos)])],
+            self.graph.nodes[np.concatenate([d_nodes[r, b] for r, (_, b) in zip(rows, combos)])],
+            workers,
         )
+        bounds = np.cumsum([len(r) for r in rows])[:-1]
+        for r, (a, b), node_duration, node_distance in zip(
+            rows,
+            combos,
+            np.split(node_durations, bounds),
+            np.split(node_distances, bounds),
+        ):
+            total = o_durations[r, a] + node_duration + d_durations[r, b]
+            better = total < durations[r]
+            durations[r[better]] = total[better]
+            distances[r[better]] = (o_lengths[r, a] + node_distance + d_lengths[r, b])[better]
+
+        found = np.isfinite(durations)
+        return np.where(found, durations, np.nan), np.where(found, distances, np.nan)
+
+    def _get_route_csr(self, orig, dest):
+        """
+        Return the fastest route between two nodes as a list of node ids, or None if
+        there is no route.
+        """
+        source, target = self.graph.node_index([orig, dest]).tolist()
+        if self.engine == "ch":
+            path = self.ch.route(source, target)
+        else:
+            path = self.graph.route(source, target)
+        if path is None:
+            return None
+        return self.graph.nodes[path].tolist()
+
+    def _one_to_many_ig(self, source, targets, reverse=False):
+        """
+        Durations and distances from the `source` node to each of the `targets`
+        (from the targets to the source if `reverse`) with igraph.
+        """
+        source = self.node_dict[source]
+        targets = [self.node_dict[t] for t in targets]
+        with warnings.catch_warnings():
+            # igraph warns about unreachable targets, which are NaN here
+            warnings.simplefilter("ignore")
+            paths = self.G_ig.get_shortest_paths(
+                source,
+                to=targets,
+                weights="travel_time",
+                mode="in" if reverse else "out",
+                output="epath",
+            )
+        found = np.array([bool(p) or t == source for p, t in zip(paths, targets)])
+        durations = np.array([self._ig_travel_time[p].sum() for p in paths])
+        distances = np.array([self._ig_length[p].sum() for p in paths])
+        return np.where(found, durations, np.nan), np.where(found, distances, np.nan)
 
-        joint_data = origin_df.merge(destination_df, how="cross")
+    @staticmethod
+    def _fastest_edge(G, u, v):
+        """
+        The attributes of the u-v edge with the least travel time, the parallel edge
+        that NetworkX shortest path searches use.
+        """
+        return min(G[u][v].values(), key=lambda attr: attr.get("travel_time", 1))
 
-        return joint_data
+    def _one_to_many_nx(self, source, targets, reverse=False):
+        """
+        Durations and distances from the `source` node to each of the `targets`
+        (from the targets to the source if `reverse`) with one Dijkstra search on
+        the NetworkX graph. The distances are accumulated along the shortest path
+        tree, walking up from each target only until a node already measured.
+        """
+        G = self.G.reverse(copy=False) if reverse else self.G
+        if len(targets) == 1:
+            # a single target: a bidirectional search stops much earlier
+            try:
+                duration, path = nx.bidirectional_dijkstra(
+                    G, source, targets[0], weight="travel_time"
+                )
+            except nx.NetworkXNoPath:
+                return np.array([np.nan]), np.array([np.nan])
+            distance = sum(
+                self._fastest_edge(G, u, v)["length"] for u, v in zip(path[:-1], path[1:])
+            )
+            return np.array([duration], dtype=float), np.array([distance], dtype=float)
+
+        pred, dist = nx.dijkstra_predecessor_and_distance(G, source, weight="travel_time")
+
+        lengths = {source: 0.0}
+        for target in targets:
+            node, stack = target, []
+            while node not in lengths and pred.get(node):
+                stack.append(node)
+                node = pred[node][0]
+            if node not in lengths:
+                continue
+            total = lengths[node]
+            for child in reversed(stack):
+                total += self._fastest_edge(G, pred[child][0], child)["length"]
+                lengths[child] = total
+
+        durations = np.array([dist.get(t, np.nan) for t in targets], dtype=float)
+        distances = np.array([lengths.get(t, np.nan) for t in targets], dtype=float)
+        return durations, distances
+
+    def snap(self, points):
+        """
+        Snap points to their nearest nodes of the road network, all at once with
+        the spatial index the router builds once (`georouting.snapping.NodeIndex`).
 
-    def _parse_distance_matrix(self, routes):
-        # Get the distance matrix
+        Parameters
+        ----------
+        - `points` : iterable objects
+            The points, iterable objects with two elements such as (latitude, longitude).
 
-        distance_matrix = []
-        for r in routes:
-            if r is not None:
-                route = OSMNXRoute([r, self.G])
-                duration = route.get_duration()
-                distance = route.get_distance()
-            else:
-                duration = None
-                distance = None
-            distance_matrix.append([duration, distance])
+        Returns
+        -------
+        - `nodes` : numpy.ndarray
+            The id of the nearest node of each point.
+        - `distances` : numpy.ndarray
+            The distance between each point and its node in meters, e.g. to leave
+            out points too far from the road network.
+        """
+        return self.snap_index.query(gtl.convert_to_list(points))
 
-        distance_matrix = pd.DataFrame(
-            distance_matrix, columns=["duration (s)", "distance (m)"]
+    def _get_OD_pairs(self, origins, destinations):
+        # switch longitude and latitude
+        origin_df = pd.DataFrame(origins, columns=["origin_lat", "origin_lon"])
+        destination_df = pd.DataFrame(
+            destinations, columns=["destination_lat", "destination_lon"]
         )
 
-        return distance_matrix
+        origin_df["origin_node"] = self.snap(origins)[0]
+        destination_df["destination_node"] = self.snap(destinations)[0]
+
+        joint_data = origin_df.merge(destination_df, how="cross")
+
+        return joint_data
 
     def get_route(self, origin, destination):
         """
@@ -172,31 +589,87 @@ class OSMNXRouter(object):
 
         """
 
-        #  download the
-        # G = self._download_road_network()
+        if self.snap_to == "edge":
+            route, offsets = self._get_edge_route(origin, destination)
+        else:
+            # get the nearest network nodes to two lat/lng points
+            orig, dest = self.snap([origin, destination])[0].tolist()
+            route, offsets = self._get_node_route(orig, dest), None
 
         # switch longitude and latitude
         origin = (origin[1], origin[0])
         destination = (destination[1], destination[0])
 
-        # get the nearest network nodes to two lat/lng points with the distance module
-        orig = ox.distance.nearest_nodes(self.G, *origin)
-        dest = ox.distance.nearest_nodes(self.G, *destination)
-
-        # find the shortest path between nodes, minimizing travel time, then plot it
-        route = ox.shortest_path(self.G, orig, dest, weight="travel_time")
-
-        return Route(OSMNXRoute([route, self.G]), origin, destination)
+        return Route(OSMNXRoute([route, self.G, offsets]), origin, destination)
 
-    #         elif self.engine == "igraph":
-    #             # find the shortest path use igraph
-    #             pass
-    #             # travel_time = self._get_short_ig(self.node_dict[origin_nodes],self.node_dict[destination_nodes],"travel_time")
-    #         else:
-    #             raise ValueError("engine should be networkx or igraph")
-    #         return routes
+    def _get_node_route(self, orig, dest):
+        # find the shortest path between nodes, minimizing travel time
+        if self.algorithm != "dijkstra":
+            return self._get_route_astar(orig, dest)
+        if self.engine == "igraph":
+            return self._get_route_ig(orig, dest)
+        if self.engine in ("scipy", "ch"):
+            return self._get_route_csr(orig, dest)
+        return ox.shortest_path(self.G, orig, dest, weight="travel_time")
 
-    def get_distance_matrix(self, origins, destinations, append_od=False):
+    def _get_route_astar(self, orig, dest):
+        """
+        Return the fastest route between two nodes as a list of node ids with an A*
+        search (see `algorithm`), or None if there is no route.
+        """
+        source, target = self.graph.node_index([orig, dest]).tolist()
+        if self.algorithm == "alt":
+            heuristic = self.graph.landmark_heuristic(self.landmarks, target, source)
+        else:
+            heuristic = self.graph.great_circle_heuristic(target)
+        path, _ = self.graph.astar(source, target, heuristic)
+        if path is None:
+            return None
+        return self.graph.nodes[path].tolist()
+
+    def _get_edge_route(self, origin, destination):
+        """
+        The fastest route between two points snapped onto their nearest edges: the
+        nodes between the edges, and the (duration, distance) travelled on the
+        partial edges at both ends.
+        """
+        edges, fractions, _ = self.edge_index.query([origin, destination])
+        o_nodes, o_durations, o_lengths = self.edge_index.exits(edges[:1], fractions[:1])
+        d_nodes, d_durations, d_lengths = self.edge_index.entries(edges[1:], fractions[1:])
+        duration, distance = self.edge_index.direct(
+            edges[:1], fractions[:1], edges[1:], fractions[1:]
+        )
+        best_cost, best, offsets = duration[0], None, (duration[0], distance[0])
+        # the node costs of the (up to four) exit and entry node pairs, all at once
+        combos = [
+            (a, b)
+            for a in (0, 1)
+            for b in (0, 1)
+            if np.isfinite(o_durations[0, a] + d_durations[0, b])
+        ]
+        if combos:
+            starts = self.graph.nodes[[o_nodes[0, a] for a, _ in combos]]
+            ends = self.graph.nodes[[d_nodes[0, b] for _, b in combos]]
+            node_durations, _ = self._get_costs(starts, ends)
+            for (a, b), start, end, node_duration in zip(combos, starts, ends, node_durations):
+                total = o_durations[0, a] + node_duration + d_durations[0, b]
+                if total < best_cost:
+                    best_cost, best = total, [int(start), int(end)]
+                    offsets = (
+                        o_durations[0, a] + d_durations[0, b],
+                        o_lengths[0, a] + d_lengths[0, b],
+                    )
+        if not np.isfinite(best_cost):
+            return None, None
+        if best is None:
+            # both points on one edge: no node is passed, the route is the node
+            # the origin moves away from
+            forward = fractions[0] <= fractions[1]
+            node = self.edge_index.tail[edges[0]] if forward else self.edge_index.head[edges[0]]
+            return [int(self.graph.nodes[node])], offsets
+        return self._get_node_route(*best), offsets
+
+    def get_distance_matrix(self, origins, destinations, append_od=False, workers=1):
         """
         This method returns a Pandas dataframe representing a distance matrix between the `origins` and `destinations` points.
         It returns the duration and distance for all possible combinations between each origin and each destination.
@@ -207,7 +680,10 @@ class OSMNXRouter(object):
         If the `append_od` parameter is set to True, the method also returns a matrix of origin-destination pairs.
 
         Note: Since this router performs local calculations, there are no API rate limits.
-        However, very large matrices may be slow to compute depending on the road network size.
+        The matrix costs one shortest path search per unique origin node (or per
+        destination node if there are fewer), not one per origin-destination pair.
+        With the scipy engine, `workers` processes can share these searches; they
+        memory-map one saved copy of the graph instead of each holding their own.
 
         Parameters
         ----------
@@ -221,6 +697,8 @@ class OSMNXRouter(object):
             (latitude, longitude) or [latitude, longitude].
         - `append_od` : bool
             If True, the method also returns a matrix of origin-destination pairs.
+        - `workers` : int
+            The number of processes searching the graph (scipy engine only).
 
         Returns
         -------
@@ -242,9 +720,22 @@ class OSMNXRouter(object):
         # print(origs)
         # print(dests)
 
-        routes = ox.shortest_path(self.G, origs, dests, weight="travel_time", cpus=None)
-
-        distance_matrix = self._parse_distance_matrix(routes)
+        if self.snap_to == "edge":
+            # the pairs of `_get_OD_pairs`, origin by origin
+            pairs = (
+                np.repeat(np.arange(len(origins)), len(destinations)),
+                np.tile(np.arange(len(destinations)), len(origins)),
+            )
+            durations, distances = self._get_edge_costs(
+                origins, destinations, workers, pairs
+            )
+        else:
+            durations, distances = self._get_costs(origs, dests, workers)
+        # round like `OSMNXRoute.get_duration` and `get_distance`
+        durations, distances = np.round(durations), np.round(distances)
+        distance_matrix = pd.DataFrame(
+            {"duration (s)": durations, "distance (m)": distances}
+        )
 
         if append_od:
             distance_matrix = pd.concat([od_pairs_df, distance_matrix], axis=1)
@@ -254,7 +745,7 @@ class OSMNXRouter(object):
 
         return distance_matrix
 
-    def get_distances_batch(self, origins, destinations, append_od=False):
+    def get_distances_batch(self, origins, destinations, append_od=False, workers=1):
         """
         This method returns a Pandas dataframe contains duration and disatnce for all the `origins` and `destinations` pairs. Use this function if you don't want to get duration and distance for all possible combinations between each origin and each destination.
 
@@ -277,6 +768,10 @@ class OSMNXRouter(object):
         - `append_od` : bool
             If True, the method also returns the input origin-destination pairs.
 
+        - `workers` : int
+            The number of processes searching the graph (scipy engine only), see
+            `get_distance_matrix`.
+
         Returns
         -------
         - `distance_matrix` : pandas.DataFrame
@@ -304,52 +799,24 @@ class OSMNXRouter(object):
         od_pairs_df = pd.concat([origins_df, destinations_df], axis=1)
         # print(od_pairs_df)
 
-        # get cross product of origins and destinations
-        import numpy as np
-
-        v = np.vstack([origins_df.values, destinations_df.values])
-        all_points = pd.DataFrame(v, columns=["lat", "lon", "id"])
-        # print(all_points)
-
-        # drop duplicates
-        all_points.drop_duplicates(subset=["lat", "lon"], inplace=True)
-        # get the nearest nodes for origins and destinations
-        # print(all_points)
-        all_points["node"] = ox.distance.nearest_nodes(
-            self.G, all_points["lon"], all_points["lat"]
-        )
-
-        # print(all_points)
-        # get the origin nodes
-        od_pairs_df["origin_node"] = pd.merge(
-            od_pairs_df,
-            all_points,
-            left_on=["origin_lat", "origin_lon"],
-            right_on=["lat", "lon"],
-            how="left",
-        )["node"]
-        # get the destination nodes
-        od_pairs_df["destination_node"] = pd.merge(
-            od_pairs_df,
-            all_points,
-            left_on=["dest_lat", "dest_lon"],
-            right_on=["lat", "lon"],
-            how="left",
-        )["node"]
-
+        od_pairs_df["origin_node"] = self.snap(origins)[0]
+        od_pairs_df["destination_node"] = self.snap(destinations)[0]
         # print(od_pairs_df)
 
         # get the shortest path
-        routes = ox.shortest_path(
-            self.G,
-            od_pairs_df["origin_node"].tolist(),
-            od_pairs_df["destination_node"].tolist(),
-            weight="travel_time",
-            cpus=None,
+        if self.snap_to == "edge":
+            durations, distances = self._get_edge_costs(origins, destinations, workers)
+        else:
+            durations, distances = self._get_costs(
+                od_pairs_df["origin_node"].values,
+                od_pairs_df["destination_node"].values,
+                workers,
+            )
+        durations, distances = np.round(durations), np.round(distances)
+        distance_matrix = pd.DataFrame(
+            {"duration (s)": durations, "distance (m)": distances}
         )
 
-        distance_matrix = self._parse_distance_matrix(routes)
-
         if append_od:
             distance_matrix = pd.concat([od_pairs_df, distance_matrix], axis=1)
             distance_matrix.drop(
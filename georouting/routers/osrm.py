@@ -1,8 +1,5 @@
-import requests
-import json
-import pandas as pd
 import georouting.utils as gtl
-from georouting.routers.base import WebRouter, Route, OSRMRoute
+from georouting.routers.base import WebRouter, OSRMRoute
 import numpy as np
 
 
@@ -29,6 +26,9 @@ class OSRMRouter(WebRouter):
     - `base_url` : str
         The base URL for the OSRM API. Default is "http://router.project-osrm.org".
 
+    - `**kwargs` :
+        Options passed to `WebRouter`, e.g. `session`, `pool_maxsize`, `rate_limit`, `retry`, `cache`, `json_decoder`.
+
     Returns
     -------
     - `OSRMRouter`:
@@ -36,6 +36,14 @@ class OSRMRouter(WebRouter):
 
     """
 
+    # keep requests to the public OSRM demo server small
+    max_batch_size = 100
+
+    # usage policy of the public demo server: at most 1 request per second
+    rate_limit = {"requests_per_second": 1}
+
+    route_class = OSRMRoute
+
     def __init__(
         self,
         mode="driving",
@@ -55,9 +63,15 @@ class OSRMRouter(WebRouter):
         backend_recipe_path=None,
         backend_instance_name="osrm",
         backend_extra_run_args=None,
+        **kwargs,
     ):
         super().__init__(
-            api_key=None, mode=mode, timeout=timeout, language=language, base_url=None
+            api_key=None,
+            mode=mode,
+            timeout=timeout,
+            language=language,
+            base_url=None,
+            **kwargs,
         )
 
         def _mode_to_profile(m):
@@ -119,6 +133,29 @@ class OSRMRouter(WebRouter):
         else:
             self.base_url = base_url
 
+        demo_server = "router.project-osrm.org" in str(self.base_url)
+        if kwargs.get("rate_limit") is None and not demo_server:
+            # the default rate limit only applies to the public demo server
+            self.rate_limiter = None
+
+    def _cache_provider(self):
+        # different servers may hold different map data
+        return "%s:%s" % (type(self).__name__, self.base_url)
+
+    def _get_route(self, origin, destination):
+        url = self._get_directions_url(origin, destination)
+        return self._get_request(url)
+
+    def _get_distance_matrix(self, origins, destinations):
+        return self._arrays_to_frame(
+            *self._get_distance_matrix_arrays(origins, destinations)
+        )
+
+    def _get_distance_matrix_arrays(self, origins, destinations):
+        url = self._get_matrix_distance_url(origins, destinations)
+        res = self._get_request(url, elements=len(origins) * len(destinations))
+        return self._parse_distance_matrix_arrays(res, (len(origins), len(destinations)))
+
     def _get_directions_url(self, origin, destination):
         """
         Helper function for getting the URL for a directions request (To request a route
@@ -176,18 +213,17 @@ class OSRMRouter(WebRouter):
         Parses the response from the distance matrix API and returns a dataframe of
         durations and distances.
         """
-        durations = json_data["durations"]
-        distances = json_data["distances"]
-
-        # flatten the list
-        durations = [item for sublist in durations for item in sublist]
-        distances = [item for sublist in distances for item in sublist]
-
-        # combine the dutation and destinations list to a dataframe
-        # print(len(durations), len(distances))
-        df = pd.DataFrame({"distance (m)": distances, "duration (s)": durations})
+        return self._arrays_to_frame(*self._parse_distance_matrix_arrays(json_data))
 
-        return df
+    def _parse_distance_matrix_arrays(self, json_data, shape=None):
+        """
+        Parse the distance matrix response into (distances, durations) arrays, NaN
+        where no route was found.
+        """
+        return (
+            gtl.matrix_to_array(json_data["distances"], shape),
+            gtl.matrix_to_array(json_data["durations"], shape),
+        )
 
     def get_route(self, origin, destination):
         """
@@ -217,12 +253,9 @@ class OSRMRouter(WebRouter):
         - `get_route_geodataframe()` returns the route as a GeoDataFrame.
 
         """
-        url = self._get_directions_url(origin, destination)
-        route = super()._get_request(url)
-        route = Route(OSRMRoute(route), origin, destination)
-        return route
+        return super().get_route(origin, destination)
 
-    def get_distance_matrix(self, origins, destinations, append_od=False):
+    def get_distance_matrix(self, origins, destinations, append_od=False, **kwargs):
         """
         This method returns a Pandas dataframe representing a distance matrix between the `origins` and `destinations` points. It returns the duration and distance for
         all possible combinations between each origin and each destination. If you want just
@@ -247,6 +280,10 @@ class OSRMRouter(WebRouter):
         - `append_od` : bool
             If True, the method also returns a matrix of origin-destination pairs.
 
+        - `**kwargs` :
+            Further options of `BaseRouter.get_distance_matrix`, e.g. `output="array"` to
+            get (distances, durations) NumPy arrays.
+
         Returns
         -------
         - `distance_matrix` : pandas.DataFrame
@@ -255,23 +292,12 @@ class OSRMRouter(WebRouter):
         Here is an example of how to use this method:
         # TODO: add example
         """
-        # check if the origins and destinations are numpy arrays
-        # if so, convert them to lists
-
-        origins = gtl.convert_to_list(origins)
-        destinations = gtl.convert_to_list(destinations)
-
-        url = self._get_matrix_distance_url(origins, destinations)
-        res = super()._get_request(url)
-        distance_matrix = self._parse_distance_matrix(res)
-        if append_od:
-            od_matrix = super()._get_OD_matrix(origins, destinations)
-            distance_matrix = pd.concat([od_matrix, distance_matrix], axis=1)
-
-        return distance_matrix
+        return super().get_distance_matrix(
+            origins, destinations, append_od=append_od, **kwargs
+        )
 
     def get_distances_batch(
-        self, origins, destinations, append_od=False, use_local_server=False
+        self, origins, destinations, append_od=False, use_local_server=False, **kwargs
     ):
         """
         This method returns a Pandas dataframe contains duration and disatnce for all the `origins` and `destinations` pairs. Use this function if you don't want to get duration and distance for all possible combinations between each origin and each destination.
@@ -295,18 +321,47 @@ class OSRMRouter(WebRouter):
         - `append_od` : bool
             If True, the method also returns the input origin-destination pairs.
 
+        - `**kwargs` :
+            Further options of `BaseRouter.get_distances_batch`, e.g. `workers` to
+            request the batches from a pool of threads.
+
         Returns
         -------
         - `distance_matrix` : pandas.DataFrame
             A pandas DataFrame containing the distance matrix.
 
+        """
+        kwargs["max_batch_size"] = self._get_batch_size(
+            kwargs.get("max_batch_size"), use_local_server
+        )
+        return super().get_distances_batch(
+            origins, destinations, append_od=append_od, **kwargs
+        )
+
+    async def aget_distances_batch(
+        self,
+        origins,
+        destinations,
+        append_od=False,
+        use_local_server=False,
+        **kwargs,
+    ):
+        """
+        Asynchronous version of `get_distances_batch`, see `WebRouter.aget_distances_batch`
+        for the other options. With `use_local_server=True` the batches are not limited in size.
+        """
+        kwargs["max_batch_size"] = self._get_batch_size(
+            kwargs.get("max_batch_size"), use_local_server
+        )
+        return await super().aget_distances_batch(
+            origins, destinations, append_od=append_od, **kwargs
+        )
+
+    def _get_batch_size(self, max_batch_size=None, use_local_server=False):
+        """
+        The batch size of a local server (no limit unless `max_batch_size` is given),
+        or the one of the public server, at most `max_batch_size`.
         """
         if use_local_server:
-            df = super().get_distances_batch(
-                origins, destinations, max_batch_size=np.infty, append_od=append_od
-            )
-        else:
-            df = super().get_distances_batch(
-                origins, destinations, max_batch_size=100, append_od=append_od
-            )
-        return df
+            return np.inf if max_batch_size is None else max_batch_size
+        return self._limit_batch_size(max_batch_size)
@@ -1,8 +1,6 @@
-import requests
 import pandas as pd
 
-import georouting.utils as gtl
-from georouting.routers.base import WebRouter, Route, TomTomRoute
+from georouting.routers.base import WebRouter, TomTomRoute
 
 
 class TomTomRouter(WebRouter):
@@ -13,8 +11,15 @@ class TomTomRouter(WebRouter):
     matrices with a unified interface.
     """
 
-    def __init__(self, api_key, mode="driving", timeout=10, language="en"):
-        super().__init__(api_key, mode=mode, timeout=timeout, language=language)
+    # TomTom free tier allows 5 queries per second
+    rate_limit = {"requests_per_second": 5}
+
+    route_class = TomTomRoute
+
+    def __init__(self, api_key, mode="driving", timeout=10, language="en", **kwargs):
+        super().__init__(
+            api_key, mode=mode, timeout=timeout, language=language, **kwargs
+        )
         self.base_url = "https://api.tomtom.com/routing/1"
 
     def _map_mode(self):
@@ -50,12 +55,6 @@ class TomTomRouter(WebRouter):
             "options": {"travelMode": self._map_mode(), "traffic": False},
         }
 
-    def _post_request(self, url, payload):
-        """Send a POST request to TomTom."""
-        response = requests.post(url, json=payload, timeout=self.timeout)
-        response.raise_for_status()
-        return response.json()
-
     def _parse_distance_matrix(self, json_data, num_origins, num_destinations):
         """
         Parse TomTom matrix response into a tidy dataframe ordered by
@@ -79,31 +78,28 @@ class TomTomRouter(WebRouter):
 
         return pd.DataFrame({"distance (m)": distances, "duration (s)": durations})
 
+    def _get_route(self, origin, destination):
+        url = self._get_directions_url(origin, destination)
+        return self._get_request(url)
+
+    def _get_distance_matrix(self, origins, destinations):
+        url = self._get_matrix_distance_url()
+        payload = self._build_matrix_payload(origins, destinations)
+        res = self._post_request(
+            url, payload, elements=len(origins) * len(destinations)
+        )
+        return self._parse_distance_matrix(res, len(origins), len(destinations))
+
     def get_route(self, origin, destination):
         """
         Return a Route object representing the path between origin and destination.
         """
-        url = self._get_directions_url(origin, destination)
-        route = super()._get_request(url)
-        route = Route(TomTomRoute(route), origin=origin, destination=destination)
-        return route
+        return super().get_route(origin, destination)
 
-    def get_distance_matrix(self, origins, destinations, append_od=False):
+    def get_distance_matrix(self, origins, destinations, append_od=False, **kwargs):
         """
         Return a Pandas dataframe of durations and distances for all origin/destination pairs.
         """
-        origins = gtl.convert_to_list(origins)
-        destinations = gtl.convert_to_list(destinations)
-
-        url = self._get_matrix_distance_url()
-        payload = self._build_matrix_payload(origins, destinations)
-        res = self._post_request(url, payload)
-        distance_matrix = self._parse_distance_matrix(
-            res, len(origins), len(destinations)
+        return super().get_distance_matrix(
+            origins, destinations, append_od=append_od, **kwargs
         )
-
-        if append_od:
-            od_matrix = super()._get_OD_matrix(origins, destinations)
-            distance_matrix = pd.concat([od_matrix, distance_matrix], axis=1)
-
-        return distance_matrix
@@ -0,0 +1,301 @@
+"""
+Snapping points to a road network.
+
+`NodeIndex` finds the nearest network node of many points at once. Its k-d tree
+is built once per network: the nodes of an unprojected (longitude, latitude)
+network are placed on the unit sphere, where the nearest node by straight-line
+(chord) distance is also the nearest by great-circle distance, the metric of
+`osmnx.distance.nearest_nodes`.
+
+`EdgeIndex` snaps points onto the nearest edge of a `georouting.graph.CSRGraph`
+instead, and gives the partial travel time and length from the snapped point to
+the ends of its edge, so that routes start and end at the snapped points rather
+than at nodes. The edge geometries are cut into short pieces indexed by their
+midpoints in a k-d tree: the nearest piece among the few with the nearest
+midpoints is provably the nearest of all for almost every point, and the few
+others are looked up in a shapely R-tree (`STRtree`) of the edges.
+"""
+
+import numpy as np
+import shapely
+from scipy.spatial import cKDTree
+
+# the Earth radius used by OSMnx, in meters
+EARTH_RADIUS_M = 6371009
+
+# the maximum length of the pieces of edges indexed by `EdgeIndex`, in meters
+MAX_PIECE_LENGTH = 50.0
+# the number of pieces (nearest by midpoint) measured per point by `EdgeIndex`
+NEAREST_PIECES = 8
+
+
+def _to_unit_sphere(lon, lat):
+    lon = np.radians(lon)
+    lat = np.radians(lat)
+    return np.column_stack(
+        [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)]
+    )
+
+
+class NodeIndex:
+    """
+    A nearest node index of a road network.
+
+    Parameters
+    ----------
+    - `nodes` : array of int
+        The node ids.
+
+    - `x`, `y` : arrays of float
+        The coordinates of the nodes, longitude and latitude unless `projected`.
+
+    - `projected` : bool
+        Whether the coordinates are projected (in meters); points are then
+        snapped with euclidean distances.
+    """
+
+    def __init__(self, nodes, x, y, projected=False):
+        self.nodes = np.asarray(nodes)
+        self.projected = projected
+        if projected:
+            self.tree = cKDTree(np.column_stack([x, y]))
+        else:
+            self.tree = cKDTree(_to_unit_sphere(x, y))
+
+    @classmethod
+    def from_graph(cls, G):
+        """
+        Build the index of the nodes of an OSMnx (NetworkX) graph.
+        """
+        from osmnx.projection import is_projected
+
+        nodes = np.fromiter(G.nodes, dtype=np.int64, count=len(G))
+        x = np.fromiter((d["x"] for _, d in G.nodes(data=True)), np.float64, len(G))
+        y = np.fromiter((d["y"] for _, d in G.nodes(data=True)), np.float64, len(G))
+        return cls(nodes, x, y, projected=is_projected(G.graph.get("crs", "epsg:4326")))
+
+    def query(self, points):
+        """
+        Snap (latitude, longitude) points, (y, x) with a projected index, to their
+        nearest nodes.
+
+        Returns
+        -------
+        - `nodes` : array of int
+            The id of the nearest node of each point.
+        - `distances` : array of float
+            The distance between each point and its node, in meters.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if np.isnan(points).any():
+            raise ValueError("The points cannot contain NaN coordinates.")
+        if self.projected:
+            distances, positions = self.tree.query(points[:, ::-1])
+        else:
+            chords, positions = self.tree.query(
+                _to_unit_sphere(points[:, 1], points[:, 0])
+            )
+            distances = 2 * EARTH_RADIUS_M * np.arcsin(np.minimum(chords / 2, 1))
+        return self.nodes[positions], distances
+
+
+class EdgeIndex:
+    """
+    A nearest edge index of a `georouting.graph.CSRGraph`.
+
+    The edges are indexed in a local equirectangular projection (in meters)
+    around the mean latitude of the network, once per pair of opposite edges of a
+    two-way street. A point snapped at `fraction` of the length of the u->v edge
+    then leaves it to v (and to u along the v->u edge if the street is two-way),
+    and is reached from u (and from v), with the matching share of the travel
+    time and length of the edges.
+
+    Parameters
+    ----------
+    - `graph` : georouting.graph.CSRGraph
+        The road network; its edge geometries are used when it has them, straight
+        lines otherwise.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        tail = np.repeat(np.arange(len(graph.nodes)), np.diff(graph.indptr))
+        head = graph.indices.astype(np.int64)
+        reverse = graph.find_edges(head, tail)
+        keep = (reverse < 0) | (tail < head)
+        # the indexed edges, their ends, and the opposite edge (-1 for one-way streets)
+        self.edges = np.flatnonzero(keep)
+        self.tail = tail[keep]
+        self.head = head[keep]
+        self.reverse = reverse[keep]
+
+        self._scale = np.cos(np.radians(np.mean(graph.y))) if len(graph.y) else 1.0
+        if graph.geometry is not None:
+            offsets, x, y = graph.geometry
+            counts = np.diff(offsets)[self.edges]
+            starts = np.repeat(offsets[self.edges] - np.cumsum(counts) + counts, counts)
+            points = np.arange(counts.sum()) + starts
+            x, y = np.asarray(x)[points], np.asarray(y)[points]
+        else:
+            counts = np.full(len(self.edges), 2)
+            ends = np.column_stack([self.tail, self.head]).ravel()
+            x, y = graph.x[ends], graph.y[ends]
+        coords = self._project(x, y)
+        line_ids = np.repeat(np.arange(len(counts)), counts)
+        self.lines = shapely.linestrings(coords, indices=line_ids)
+        self.tree = shapely.STRtree(self.lines)
+        self._index_pieces(coords, line_ids, len(counts))
+
+    def _index_pieces(self, coords, line_ids, n_lines):
+        """
+        Cut the lines into pieces of at most `MAX_PIECE_LENGTH` and index their
+        midpoints.
+        """
+        same = line_ids[1:] == line_ids[:-1]
+        start, delta = coords[:-1][same], np.diff(coords, axis=0)[same]
+        line = line_ids[:-1][same]
+        length = np.hypot(delta[:, 0], delta[:, 1])
+        self._line_length = np.bincount(line, length, minlength=n_lines)
+        # the distance along its line to the start of each segment
+        before = np.cumsum(length) - length
+        first = np.ones(len(line), dtype=bool)
+        first[1:] = line[1:] != line[:-1]
+        offset = before - np.maximum.accumulate(np.where(first, before, 0))
+
+        pieces = np.maximum(np.ceil(length / MAX_PIECE_LENGTH), 1).astype(np.int64)
+        segment = np.repeat(np.arange(len(line)), pieces)
+        k = np.arange(len(segment)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+        t = (k / pieces[segment])[:, None]
+        self._piece_start = start[segment] + t * delta[segment]
+        self._piece_delta = delta[segment] / pieces[segment, None]
+        self._piece_length = length[segment] / pieces[segment]
+        self._piece_offset = offset[segment] + t[:, 0] * length[segment]
+        self._piece_line = line[segment]
+        self._piece_tree = cKDTree(self._piece_start + self._piece_delta / 2)
+        self._half_piece = self._piece_length.max() / 2 if len(segment) else 0.0
+
+    def _project(self, x, y):
+        return np.column_stack(
+            [
+                np.radians(x) * self._scale * EARTH_RADIUS_M,
+                np.radians(y) * EARTH_RADIUS_M,
+            ]
+        )
+
+    def query(self, points):
+        """
+        Snap (latitude, longitude) points to their nearest edges.
+
+        Returns
+        -------
+        - `edges` : array of int
+            The position of the nearest edge of each point in the index.
+        - `fractions` : array of float
+            The position of the snapped point along the edge, from 0 at its tail to 1
+            at its head.
+        - `distances` : array of float
+            The distance between each point and the edge, in meters.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if np.isnan(points).any():
+            raise ValueError("The points cannot contain NaN coordinates.")
+        xy = self._project(points[:, 1], points[:, 0])
+        k = min(NEAREST_PIECES, len(self._piece_line))
+        midpoint_distances, pieces = self._piece_tree.query(xy, k=k)
+        pieces = pieces.reshape(len(xy), k)
+        midpoint_distances = midpoint_distances.reshape(len(xy), k)
+
+        # the nearest point of each candidate piece
+        start, delta = self._piece_start[pieces], self._piece_delta[pieces]
+        squared = (delta**2).sum(axis=2)
+        t = ((xy[:, None] - start) * delta).sum(axis=2) / np.where(squared > 0, squared, 1)
+        t = t.clip(0, 1)
+        gap = start + t[:, :, None] * delta - xy[:, None]
+        candidates = np.hypot(gap[:, :, 0], gap[:, :, 1])
+        best = candidates.argmin(axis=1)
+        rows = np.arange(len(xy))
+        distances = candidates[rows, best]
+        piece, t = pieces[rows, best], t[rows, best]
+        edges = self._piece_line[piece]
+        along = self._piece_offset[piece] + t * self._piece_length[piece]
+        fractions = along / np.where(self._line_length > 0, self._line_length, 1)[edges]
+
+        # a piece beyond the k nearest midpoints is nearer than the best found only
+        # if the k-th midpoint is closer than the best distance + half a piece
+        unsure = np.flatnonzero(
+            (k < len(self._piece_line))
+            & (midpoint_distances[:, -1] <= distances + self._half_piece)
+        )
+        if unsure.size:
+            geoms = shapely.points(xy[unsure])
+            (found, nearest), nearest_distances = self.tree.query_nearest(
+                geoms, return_distance=True, all_matches=False
+            )
+            order = np.argsort(found, kind="stable")
+            edges[unsure] = nearest[order]
+            distances[unsure] = nearest_distances[order]
+            fractions[unsure] = shapely.line_locate_point(
+                self.lines[edges[unsure]], geoms, normalized=True
+            )
+        return edges, np.nan_to_num(fractions).clip(0, 1), distances
+
+    def _share(self, edges, fractions):
+        """
+        The travel time and length of the edges, scaled by `fractions`; infinite for
+        missing (-1) edges.
+        """
+        valid = edges >= 0
+        position = np.where(valid, edges, 0)
+        durations = np.where(valid, self.graph.travel_time[position] * fractions, np.inf)
+        lengths = np.where(valid, self.graph.length[position] * fractions, np.inf)
+        return durations, lengths
+
+    def exits(self, edges, fractions):
+        """
+        The nodes a snapped point can leave its edge to, as (n, 2) arrays of node
+        indices, durations and lengths: the head of the edge, and its tail when the
+        street is two-way (infinite costs otherwise).
+        """
+        forward = self._share(self.edges[edges], 1 - fractions)
+        backward = self._share(self.reverse[edges], fractions)
+        nodes = np.column_stack([self.head[edges], self.tail[edges]])
+        return (
+            nodes,
+            np.column_stack([forward[0], backward[0]]),
+            np.column_stack([forward[1], backward[1]]),
+        )
+
+    def entries(self, edges, fractions):
+        """
+        The nodes a snapped point can be reached from, as for `exits`: the tail of
+        the edge, and its head when the street is two-way.
+        """
+        forward = self._share(self.edges[edges], fractions)
+        backward = self._share(self.reverse[edges], 1 - fractions)
+        nodes = np.column_stack([self.tail[edges], self.head[edges]])
+        return (
+            nodes,
+            np.column_stack([forward[0], backward[0]]),
+            np.column_stack([forward[1], backward[1]]),
+        )
+
+    def direct(self, origin_edges, origin_fractions, edges, fractions):
+        """
+        The duration and length from snapped origins to snapped destinations along
+        a shared edge, without passing a node (infinite where they do not share an
+        edge or the destination is behind the origin on a one-way street).
+        """
+        same = origin_edges == edges
+        ahead = same & (origin_fractions <= fractions)
+        behind = same & (origin_fractions >= fractions)
+        forward = self._share(
+            np.where(ahead, self.edges[edges], -1), np.abs(fractions - origin_fractions)
+        )
+        backward = self._share(
+            np.where(behind, self.reverse[edges], -1), np.abs(fractions - origin_fractions)
+        )
+        take = backward[0] < forward[0]
+        return (
+            np.where(take, backward[0], forward[0]),
+            np.where(take, backward[1], forward[1]),
+        )
@@ -8,14 +8,19 @@ import re
 import subprocess
 import tempfile
 import shutil
+import threading
 from datetime import datetime
 from pathlib import Path
+from requests.adapters import HTTPAdapter
 
 
 def convert_to_list(data):
     """
-    This function converts the data to a list.
+    This function converts the data to a list. Arrays and dataframes become a list
+    of their rows.
     """
+    if isinstance(data, pd.DataFrame):
+        data = data.to_numpy()
     if isinstance(data, np.ndarray):
         data = data.tolist()
     return data
@@ -38,81 +43,643 @@ def _format_coords(coords):
     return "|".join([f"{c[0]},{c[1]}" for c in coords])
 
 
-def get_batch_od_pairs(orgins, destinations, max_batch_size=25):
+# ------------- coordinate quantization -------------
+
+# meters per degree of latitude
+METERS_PER_DEGREE = 111320.0
+
+
+def quantize_coordinates(coords, grid_size=None, geohash_precision=None):
     """
-    This function returns a list of dataframes containing the origin-destination pairs to
-    avoid the repeated requests to the travel distance API.
+    Snap (latitude, longitude) points to the center of the cell they fall in, so that
+    points a few centimeters apart share one key and one upstream query.
+
+    Parameters
+    ----------
+    - `coords` : iterable objects
+        The points, e.g. a list of [latitude, longitude] or an (n, 2) array.
+
+    - `grid_size` : float
+        Size of the cells in meters. Cells are `grid_size` high and, at the latitude of
+        the cell, `grid_size` wide.
+
+    - `geohash_precision` : int
+        Use the cells of geohashes with this many characters instead (e.g. 8 is about
+        38 m x 19 m, 9 about 5 m x 5 m).
+
+    Returns
+    -------
+    - `quantized` : numpy.ndarray
+        An (n, 2) float array of the snapped points. Without `grid_size` and
+        `geohash_precision` the points are returned unchanged.
     """
+    coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+    if grid_size is not None and geohash_precision is not None:
+        raise ValueError("Use either grid_size or geohash_precision, not both.")
+
+    if grid_size is not None:
+        if grid_size <= 0:
+            raise ValueError("grid_size should be positive.")
+        lat_step = grid_size / METERS_PER_DEGREE
+        lat = (np.floor(coords[:, 0] / lat_step) + 0.5) * lat_step
+        lon_step = lat_step / np.maximum(np.cos(np.radians(lat)), 1e-6)
+        lon = (np.floor(coords[:, 1] / lon_step) + 0.5) * lon_step
+    elif geohash_precision is not None:
+        # a geohash of p characters interleaves 5p bits, starting with longitude
+        bits = 5 * int(geohash_precision)
+        lat_step = 180.0 / 2 ** (bits // 2)
+        lon_step = 360.0 / 2 ** ((bits + 1) // 2)
+        lat = (np.floor((coords[:, 0] + 90.0) / lat_step) + 0.5) * lat_step - 90.0
+        lon = (np.floor((coords[:, 1] + 180.0) / lon_step) + 0.5) * lon_step - 180.0
+    else:
+        return coords
+
+    return np.column_stack([lat, lon])
+
+
+def matrix_to_array(rows, shape=None, dtype=np.float64):
+    """
+    Convert a matrix given as nested lists (as found in JSON responses, with None for
+    missing values) to a float array of `shape`, with NaN for the missing values.
+    Arrays (from decoders that already return them) are used without a copy.
+    """
+    if rows is None or len(rows) == 0:
+        return np.full(shape or (0, 0), np.nan, dtype=dtype)
+    array = np.asarray(rows, dtype=dtype)
+    return array if shape is None else array.reshape(shape)
+
 
-    orgins = pd.DataFrame(orgins, columns=["lat", "lon"])
-    destinations = pd.DataFrame(destinations, columns=["lat", "lon"])
-    df = pd.merge(
-        orgins,
-        destinations,
-        left_index=True,
-        right_index=True,
-        suffixes=("_origin", "_destination"),
+def factorize_points(points):
+    """
+    Encode (latitude, longitude) points as integer ids, in order of first appearance.
+
+    Returns the ids of the points and an array of the unique points, so that
+    `uniques[codes]` gives the points back.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    lat_codes, lat_uniques = pd.factorize(points[:, 0], use_na_sentinel=False)
+    lon_codes, lon_uniques = pd.factorize(points[:, 1], use_na_sentinel=False)
+    keys = lat_codes.astype(np.int64) * len(lon_uniques) + lon_codes
+    codes, uniques = pd.factorize(keys)
+    uniques = np.column_stack(
+        [lat_uniques[uniques // len(lon_uniques)], lon_uniques[uniques % len(lon_uniques)]]
     )
-    df["origin"] = df["lat_origin"].astype(str) + "," + df["lon_origin"].astype(str)
-    df["destination"] = (
-        df["lat_destination"].astype(str) + "," + df["lon_destination"].astype(str)
+    return codes, uniques
+
+
+def get_batch_od_indices(
+    orgins, destinations, max_batch_size=25, grid_size=None, geohash_precision=None
+):
+    """
+    Divide origin-destination pairs into batches of matrix requests, working on
+    integer point ids.
+
+    Duplicated pairs are requested once. The pairs are grouped by their origin (or by
+    their destination if there are fewer unique destinations), and every group is
+    split into batches of at most `max_batch_size` pairs, so each batch is a 1 x m
+    (or m x 1) matrix request.
+
+    Parameters
+    ----------
+    - `orgins`, `destinations` : iterable objects
+        The origin and destination of each pair, e.g. lists of [latitude, longitude].
+
+    - `max_batch_size` : int
+        Maximum number of pairs per batch.
+
+    - `grid_size`, `geohash_precision` :
+        Snap the points first, see `quantize_coordinates`.
+
+    - `max_coordinates` : int
+        Maximum number of origins plus destinations per request, for services
+        that cap the coordinates of a request (e.g. 25 on Mapbox). None means
+        no limit.
+
+    Returns
+    -------
+    - `origin_points`, `destination_points` : numpy.ndarray
+        The unique (snapped) origins and destinations, as (k, 2) arrays.
+
+    - `batches` : list
+        One (origin ids, destination ids) tuple of integer arrays per batch, indexing
+        `origin_points` and `destination_points`.
+
+    - `row_batch` : numpy.ndarray
+        For every input pair, the batch it is requested in.
+
+    - `row_offset` : numpy.ndarray
+        For every input pair, its position in the origin-major matrix of its batch.
+    """
+    orgins = quantize_coordinates(orgins, grid_size, geohash_precision)
+    destinations = quantize_coordinates(destinations, grid_size, geohash_precision)
+    if len(orgins) != len(destinations):
+        raise ValueError("The origins and destinations should have the same length.")
+
+    origin_codes, origin_points = factorize_points(orgins)
+    destination_codes, destination_points = factorize_points(destinations)
+
+    # unique pairs, in order of first appearance
+    pair_codes, _ = pd.factorize(
+        origin_codes.astype(np.int64) * max(len(destination_points), 1)
+        + destination_codes
     )
+    n_pairs = pair_codes.max() + 1 if len(pair_codes) else 0
+    first_row = np.empty(n_pairs, dtype=np.int64)
+    first_row[pair_codes[::-1]] = np.arange(len(pair_codes))[::-1]
+    pair_origins = origin_codes[first_row]
+    pair_destinations = destination_codes[first_row]
+
+    by_origin = len(destination_points) >= len(origin_points)
+    if by_origin:
+        group, other = pair_origins, pair_destinations
+    else:
+        group, other = pair_destinations, pair_origins
+
+    # order the pairs by group, keeping the order of appearance within a group
+    order = np.argsort(group, kind="stable")
+    group, other = group[order], other[order]
+    group_start = np.searchsorted(group, group)
+    rank = np.arange(len(group)) - group_start
+    if np.isfinite(max_batch_size):
+        position = rank % int(max_batch_size)
+    else:
+        position = rank
+    starts = np.flatnonzero(position == 0)
+
+    batches = []
+    for first, members in zip(starts, np.split(other, starts[1:])):
+        single = group[first : first + 1]
+        batches.append((single, members) if by_origin else (members, single))
 
-    if df["destination"].nunique() >= df["origin"].nunique():
-        according = "origin"
+    # map every pair (and so every input row) to its batch and position
+    pair_batch = np.empty(n_pairs, dtype=np.int64)
+    pair_offset = np.empty(n_pairs, dtype=np.int64)
+    pair_batch[order] = np.cumsum(position == 0) - 1
+    pair_offset[order] = position
+    row_batch = pair_batch[pair_codes]
+    row_offset = pair_offset[pair_codes]
+
+    return origin_points, destination_points, batches, row_batch, row_offset
+
+
+def get_batch_od_pairs(
+    orgins, destinations, max_batch_size=25, grid_size=None, geohash_precision=None
+):
+    """
+    This function returns a list of (origins, destinations) batches covering the
+    origin-destination pairs, to avoid repeated requests to the travel distance API.
+
+    With `grid_size` (meters) or `geohash_precision` the points are first snapped with
+    `quantize_coordinates`, so near-identical pairs are requested once, at the snapped
+    coordinates. See `get_batch_od_indices` for the batching rules and for index maps
+    back to the input pairs.
+    """
+    origin_points, destination_points, batches, _, _ = get_batch_od_indices(
+        orgins, destinations, max_batch_size, grid_size, geohash_precision
+    )
+    return batch_ids_to_points(origin_points, destination_points, batches)
+
+
+def batch_ids_to_points(origin_points, destination_points, batches):
+    """
+    Turn batches of (origin ids, destination ids) into batches of (origins,
+    destinations) lists of (latitude, longitude) tuples.
+    """
+    origin_points = [tuple(p) for p in origin_points.tolist()]
+    destination_points = [tuple(p) for p in destination_points.tolist()]
+    return [
+        (
+            [origin_points[i] for i in origin_ids],
+            [destination_points[j] for j in destination_ids],
+        )
+        for origin_ids, destination_ids in batches
+    ]
+
+
+def _tile_shape(n_rows, n_cols, max_rows, max_cols, max_elements, max_points):
+    """
+    Shape of the blocks tiling an n_rows x n_cols rectangle in the fewest requests.
+    """
+    best = None
+    for cols in range(1, int(min(n_cols, max_cols, max_elements, max_points - 1)) + 1):
+        rows = int(min(n_rows, max_rows, max_elements // cols, max_points - cols))
+        requests = -(-n_rows // rows) * -(-n_cols // cols)
+        if best is None or requests < best[0]:
+            best = (requests, rows, cols)
+    return best[1], best[2]
+
+
+def get_batch_od_blocks(
+    orgins,
+    destinations,
+    max_origins=None,
+    max_destinations=None,
+    max_elements=25,
+    min_fill=1.0,
+    max_candidates=64,
+    grid_size=None,
+    geohash_precision=None,
+    max_coordinates=None,
+):
+    """
+    Cover origin-destination pairs with rectangular origins x destinations matrix
+    requests, using as few requests as possible.
+
+    Works in two passes over the side with fewer unique points (the "rows"):
+
+    1. rows needing exactly the same set of columns are tiled into full blocks, which
+       wastes no elements;
+    2. each remaining row seeds a block: the columns it needs (the ones most needed by
+       other rows first) and the other rows that need at least `min_fill` of those
+       columns. Elements of a block that no pair needs are wasted, so a lower
+       `min_fill` trades wasted elements for fewer requests; the default `min_fill=1`
+       never wastes elements.
+
+    Parameters
+    ----------
+    - `orgins`, `destinations` : iterable objects
+        The origin and destination of each pair, e.g. lists of [latitude, longitude].
+
+    - `max_origins`, `max_destinations` : int
+        Maximum number of origins and destinations per request. None means no limit.
+
+    - `max_elements` : int
+        Maximum number of elements (origins x destinations) per request.
+
+    - `min_fill` : float
+        Minimum share of the elements of a block that are needed pairs.
+
+    - `max_candidates` : int
+        Number of rows looked at per column when growing a block, which bounds the
+        cost of planning.
+
+    - `grid_size`, `geohash_precision` :
+        Snap the points first, see `quantize_coordinates`.
+
+    Returns
+    -------
+    - `origin_points`, `destination_points` : numpy.ndarray
+        The unique (snapped) origins and destinations, as (k, 2) arrays.
+
+    - `batches` : list
+        One (origin ids, destination ids) tuple of integer arrays per request.
+    """
+    orgins = quantize_coordinates(orgins, grid_size, geohash_precision)
+    destinations = quantize_coordinates(destinations, grid_size, geohash_precision)
+    if len(orgins) != len(destinations):
+        raise ValueError("The origins and destinations should have the same length.")
+
+    origin_codes, origin_points = factorize_points(orgins)
+    destination_codes, destination_points = factorize_points(destinations)
+
+    by_origin = len(destination_points) >= len(origin_points)
+    inf = float("inf")
+    max_rows = max_origins or inf
+    max_cols = max_destinations or inf
+    if by_origin:
+        rows, cols = origin_codes, destination_codes
     else:
-        according = "destination"
-    # print(according)
-    grouped = df.groupby(according)
-    orgins_destinations_list = []
-    for i, group in grouped:
-        # set batch id
-        group["batch_id"] = group.index
-        # set batch size
-        batch_size = len(group)
-        group["batch_size"] = batch_size
-
-        # divide the batch into sub batches according to the max_batch_size
-        if batch_size > max_batch_size:
-            ngroups = batch_size // max_batch_size
-            if batch_size % max_batch_size != 0:
-                ngroups += 1
-            for i in range(ngroups - 1):
-                sub_group = group.iloc[i * max_batch_size : (i + 1) * max_batch_size]
-
-                orgins = (
-                    sub_group[["lat_origin", "lon_origin"]]
-                    .value_counts()
-                    .index.to_list()
+        rows, cols = destination_codes, origin_codes
+        max_rows, max_cols = max_cols, max_rows
+    max_elements = inf if max_elements is None else max_elements
+    max_points = inf if max_coordinates is None else max_coordinates
+    if max_points < 2:
+        raise ValueError("max_coordinates should be at least 2.")
+
+    # the columns needed by every row
+    pairs = np.unique(np.column_stack([rows, cols]).astype(np.int64), axis=0)
+    starts = np.flatnonzero(np.r_[True, pairs[1:, 0] != pairs[:-1, 0]])
+    needed = {
+        int(block[0, 0]): block[:, 1]
+        for block in np.split(pairs, starts[1:])
+        if len(block)
+    }
+
+    blocks = []
+
+    # 1. rows with the same columns
+    by_columns = {}
+    for row, row_cols in needed.items():
+        by_columns.setdefault(row_cols.tobytes(), []).append(row)
+    remaining = {}
+    for group in by_columns.values():
+        if len(group) == 1:
+            remaining[group[0]] = set(needed[group[0]].tolist())
+            continue
+        group = np.array(group)
+        group_cols = needed[group[0]]
+        n_rows, n_cols = _tile_shape(
+            len(group), len(group_cols), max_rows, max_cols, max_elements, max_points
+        )
+        for i in range(0, len(group), n_rows):
+            for j in range(0, len(group_cols), n_cols):
+                blocks.append((group[i : i + n_rows], group_cols[j : j + n_cols]))
+
+    # 2. greedy blocks for the other rows
+    col_rows = {}
+    for row, row_cols in remaining.items():
+        for col in row_cols:
+            col_rows.setdefault(col, set()).add(row)
+    seeds = sorted(remaining, key=lambda row: -len(remaining[row]))
+    for seed in seeds:
+        while remaining[seed]:
+            seed_cols = sorted(remaining[seed], key=lambda col: -len(col_rows[col]))
+            seed_cols = seed_cols[
+                : int(min(len(seed_cols), max_cols, max_elements, max_points - 1))
+            ]
+
+            # rows sharing the seed's columns, and the rank of each shared column
+            local, hit_rows, hit_ranks = {}, [], []
+            for rank, col in enumerate(seed_cols):
+                for n, row in enumerate(col_rows[col]):
+                    if n >= max_candidates:
+                        break
+                    if row != seed:
+                        hit_rows.append(local.setdefault(row, len(local)))
+                        hit_ranks.append(rank)
+            candidates = np.array(list(local), dtype=np.int64)
+            hit_rows = np.array(hit_rows, dtype=np.int64)
+            hit_ranks = np.array(hit_ranks, dtype=np.int64)
+
+            best = None
+            width = len(seed_cols)
+            while width >= 1:
+                overlap = np.bincount(
+                    hit_rows[hit_ranks < width], minlength=len(candidates)
                 )
-                destinations = (
-                    sub_group[["lat_destination", "lon_destination"]]
-                    .value_counts()
-                    .index.to_list()
+                order = np.argsort(-overlap, kind="stable")
+                order = order[overlap[order] >= min_fill * width]
+                # cap the (possibly unbounded) limits before converting them to int
+                limit = min(
+                    max_rows, max_elements // width, max_points - width, len(candidates) + 1
                 )
-                orgins_destinations_list.append((orgins, destinations))
+                order = order[: int(limit) - 1]
+                covered = width + int(overlap[order].sum())
+                # more pairs per request first, then fewer elements
+                score = (covered, -(len(order) + 1) * width)
+                if best is None or score > best[0]:
+                    best = (score, [seed] + candidates[order].tolist(), seed_cols[:width])
+                width //= 2
+
+            _, block_rows, block_cols = best
+            blocks.append((np.array(block_rows), np.array(block_cols)))
+            for row in block_rows:
+                for col in block_cols:
+                    if col in remaining[row]:
+                        remaining[row].discard(col)
+                        col_rows[col].discard(row)
+
+    if by_origin:
+        batches = blocks
+    else:
+        batches = [(block_cols, block_rows) for block_rows, block_cols in blocks]
+    return origin_points, destination_points, batches
 
-            sub_group = group.iloc[(ngroups - 1) * max_batch_size :]
-            orgins = (
-                sub_group[["lat_origin", "lon_origin"]].value_counts().index.to_list()
-            )
-            destinations = (
-                sub_group[["lat_destination", "lon_destination"]]
-                .value_counts()
-                .index.to_list()
-            )
-            orgins_destinations_list.append((orgins, destinations))
 
-        else:
-            orgins = group[["lat_origin", "lon_origin"]].value_counts().index.to_list()
-            destinations = (
-                group[["lat_destination", "lon_destination"]]
-                .value_counts()
-                .index.to_list()
-            )
-            orgins_destinations_list.append((orgins, destinations))
+def get_batch_plan_report(batches, n_pairs, baseline=None):
+    """
+    Summarize a list of (origins, destinations) batches covering `n_pairs` unique
+    pairs: number of requests, elements, wasted elements and efficiency (the share
+    of requested elements that are needed pairs). With a `baseline` list of batches,
+    its number of requests and elements are added for comparison.
+    """
+    elements = int(sum(len(o) * len(d) for o, d in batches))
+    report = {
+        "pairs": int(n_pairs),
+        "requests": len(batches),
+        "elements": elements,
+        "wasted_elements": elements - int(n_pairs),
+        "efficiency": n_pairs / elements if elements else 1.0,
+        "pairs_per_request": n_pairs / len(batches) if batches else 0.0,
+    }
+    if baseline is not None:
+        report["baseline_requests"] = len(baseline)
+        report["baseline_elements"] = int(sum(len(o) * len(d) for o, d in baseline))
+    return report
+
+
+# ------------- JSON decoding -------------
+
+# decoders that can parse the raw bytes of a response, fastest first
+JSON_DECODERS = {}
+
+try:
+    import orjson
+
+    JSON_DECODERS["orjson"] = orjson.loads
+except ImportError:
+    pass
+
+try:
+    import simdjson
+
+    JSON_DECODERS["simdjson"] = simdjson.loads
+except ImportError:
+    pass
+
+try:
+    import ujson
+
+    JSON_DECODERS["ujson"] = ujson.loads
+except ImportError:
+    pass
+
+JSON_DECODERS["json"] = json.loads
+
+
+def get_json_decoder(decoder=None):
+    """
+    Resolve a JSON decoder, a function parsing the `bytes` of a response body.
+
+    Parameters
+    ----------
+    - `decoder` : str, callable or None
+        The name of an installed decoder ("orjson", "simdjson", "ujson" or "json"),
+        or a callable used as is. None picks the fastest installed decoder, falling
+        back to the standard library `json.loads`.
 
-    return orgins_destinations_list
+    Returns
+    -------
+    - `decoder` : callable
+    """
+    if decoder is None:
+        return next(iter(JSON_DECODERS.values()))
+    if callable(decoder):
+        return decoder
+    if decoder not in JSON_DECODERS:
+        raise ValueError(
+            "JSON decoder %r is not installed, use one of %s or a callable."
+            % (decoder, sorted(JSON_DECODERS))
+        )
+    return JSON_DECODERS[decoder]
+
+
+# ------------- Arrow / Parquet output -------------
+
+def import_pyarrow():
+    """
+    Import pyarrow (and pyarrow.parquet), which is only needed for Arrow and Parquet output.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as exc:
+        raise ImportError(
+            "Arrow and Parquet output need pyarrow, install it with "
+            "`pip install pyarrow` or `pip install georouting[arrow]`."
+        ) from exc
+    return pyarrow
+
+
+def points_to_arrow(points, id_column):
+    """
+    The coordinate table of the points behind integer ids: an int32 `id_column`
+    (the position of each point) and float64 "lat" and "lon" columns.
+    """
+    pa = import_pyarrow()
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    return pa.Table.from_arrays(
+        [
+            pa.array(np.arange(len(points), dtype=np.int32)),
+            pa.array(points[:, 0]),
+            pa.array(points[:, 1]),
+        ],
+        names=[id_column, "lat", "lon"],
+    )
+
+
+def distances_to_arrow(
+    distances, durations, origin_ids=None, destination_ids=None, dtype=np.float32
+):
+    """
+    Build an Arrow table from the flat distance and duration arrays of n pairs.
+
+    Parameters
+    ----------
+    - `distances`, `durations` : array-like
+        The distance (m) and duration (s) of each pair, NaN when unknown.
+
+    - `origin_ids`, `destination_ids` : array-like or None
+        The integer ids of the origin and destination of each pair. If given,
+        they are added as the int32 "origin_id" and "destination_id" columns; the
+        points behind them are stored once, see `points_to_arrow`.
+
+    - `dtype` : numpy dtype
+        The type of the distance and duration columns, float32 by default.
+
+    Returns
+    -------
+    - `table` : pyarrow.Table
+        Missing values are stored as nulls.
+    """
+    pa = import_pyarrow()
+    columns, names = [], []
+    if origin_ids is not None and destination_ids is not None:
+        columns += [
+            pa.array(np.asarray(origin_ids, dtype=np.int32)),
+            pa.array(np.asarray(destination_ids, dtype=np.int32)),
+        ]
+        names += ["origin_id", "destination_id"]
+    for name, values in (("distance (m)", distances), ("duration (s)", durations)):
+        values = np.asarray(values, dtype=dtype)
+        columns.append(pa.array(values, mask=np.isnan(values)))
+        names.append(name)
+    return pa.Table.from_arrays(columns, names=names)
+
+
+class PointIds:
+    """
+    Integer ids of (latitude, longitude) points that stay the same across calls,
+    in order of first appearance, e.g. for the chunks of a streamed result.
+
+    Example
+    -------
+    >>> ids = PointIds()
+    >>> ids.encode([[42.36, -71.06], [42.37, -71.10]]).tolist()
+    [0, 1]
+    >>> ids.encode([[42.37, -71.10]]).tolist()
+    [1]
+    """
+
+    def __init__(self):
+        self._ids = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def encode(self, points):
+        """Return the int32 ids of the points, giving new points the next ids."""
+        codes, uniques = factorize_points(points)
+        ids = np.array(
+            [self._ids.setdefault(point, len(self._ids)) for point in map(tuple, uniques.tolist())],
+            dtype=np.int32,
+        )
+        return ids[codes] if len(ids) else np.zeros(0, dtype=np.int32)
+
+    @property
+    def points(self):
+        """The (n, 2) array of the points, indexed by id."""
+        return np.array(list(self._ids), dtype=float).reshape(-1, 2)
+
+
+# ------------- HTTP session helpers -------------
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 32
+
+_HTTP_SESSIONS = {}
+_HTTP_SESSIONS_LOCK = threading.Lock()
+
+
+def create_http_session(
+    pool_connections=DEFAULT_POOL_CONNECTIONS,
+    pool_maxsize=DEFAULT_POOL_MAXSIZE,
+    keep_alive=True,
+):
+    """
+    Create a `requests.Session` backed by a connection pool.
+
+    Parameters
+    ----------
+    pool_connections : int
+        Number of per-host connection pools to keep.
+    pool_maxsize : int
+        Maximum number of connections kept alive in each per-host pool. Set this
+        at least as high as the number of threads sharing the session.
+    keep_alive : bool
+        If False, ask the server to close the connection after every response.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(
+        {
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive" if keep_alive else "close",
+        }
+    )
+    return session
+
+
+def get_http_session(
+    pool_connections=DEFAULT_POOL_CONNECTIONS,
+    pool_maxsize=DEFAULT_POOL_MAXSIZE,
+    keep_alive=True,
+):
+    """
+    Return the process-wide session for the given pool settings.
+
+    Routers created with the same settings share one session, so connections
+    opened by one router are reused by the others.
+    """
+    key = (pool_connections, pool_maxsize, keep_alive)
+    with _HTTP_SESSIONS_LOCK:
+        session = _HTTP_SESSIONS.get(key)
+        if session is None:
+            session = create_http_session(*key)
+            _HTTP_SESSIONS[key] = session
+    return session
 
 
 # ------------- Geofabrik helpers -------------
@@ -22,7 +22,7 @@ requirements = ['Click>=7.0', ]
 
 setup_requirements = ['pytest-runner', ]
 
-test_requirements = ['pytest>=3', ]
+test_requirements = ['pytest>=3', 'pyarrow', ]
 
 setup(
     author="Xiaokang Fu",
@@ -47,6 +47,10 @@ setup(
         ],
     },
     install_requires=install_requires,
+    extras_require={
+        'arrow': ['pyarrow'],
+        'test': test_requirements,
+    },
     dependency_links=dependency_links,
     license="MIT license",
     long_description=readme,
@@ -0,0 +1,129 @@
+"""Shared fixtures for the local (non-integration) tests."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import networkx as nx
+import numpy as np
+import pytest
+
+
+def fake_distance(origin, destination):
+    """Deterministic 'distance' between two (lat, lon) points used by the mock server."""
+    return round(
+        abs(origin[0] - destination[0]) * 100000 + abs(origin[1] - destination[1]) * 1000,
+        3,
+    )
+
+
+class _OSRMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.paths.append(self.path)
+            failure = server.failures.pop(0) if server.failures else None
+        if failure is not None:
+            # injected transient failure, e.g. 503 or 429
+            body = b'{"code": "TooBusy"}'
+            self.send_response(failure)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        url = urlsplit(self.path)
+        service, _, _, coords = url.path.strip("/").split("/")
+        # OSRM takes lon,lat; keep (lat, lon) internally
+        points = [tuple(map(float, c.split(",")))[::-1] for c in coords.split(";")]
+        if service == "route":
+            value = fake_distance(points[0], points[-1])
+            self._send_json(
+                {"code": "Ok", "routes": [{"duration": value / 10, "distance": value}]}
+            )
+            return
+        qs = parse_qs(url.query)
+        sources = [int(i) for i in qs["sources"][0].split(";")]
+        destinations = [int(i) for i in qs["destinations"][0].split(";")]
+        distances = [
+            [fake_distance(points[i], points[j]) for j in destinations] for i in sources
+        ]
+        durations = [[d / 10 for d in row] for row in distances]
+        self._send_json({"code": "Ok", "durations": durations, "distances": distances})
+
+
+@pytest.fixture
+def osrm_server():
+    """
+    A local stand-in for an OSRM server; yields the server with its base URL (`url`),
+    the request log (`paths`) and a list of status codes to fail the next requests with (`failures`, None lets
+    a request through).
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _OSRMHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.paths = []
+    server.failures = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = "http://127.0.0.1:%d" % server.server_address[1]
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_road_graph(n=8, seed=0):
+    """
+    A small OSMnx-like road network: an `n` x `n` grid of two-way and one-way streets
+    with random speeds, a slower and longer parallel edge (so the routes show which
+    of the two edges they use), and a separate two-node component.
+    """
+    rng = np.random.default_rng(seed)
+    G = nx.MultiDiGraph(crs="epsg:4326")
+    for i in range(n):
+        for j in range(n):
+            G.add_node(100 + i * n + j, x=-71.1 + 0.005 * j, y=42.3 + 0.004 * i)
+    G.add_node(1, x=-70.9, y=42.5)
+    G.add_node(2, x=-70.899, y=42.5)
+
+    def add_edge(u, v, speed_kph, stretch=1.0):
+        x = np.radians([G.nodes[u]["x"], G.nodes[v]["x"]])
+        y = np.radians([G.nodes[u]["y"], G.nodes[v]["y"]])
+        a = np.sin((y[1] - y[0]) / 2) ** 2 + np.cos(y[0]) * np.cos(y[1]) * np.sin(
+            (x[1] - x[0]) / 2
+        ) ** 2
+        length = float(2 * 6371009 * np.arcsin(np.sqrt(a))) * stretch
+        G.add_edge(u, v, length=length, speed_kph=speed_kph, travel_time=length / (speed_kph / 3.6))
+
+    for i in range(n):
+        for j in range(n):
+            u = 100 + i * n + j
+            for v in ([u + 1] if j < n - 1 else []) + ([u + n] if i < n - 1 else []):
+                speed = float(rng.uniform(20, 80))
+                add_edge(u, v, speed)
+                if rng.random() > 0.2:
+                    add_edge(v, u, speed)
+    add_edge(100, 101, 10.0, stretch=1.5)
+    add_edge(1, 2, 30.0)
+    return G
+
+
+@pytest.fixture
+def road_graph():
+    """A small synthetic road network, see `make_road_graph`."""
+    return make_road_graph()
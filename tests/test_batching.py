@@ -0,0 +1,108 @@
+"""Tests for dividing origin-destination pairs into batches."""
+
+import numpy as np
+
+import georouting.utils as gtl
+
+
+def _random_pairs(n, n_origins, seed=0):
+    rng = np.random.default_rng(seed)
+    origins = rng.integers(0, n_origins, n)
+    destinations = rng.integers(0, 40, n)
+    return (
+        np.column_stack([origins * 0.01, origins * 0.02]),
+        np.column_stack([destinations * 0.1, -destinations * 0.1]),
+    )
+
+
+def test_batch_od_indices_cover_every_row():
+    origins, destinations = _random_pairs(2000, 10)
+    origin_points, destination_points, batches, row_batch, row_offset = (
+        gtl.get_batch_od_indices(origins, destinations, max_batch_size=7)
+    )
+    assert all(len(o) * len(d) <= 7 for o, d in batches)
+    # every unique pair is requested exactly once
+    n_unique = len(np.unique(np.hstack([origins, destinations]), axis=0))
+    assert sum(len(o) * len(d) for o, d in batches) == n_unique
+
+    for row in range(len(origins)):
+        origin_ids, destination_ids = batches[row_batch[row]]
+        i, j = divmod(row_offset[row], len(destination_ids))
+        assert (origin_points[origin_ids[i]] == origins[row]).all()
+        assert (destination_points[destination_ids[j]] == destinations[row]).all()
+
+
+def test_batch_od_pairs_group_by_the_smaller_side():
+    origins, destinations = _random_pairs(500, 100)
+    batches = gtl.get_batch_od_pairs(origins.tolist(), destinations.tolist(), 25)
+    # there are fewer destinations, so every batch has a single destination
+    assert all(len(d) == 1 and isinstance(d[0], tuple) for _, d in batches)
+
+    batches = gtl.get_batch_od_pairs(origins, destinations, np.inf)
+    assert len(batches) == len(np.unique(destinations, axis=0))
+    assert gtl.get_batch_od_pairs([], []) == []
+
+
+def test_batch_od_blocks_pack_full_matrices():
+    origins = np.repeat(np.arange(30), 40)
+    destinations = np.tile(np.arange(40), 30)
+    origins = np.column_stack([origins * 0.01, origins * 0.01])
+    destinations = np.column_stack([destinations * 0.01 + 1, destinations * 0.01])
+    _, _, batches = gtl.get_batch_od_blocks(
+        origins, destinations, max_origins=25, max_destinations=25, max_elements=100
+    )
+    report = gtl.get_batch_plan_report(batches, 1200)
+    assert report["wasted_elements"] == 0
+    assert report["requests"] == 12
+    assert all(len(o) <= 25 and len(d) <= 25 and len(o) * len(d) <= 100 for o, d in batches)
+
+
+def test_batch_od_blocks_cover_sparse_pairs():
+    origins, destinations = _random_pairs(3000, 60, seed=1)
+    n_unique = len(np.unique(np.hstack([origins, destinations]), axis=0))
+    for min_fill in (1.0, 0.5):
+        origin_points, destination_points, batches = gtl.get_batch_od_blocks(
+            origins, destinations, max_elements=50, min_fill=min_fill
+        )
+        covered = {
+            tuple(origin_points[i]) + tuple(destination_points[j])
+            for o, d in batches
+            for i in o
+            for j in d
+        }
+        assert {tuple(p) for p in np.hstack([origins, destinations])} <= covered
+        report = gtl.get_batch_plan_report(batches, n_unique)
+        if min_fill == 1.0:
+            assert report["wasted_elements"] == 0
+        assert report["efficiency"] >= min_fill
+
+
+def test_batch_od_blocks_without_limits():
+    origins, destinations = _random_pairs(500, 40, seed=2)
+    for max_elements in (np.inf, None):
+        origin_points, destination_points, batches = gtl.get_batch_od_blocks(
+            origins, destinations, max_elements=max_elements
+        )
+        covered = {
+            tuple(origin_points[i]) + tuple(destination_points[j])
+            for o, d in batches
+            for i in o
+            for j in d
+        }
+        assert {tuple(p) for p in np.hstack([origins, destinations])} <= covered
+
+
+def test_batch_od_blocks_cap_the_coordinates():
+    origins, destinations = _random_pairs(3000, 60, seed=3)
+    for min_fill in (1.0, 0.5):
+        origin_points, destination_points, batches = gtl.get_batch_od_blocks(
+            origins, destinations, max_elements=100, min_fill=min_fill, max_coordinates=25
+        )
+        assert all(len(o) + len(d) <= 25 for o, d in batches)
+        covered = {
+            tuple(origin_points[i]) + tuple(destination_points[j])
+            for o, d in batches
+            for i in o
+            for j in d
+        }
+        assert {tuple(p) for p in np.hstack([origins, destinations])} <= covered
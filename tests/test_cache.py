@@ -0,0 +1,115 @@
+"""Tests for the persistent SQLite result cache."""
+
+import numpy as np
+
+from georouting.cache import MemoryCache, SQLiteCache
+from georouting.routers import OSRMRouter
+
+from tests.conftest import fake_distance
+
+origins = [[42.36, -71.06], [42.37, -71.10], [42.35, -71.08]]
+destinations = [[42.39, -71.12], [42.33, -71.05], [42.30, -71.00]]
+
+
+def test_cache_store_and_lookup(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite")
+    pairs = [o + d for o, d in zip(origins, destinations)]
+    cache.set_distances("osrm", "driving", pairs[:2], [10.0, np.nan], [100.0, 200.0])
+
+    found, durations, distances = cache.get_distances("osrm", "driving", pairs)
+    assert found.tolist() == [True, True, False]
+    assert durations[0] == 10.0 and np.isnan(durations[1])
+    assert distances[:2].tolist() == [100.0, 200.0]
+    assert not cache.get_distances("osrm", "walking", pairs)[0].any()
+    assert cache.stats()["hits"] == 2
+
+    # entries survive reopening the file
+    cache.close()
+    cache = SQLiteCache(tmp_path / "cache.sqlite", max_entries=1)
+    assert cache.get_distances("osrm", "driving", pairs[:1])[0].all()
+    cache.set_distances("osrm", "driving", pairs[2:], [30.0], [300.0])
+    assert cache.stats()["entries"] == 1
+    assert cache.get_distances("osrm", "driving", pairs[2:])[0].all()
+
+
+def test_cache_counts_rows_only_when_full():
+    cache = SQLiteCache(":memory:", max_entries=1000)
+    statements = []
+    cache._conn.set_trace_callback(statements.append)
+    for k in range(200):
+        pairs = [[k, i, 0.0, 0.0] for i in range(10)]
+        cache.set_distances("osrm", "driving", pairs, [1.0] * 10, [1.0] * 10)
+    counts = [s for s in statements if s.startswith("SELECT COUNT(*)")]
+    # on the first insert, then once per 11 inserts (110 rows) from the 101st on,
+    # as the table is evicted down to 900 rows
+    assert len(counts) == 11
+    assert cache.stats()["entries"] <= 1000
+    # the newest entries are kept
+    assert cache.get_distances("osrm", "driving", [[199, 9, 0.0, 0.0]])[0].all()
+
+
+def test_cache_ttl():
+    cache = SQLiteCache(":memory:", ttl=-1)
+    cache.set_distances("osrm", "driving", [origins[0] + destinations[0]], [1.0], [1.0])
+    assert not cache.get_distances("osrm", "driving", [origins[0] + destinations[0]])[0][0]
+
+
+def test_router_only_requests_missing_pairs(osrm_server, tmp_path):
+    router = OSRMRouter(base_url=osrm_server.url, cache=str(tmp_path / "cache.sqlite"))
+    router.max_batch_size = 1
+    expected = [fake_distance(o, d) for o, d in zip(origins, destinations)]
+
+    df = router.get_distances_batch(origins[:2], destinations[:2])
+    assert len(osrm_server.paths) == 2
+
+    df = router.get_distances_batch(origins, destinations, append_od=True)
+    assert df["distance (m)"].tolist() == expected
+    assert df["origin_lat"].tolist() == [o[0] for o in origins]
+    assert len(osrm_server.paths) == 3
+
+    df = router.get_distances_batch(origins, destinations)
+    assert df["distance (m)"].tolist() == expected
+    assert len(osrm_server.paths) == 3
+
+    matrix = router.get_distance_matrix(origins[:1], destinations[:1])
+    assert matrix["distance (m)"].tolist() == expected[:1]
+    assert len(osrm_server.paths) == 3
+
+    route = router.get_route(origins[0], destinations[0])
+    route = router.get_route(origins[0], destinations[0])
+    assert route.get_distance() == expected[0]
+    assert len(osrm_server.paths) == 4
+
+
+def test_memory_cache_lru():
+    cache = MemoryCache(max_entries=2, max_bytes=None)
+    pairs = [o + d for o, d in zip(origins, destinations)]
+    cache.set_distances("osrm", "driving", pairs[:2], [1.0, 2.0], [10.0, 20.0])
+    # touch the first pair so the second one is the least recently used
+    assert cache.get_distances("osrm", "driving", pairs[:1])[0].all()
+    cache.set_distances("osrm", "driving", pairs[2:], [3.0], [30.0])
+    assert cache.get_distances("osrm", "driving", pairs)[0].tolist() == [True, False, True]
+    assert cache.stats()["evictions"] == 1
+
+    cache = MemoryCache(max_entries=None, max_bytes=3 * MemoryCache.cell_bytes)
+    cache.set_distances("osrm", "driving", pairs, [1.0, 2.0, 3.0], [1.0, 2.0, 3.0])
+    cache.set_route("osrm", "driving", origins[0], destinations[0], {"routes": [1] * 100})
+    assert cache.stats()["bytes"] <= 3 * MemoryCache.cell_bytes
+    assert len(cache) == 2
+    assert cache.get_route("osrm", "driving", origins[0], destinations[0]) is not None
+
+
+def test_router_memory_cache(osrm_server):
+    router = OSRMRouter(base_url=osrm_server.url, cache="memory")
+    first = router.get_route(origins[0], destinations[0])
+    second = router.get_route(origins[0], destinations[0])
+    assert second.get_route() is first.get_route()
+    assert len(osrm_server.paths) == 1
+
+    router.get_distance_matrix(origins, destinations)
+    router.get_distance_matrix(origins[1:], destinations)
+    assert len(osrm_server.paths) == 2
+    info = router.cache_info()
+    assert info["routes"] == 1 and info["entries"] == 9
+    assert info["hits"] == 1 + 6
+    assert OSRMRouter(base_url=osrm_server.url).cache_info() is None
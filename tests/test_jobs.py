@@ -0,0 +1,63 @@
+"""Tests for checkpointed batch jobs."""
+
+import pytest
+
+from georouting.jobs import BatchJob
+from georouting.routers import OSRMRouter
+
+from tests.conftest import fake_distance
+
+origins = [[42.36, -71.06], [42.37, -71.10], [42.35, -71.08], [42.36, -71.06]]
+destinations = [[42.39, -71.12], [42.33, -71.05], [42.30, -71.00], [42.33, -71.05]]
+
+
+def test_job_resumes_outstanding_batches(osrm_server, tmp_path):
+    router = OSRMRouter(base_url=osrm_server.url, rate_limit=False, retry=False)
+    router.max_batch_size = 1
+    router.batch_retries = 0
+
+    job = BatchJob(router, tmp_path / "job", origins, destinations)
+    assert job.progress()["batches"] == 4
+
+    osrm_server.failures = [503]
+    with pytest.warns(UserWarning):
+        info = job.run(errors="coerce", progress=False)
+    assert info["batches_done"] == 3 and info["batches_failed"] == 1
+    assert job.result()["distance (m)"].isna().sum() >= 1
+    job.close()
+
+    # reopen the job from its directory and finish it
+    reports = []
+    job = BatchJob(router, tmp_path / "job")
+    info = job.run(progress=reports.append)
+    assert len(osrm_server.paths) == 5
+    assert info["batches_done"] == 4 and reports[-1]["pairs_done"] == 4
+
+    df = job.result(append_od=True)
+    assert df["distance (m)"].tolist() == [
+        fake_distance(o, d) for o, d in zip(origins, destinations)
+    ]
+    assert df["origin_lat"].tolist() == [o[0] for o in origins]
+
+    with pytest.raises(ValueError):
+        BatchJob(router, tmp_path / "other")
+
+
+def test_job_counts_pairs(osrm_server, tmp_path):
+    router = OSRMRouter(base_url=osrm_server.url, rate_limit=False, retry=False)
+    # a repeated pair is requested once but answers two input pairs
+    pairs = list(zip(origins, destinations)) + [(origins[0], destinations[0])]
+    job = BatchJob(router, tmp_path / "job", (o for o, _ in pairs), (d for _, d in pairs))
+    status = job.progress()
+    assert status["pairs"] == 5 and status["pairs_done"] == 0
+    assert status["elements"] == 4
+
+    info = job.run(progress=False)
+    assert info["pairs_done"] == 5 and info["elements_done"] == 4
+    job.close()
+
+    # generators are accepted when reopening the job too
+    job = BatchJob(router, tmp_path / "job", (o for o, _ in pairs), (d for _, d in pairs))
+    assert job.result()["distance (m)"].tolist() == [fake_distance(o, d) for o, d in pairs]
+    with pytest.raises(ValueError):
+        BatchJob(router, tmp_path / "job", iter(origins), iter(destinations))
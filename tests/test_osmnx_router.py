@@ -0,0 +1,330 @@
+"""Tests for the local OSMnx router, run on a small synthetic road network."""
+
+import numpy as np
+import pytest
+
+from georouting.routers import OSMNXRouter
+
+origins = [[42.3, -71.1], [42.312, -71.085], [42.328, -71.07], [42.5, -70.9]]
+destinations = [[42.32, -71.07], [42.304, -71.095], [42.3, -71.1], [42.5, -70.899]]
+
+
+def test_igraph_engine_matches_networkx(road_graph):
+    nx_router = OSMNXRouter(graph=road_graph)
+    ig_router = OSMNXRouter(graph=road_graph, engine="igraph")
+
+    for o, d in zip(origins, destinations):
+        nx_route = nx_router.get_route(o, d)
+        ig_route = ig_router.get_route(o, d)
+        assert ig_route.get_route() == nx_route.get_route()
+
+    expected = nx_router.get_distance_matrix(origins, destinations, append_od=True)
+    df = ig_router.get_distance_matrix(origins, destinations, append_od=True)
+    assert df.columns.tolist() == expected.columns.tolist()
+    assert np.allclose(df.values, expected.values.astype(float), equal_nan=True)
+    # the separate component cannot be reached from the grid
+    assert df["duration (s)"].isna().sum() == 6
+
+    expected = nx_router.get_distances_batch(origins, destinations)
+    df = ig_router.get_distances_batch(origins, destinations)
+    assert np.allclose(df.values, expected.values.astype(float), equal_nan=True)
+
+    with pytest.raises(ValueError):
+        OSMNXRouter(graph=road_graph, engine="graph-tool")
+
+
+def test_matrix_searches_from_the_smaller_side(road_graph):
+    router = OSMNXRouter(graph=road_graph)
+    routes = [router.get_route(o, d) for o in origins[:3] for d in destinations[:3]]
+    expected = [[r.get_duration(), r.get_distance()] for r in routes]
+
+    # more origins than destinations: one search per destination on the reversed graph
+    df = router.get_distance_matrix(origins[:3], destinations[:1])
+    assert df.values.tolist() == expected[::3]
+    df = router.get_distance_matrix(origins[:3], destinations[:3])
+    assert df.values.tolist() == expected
+
+
+def test_scipy_engine_matches_networkx(road_graph):
+    nx_router = OSMNXRouter(graph=road_graph)
+    csr_router = OSMNXRouter(graph=road_graph, engine="scipy")
+    assert csr_router.graph.indices.dtype == np.int32
+    assert csr_router.graph.travel_time.dtype == np.float32
+    # the slower parallel edge is dropped
+    assert len(csr_router.graph.indices) == road_graph.number_of_edges() - 1
+
+    for o, d in zip(origins, destinations):
+        assert csr_router.get_route(o, d).get_route() == nx_router.get_route(o, d).get_route()
+
+    expected = nx_router.get_distance_matrix(origins, destinations)
+    df = csr_router.get_distance_matrix(origins, destinations)
+    assert np.allclose(df.values, expected.values, equal_nan=True, atol=1)
+    df = csr_router.get_distance_matrix(origins, destinations[:1])
+    assert np.allclose(df.values, expected.values[::4], equal_nan=True, atol=1)
+
+    expected = nx_router.get_distances_batch(origins, destinations)
+    df = csr_router.get_distances_batch(origins, destinations)
+    assert np.allclose(df.values, expected.values, equal_nan=True, atol=1)
+
+
+def test_scipy_engine_chunks_fit_the_memory_budget(road_graph, monkeypatch):
+    import georouting.graph as graph_module
+
+    # a million nodes take 12 MB per searched source
+    assert graph_module.search_chunk_size(10**6) == 22
+    assert graph_module.search_chunk_size(10**6, memory=1) == 1
+    assert graph_module.search_chunk_size(100) == graph_module.DEFAULT_SOURCE_CHUNK
+
+    router = OSMNXRouter(graph=road_graph, engine="scipy")
+    expected = router.get_distance_matrix(origins, destinations)
+    # one source per chunk
+    monkeypatch.setattr(graph_module, "SEARCH_MEMORY", 1)
+    df = router.get_distance_matrix(origins, destinations)
+    assert np.allclose(df.values, expected.values, equal_nan=True)
+
+
+def test_contraction_hierarchy_engine(road_graph, tmp_path):
+    csr_router = OSMNXRouter(graph=road_graph, engine="scipy")
+    path = tmp_path / "graph.ch.npz"
+    ch_router = OSMNXRouter(graph=road_graph, engine="ch", ch_path=path)
+    assert path.exists()
+    # the second router loads the saved hierarchy
+    ch_router = OSMNXRouter(graph=road_graph, engine="ch", ch_path=path)
+
+    for o, d in zip(origins, destinations):
+        assert ch_router.get_route(o, d).get_route() == csr_router.get_route(o, d).get_route()
+
+    expected = csr_router.get_distance_matrix(origins, destinations)
+    df = ch_router.get_distance_matrix(origins, destinations)
+    assert np.allclose(df.values, expected.values, equal_nan=True)
+
+    expected = csr_router.get_distances_batch(origins, destinations)
+    df = ch_router.get_distances_batch(origins, destinations)
+    assert np.allclose(df.values, expected.values, equal_nan=True)
+
+    # same nodes, another travel time: the saved hierarchy is stale
+    slower = road_graph.copy()
+    u, v, k = next(iter(slower.edges(keys=True)))
+    slower.edges[u, v, k]["travel_time"] *= 2
+    with pytest.raises(ValueError):
+        OSMNXRouter(graph=slower, engine="ch", ch_path=path)
+
+    road_graph.remove_node(1)
+    with pytest.raises(ValueError):
+        OSMNXRouter(graph=road_graph, engine="ch", ch_path=path)
+
+
+def test_saved_road_network(road_graph, tmp_path, monkeypatch):
+    downloads = []
+
+    def download(self):
+        downloads.append(self.area)
+        return road_graph
+
+    monkeypatch.setattr(OSMNXRouter, "_download_road_network", download)
+    area = "Somerville, Massachusetts, USA"
+    first = OSMNXRouter(area=area, engine="scipy", graph_dir=tmp_path)
+    assert first.graph_path == str(tmp_path / "somerville-massachusetts-usa_drive")
+    assert (tmp_path / "somerville-massachusetts-usa_drive" / "indptr.npy").exists()
+
+    router = OSMNXRouter(area=area, engine="scipy", graph_dir=tmp_path)
+    assert downloads == [area]
+    assert isinstance(router.graph.indices.base, np.memmap)
+    assert router._G is None
+
+    expected = first.get_distance_matrix(origins, destinations)
+    df = router.get_distance_matrix(origins, destinations)
+    assert np.allclose(df.values, expected.values, equal_nan=True)
+    route = router.get_route(origins[0], destinations[0])
+    assert route.get_route() == first.get_route(origins[0], destinations[0]).get_route()
+    assert route.get_distance() == expected.iloc[0]["distance (m)"]
+
+    # the NetworkX engine runs on the graph rebuilt from the saved arrays
+    nx_router = OSMNXRouter(area=area, graph_dir=tmp_path)
+    assert nx_router.G.number_of_edges() == road_graph.number_of_edges() - 1
+    df = nx_router.get_distance_matrix(origins, destinations)
+    assert np.allclose(df.values, expected.values, equal_nan=True)
+    assert downloads == [area]
+
+    # an interrupted save (no manifest) is saved again rather than rejected
+    partial = tmp_path / "partial_drive"
+    partial.mkdir()
+    np.save(partial / "nodes.npy", router.graph.nodes)
+    router = OSMNXRouter(area="partial", engine="scipy", graph_dir=tmp_path)
+    assert downloads == [area, "partial"]
+    assert (partial / "graph.json").exists()
+    assert not list(partial.glob("*.tmp"))
+    assert router.graph.fingerprint() == first.graph.fingerprint()
+    assert OSMNXRouter(area="partial", engine="scipy", graph_dir=tmp_path).graph.geometry is not None
+
+    # a graph passed in is not the saved network of graph_dir, so the workers
+    # search a copy of it
+    assert first._shared_graph_path() == first.graph_path
+    other = road_graph.copy()
+    other.remove_node(1)
+    router = OSMNXRouter(area=area, engine="scipy", graph=other, graph_dir=tmp_path)
+    assert router._shared_graph_path() != router.graph_path
+    expected = router.get_distance_matrix(origins, destinations)
+    df = router.get_distance_matrix(origins, destinations, workers=2)
+    assert np.allclose(df.values, expected.values, equal_nan=True)
+
+
+def test_scipy_engine_workers(road_graph):
+    router = OSMNXRouter(graph=road_graph, engine="scipy")
+    expected = router.get_distance_matrix(origins, destinations)
+    df = router.get_distance_matrix(origins, destinations, workers=2)
+    assert np.allclose(df.values, expected.values, equal_nan=True)
+    # fewer destinations: the workers search the saved reversed graph
+    df = router.get_distance_matrix(origins, destinations[:1], workers=2)
+    assert np.allclose(df.values, expected.values[::4], equal_nan=True)
+
+    expected = router.get_distances_batch(origins, destinations)
+    df = router.get_distances_batch(origins, destinations, workers=2)
+    assert np.allclose(df.values, expected.values, equal_nan=True)
+
+    with pytest.raises(ValueError):
+        OSMNXRouter(graph=road_graph).get_distance_matrix(origins, destinations, workers=2)
+
+
+def test_snap_matches_osmnx_nearest_nodes(road_graph):
+    import osmnx as ox
+
+    router = OSMNXRouter(graph=road_graph)
+    rng = np.random.default_rng(0)
+    points = np.column_stack(
+        [rng.uniform(42.29, 42.34, 200), rng.uniform(-71.11, -71.06, 200)]
+    )
+    nodes, distances = router.snap(points)
+    expected, expected_distances = ox.distance.nearest_nodes(
+        road_graph, points[:, 1], points[:, 0], return_dist=True
+    )
+    assert nodes.tolist() == expected.tolist()
+    assert np.allclose(distances, expected_distances)
+
+    # the scipy engine indexes the nodes of its CSR graph
+    csr_router = OSMNXRouter(graph=road_graph, engine="scipy")
+    assert csr_router.snap(points)[0].tolist() == expected.tolist()
+    node, distance = router.snap([origins[0]])
+    assert distance[0] < 50
+
+    # a projected network is snapped in its own coordinates, with (y, x) points
+    projected = ox.project_graph(road_graph)
+    x = np.array([d["x"] for _, d in projected.nodes(data=True)])
+    y = np.array([d["y"] for _, d in projected.nodes(data=True)])
+    points = np.column_stack(
+        [rng.uniform(y.min(), y.max(), 200), rng.uniform(x.min(), x.max(), 200)]
+    )
+    expected = ox.distance.nearest_nodes(projected, points[:, 1], points[:, 0])
+    for engine in ("networkx", "scipy"):
+        router = OSMNXRouter(graph=projected, engine=engine)
+        assert router.snap(points)[0].tolist() == expected.tolist()
+    with pytest.raises(ValueError):
+        OSMNXRouter(graph=projected, engine="scipy", snap_to="edge")
+
+
+def _split_edge_costs(G, router, origin, destination):
+    """
+    The reference cost between two points snapped onto edges: the points are added
+    to a copy of the NetworkX graph as nodes splitting their edges.
+    """
+    import networkx as nx
+
+    G = nx.DiGraph(
+        (u, v, {"travel_time": d["travel_time"], "length": d["length"]})
+        for u, v, d in sorted(
+            G.edges(data=True), key=lambda e: -e[2]["travel_time"]
+        )
+    )
+    edges, fractions, _ = router.edge_index.query([origin, destination])
+    for name, edge, f in zip(["o", "d"], edges, fractions):
+        u, v = router.graph.nodes[[router.edge_index.tail[edge], router.edge_index.head[edge]]]
+        for a, b, share in [(u, v, f), (v, u, 1 - f)]:
+            if G.has_edge(a, b):
+                attr = G.edges[a, b]
+                G.add_edge(a, name, **{k: attr[k] * share for k in attr})
+                G.add_edge(name, b, **{k: attr[k] * (1 - share) for k in attr})
+    if edges[0] == edges[1] and "o" in G and "d" in G:
+        # both on one edge: connect them directly along it
+        u, v = router.graph.nodes[[router.edge_index.tail[edges[0]], router.edge_index.head[edges[0]]]]
+        a, b = (u, v) if fractions[0] <= fractions[1] else (v, u)
+        if G.has_edge(a, b):
+            share = abs(fractions[1] - fractions[0])
+            attr = G.edges[a, b]
+            G.add_edge("o", "d", **{k: attr[k] * share for k in attr})
+    try:
+        path = nx.shortest_path(G, "o", "d", weight="travel_time")
+    except (nx.NetworkXNoPath, nx.NodeNotFound):
+        return [np.nan, np.nan]
+    return [
+        sum(G.edges[a, b][k] for a, b in zip(path[:-1], path[1:]))
+        for k in ("travel_time", "length")
+    ]
+
+
+def test_edge_snapping(road_graph):
+    node_router = OSMNXRouter(graph=road_graph, engine="scipy")
+    router = OSMNXRouter(graph=road_graph, engine="scipy", snap_to="edge")
+    rng = np.random.default_rng(1)
+    points = np.column_stack([rng.uniform(42.3, 42.328, 8), rng.uniform(-71.1, -71.065, 8)])
+    # two points on the street between nodes 101 and 102, both nearest to node 101
+    points = np.vstack([[[42.3001, -71.0945], [42.2999, -71.0935]], points])
+
+    df = router.get_distance_matrix(points, points)
+    expected = [_split_edge_costs(road_graph, router, o, d) for o in points for d in points]
+    assert np.allclose(df.values, np.round(expected), equal_nan=True, atol=1)
+
+    # a short trip along one street no longer has zero length
+    assert node_router.get_distance_matrix(points[:1], points[1:2]).values.tolist() == [[0, 0]]
+    assert 75 < df.values[1, 1] < 90
+    route = router.get_route(points[0], points[1])
+    assert [route.get_duration(), route.get_distance()] == df.values[1].tolist()
+
+    batch = router.get_distances_batch(points, points[::-1])
+    assert np.allclose(batch.values, df.values[len(points) - 1 :: len(points) - 1][: len(points)])
+    # a route looks up the costs of all its exit and entry nodes at once
+    calls = []
+    get_costs = router._get_costs
+    router._get_costs = lambda *args: calls.append(args) or get_costs(*args)
+    for o, d, row in zip(points, points[::-1], batch.values):
+        calls.clear()
+        route = router.get_route(o, d)
+        assert [route.get_duration(), route.get_distance()] == pytest.approx(row, abs=1)
+        assert len(calls) <= 1
+
+    with pytest.raises(ValueError):
+        OSMNXRouter(graph=road_graph, snap_to="way")
+
+
+def test_astar_algorithms(road_graph):
+    router = OSMNXRouter(graph=road_graph, engine="scipy")
+    graph = router.graph
+    rng = np.random.default_rng(2)
+    points = np.column_stack([rng.uniform(42.3, 42.328, 10), rng.uniform(-71.1, -71.065, 10)])
+    for algorithm in ("astar", "alt"):
+        astar_router = OSMNXRouter(graph=road_graph, algorithm=algorithm, landmarks=4)
+        for o, d in zip(points, points[::-1]):
+            expected = router.get_route(o, d)
+            route = astar_router.get_route(o, d)
+            assert route.get_duration() == expected.get_duration()
+            assert route.get_route() == expected.get_route()
+        # no route to the separate component
+        assert astar_router._get_route_astar(100, 1) is None
+
+    # the heuristics are lower bounds and cut down the search
+    source, target = graph.node_index([100, 163]).tolist()
+    exact = graph.reversed()._search([target])[0][0]
+    reached = np.isfinite(exact)
+    _, dijkstra_settled = graph.astar(source, target)
+    for heuristic in (
+        graph.great_circle_heuristic(target),
+        graph.landmark_heuristic(graph.landmarks(4), target),
+    ):
+        bounds = np.array([heuristic(v) for v in np.flatnonzero(reached).tolist()])
+        assert (bounds <= exact[reached] + 1e-6).all()
+        path, settled = graph.astar(source, target, heuristic)
+        assert settled < dijkstra_settled
+        duration = graph.travel_time[graph.edge_index(path[:-1], path[1:])].sum()
+        assert np.isclose(duration, exact[source])
+
+    with pytest.raises(ValueError):
+        OSMNXRouter(graph=road_graph, algorithm="bellman-ford")
@@ -0,0 +1,47 @@
+"""Tests for coordinate quantization."""
+
+import numpy as np
+import pytest
+
+import georouting.utils as gtl
+from georouting.routers import OSRMRouter
+
+origins = [[42.36, -71.06], [42.360000013, -71.060000021], [42.35, -71.08]]
+destinations = [[42.39, -71.12], [42.390000008, -71.119999987], [42.30, -71.00]]
+
+
+def test_quantize_coordinates():
+    points = np.array([[42.36, -71.06], [42.36000001, -71.06000002], [42.3601, -71.06]])
+    snapped = gtl.quantize_coordinates(points, grid_size=5)
+    assert (snapped[0] == snapped[1]).all()
+    assert not (snapped[0] == snapped[2]).all()
+    assert np.abs(snapped - points).max() < 5 / gtl.METERS_PER_DEGREE * 2
+
+    # the center of geohash "u4pruydqqvj"
+    snapped = gtl.quantize_coordinates([[57.64911, 10.40744]], geohash_precision=11)
+    assert np.allclose(snapped, [[57.649110630, 10.407439694]])
+
+    assert (gtl.quantize_coordinates(points) == points).all()
+    with pytest.raises(ValueError):
+        gtl.quantize_coordinates(points, grid_size=5, geohash_precision=8)
+
+
+def test_batch_od_pairs_collapse_near_identical_pairs():
+    batches = gtl.get_batch_od_pairs(origins, destinations, grid_size=1)
+    assert sum(len(o) * len(d) for o, d in batches) == 2
+
+
+def test_router_requests_collapsed_pairs_once(osrm_server):
+    router = OSRMRouter(base_url=osrm_server.url, quantize=1)
+    router.max_batch_size = 1
+    df = router.get_distances_batch(origins, destinations, append_od=True)
+    assert len(osrm_server.paths) == 2
+    assert router.batch_stats["collapsed_pairs"] == 1
+    assert router.batch_stats["requested_pairs"] == 2
+    assert df.iloc[0, 4] == df.iloc[1, 4]
+    assert df["origin_lat"].tolist() == [o[0] for o in origins]
+
+    router = OSRMRouter(base_url=osrm_server.url, cache="memory", quantize={"grid_size": 1})
+    router.get_route(origins[0], destinations[0])
+    router.get_route(origins[1], destinations[1])
+    assert len(osrm_server.paths) == 3
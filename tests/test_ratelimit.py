@@ -0,0 +1,39 @@
+"""Tests for the client-side rate limiter."""
+
+import time
+
+from georouting.ratelimit import RateLimiter, TokenBucket
+from georouting.routers import GoogleRouter, OSRMRouter
+
+
+def test_token_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(rate=10, capacity=2)
+    now = time.monotonic()
+    assert bucket.reserve(1, now) == 0
+    assert bucket.reserve(1, now) == 0
+    assert abs(bucket.reserve(1, now) - 0.1) < 1e-9
+    # requests larger than the bucket go into debt instead of blocking forever
+    assert abs(bucket.reserve(5, now) - 0.6) < 1e-9
+
+
+def test_rate_limiter_limits_requests_and_elements():
+    limiter = RateLimiter(requests_per_second=100, elements_per_second=50, burst=0.1)
+    start = time.monotonic()
+    for _ in range(4):
+        limiter.acquire(elements=5)
+    # 20 elements at 50/s with a 5 element burst takes about 0.3 s
+    assert 0.25 < time.monotonic() - start < 1.0
+
+
+def test_router_rate_limit_defaults_and_overrides():
+    a = GoogleRouter("AIza-test-key")
+    b = GoogleRouter("AIza-test-key")
+    assert a.rate_limiter is b.rate_limiter
+    assert a.rate_limiter.elements_per_second == 1000
+
+    custom = GoogleRouter("AIza-test-key", rate_limit={"requests_per_second": 2})
+    assert custom.rate_limiter is not a.rate_limiter
+    assert GoogleRouter("AIza-test-key", rate_limit=False).rate_limiter is None
+
+    assert OSRMRouter().rate_limiter is not None
+    assert OSRMRouter(base_url="http://localhost:5000").rate_limiter is None
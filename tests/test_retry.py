@@ -0,0 +1,133 @@
+"""Tests for retrying failed requests and batches."""
+
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import googlemaps.exceptions
+import pytest
+import requests
+
+from georouting.retry import RetryPolicy, parse_retry_after
+from georouting.routers import GoogleRouter, OSRMRouter
+
+from tests.conftest import fake_distance
+
+origins = [[42.36, -71.06], [42.37, -71.10], [42.35, -71.08]]
+destinations = [[42.39, -71.12], [42.33, -71.05], [42.30, -71.00]]
+
+
+def _response(headers):
+    response = requests.Response()
+    response.headers.update(headers)
+    return response
+
+
+def test_retry_after_and_backoff():
+    policy = RetryPolicy(backoff_factor=1, max_backoff=5, jitter=False)
+    assert policy.get_backoff(1) == 1
+    assert policy.get_backoff(3) == 4
+    assert policy.get_backoff(10) == 5
+    assert policy.get_backoff(1, _response({"Retry-After": "12"})) == 12
+
+    date = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 < parse_retry_after(_response({"Retry-After": date})) <= 30
+
+    assert policy.can_retry("GET", 1)
+    assert not policy.can_retry("POST", 1)
+    assert policy.can_retry("POST", 1, idempotent=True)
+    assert not policy.can_retry("GET", 5)
+
+
+def test_transient_errors_are_retried(osrm_server):
+    router = OSRMRouter(base_url=osrm_server.url, retry=RetryPolicy(backoff_factor=0))
+    osrm_server.failures = [503, 429]
+    route = router.get_route(origins[0], destinations[0])
+    assert route.get_distance() == fake_distance(origins[0], destinations[0])
+    assert len(osrm_server.paths) == 3
+
+    osrm_server.failures = [404]
+    with pytest.raises(requests.HTTPError):
+        router.get_route(origins[0], destinations[0])
+
+
+def test_failed_batches_are_retried_individually(osrm_server):
+    router = OSRMRouter(base_url=osrm_server.url, retry=False)
+    router.max_batch_size = 1
+
+    osrm_server.failures = [503, 503]
+    df = router.get_distances_batch(origins, destinations, workers=2)
+    expected = [fake_distance(o, d) for o, d in zip(origins, destinations)]
+    assert df["distance (m)"].tolist() == expected
+    # three batches plus two retried ones
+    assert len(osrm_server.paths) == 5
+
+    # the first batch fails, and so do both of its retries
+    osrm_server.failures = [503, None, None, 503, 503]
+    with pytest.warns(UserWarning):
+        df = router.get_distances_batch(origins, destinations, errors="coerce")
+    assert df["distance (m)"].isna().sum() == 1
+
+    osrm_server.failures = [503, None, None, 503, 503]
+    with pytest.raises(RuntimeError):
+        router.get_distances_batch(origins, destinations)
+
+
+def test_permanent_batch_failures_are_not_retried(osrm_server):
+    router = OSRMRouter(base_url=osrm_server.url, retry=False)
+    router.max_batch_size = 1
+
+    osrm_server.failures = [400]
+    with pytest.raises(RuntimeError):
+        router.get_distances_batch(origins, destinations)
+    assert len(osrm_server.paths) == 3
+
+    osrm_server.failures = [400]
+    with pytest.warns(UserWarning):
+        df = router.get_distances_batch(origins, destinations, errors="coerce")
+    assert df["distance (m)"].isna().sum() == 1
+    assert len(osrm_server.paths) == 6
+
+
+class _FakeGoogleClient:
+    """Answers distance matrix requests like the googlemaps client, after `failures`."""
+
+    def __init__(self, failures):
+        self.failures = list(failures)
+        self.calls = 0
+
+    def distance_matrix(self, origins, destinations, mode):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return {
+            "rows": [
+                {
+                    "elements": [
+                        {
+                            "distance": {"value": fake_distance(o, d)},
+                            "duration": {"value": 1},
+                        }
+                        for d in destinations
+                    ]
+                }
+                for o in origins
+            ]
+        }
+
+
+def test_google_batch_failures_are_retried_or_coerced():
+    router = GoogleRouter("AIza-test-key", rate_limit=False, retry=False)
+    router.max_batch_size = 1
+    expected = [fake_distance(o, d) for o, d in zip(origins, destinations)]
+
+    router.client = _FakeGoogleClient([googlemaps.exceptions.Timeout()])
+    df = router.get_distances_batch(origins, destinations)
+    assert df["distance (m)"].tolist() == expected
+    assert router.client.calls == 4
+
+    # an invalid request is not sent again
+    router.client = _FakeGoogleClient([googlemaps.exceptions.ApiError("INVALID_REQUEST")])
+    with pytest.warns(UserWarning):
+        df = router.get_distances_batch(origins, destinations, errors="coerce")
+    assert df["distance (m)"].isna().sum() == 1
+    assert router.client.calls == 3
@@ -0,0 +1,305 @@
+"""Tests for the shared request path of web routers, run against a local mock OSRM server."""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import georouting.utils as gtl
+from georouting.routers import OSRMRouter
+from georouting.routers.base import WebRouter
+
+from tests.conftest import fake_distance
+
+origins = [[42.36, -71.06], [42.37, -71.10], [42.35, -71.08]]
+destinations = [[42.39, -71.12], [42.33, -71.05]]
+
+
+def test_routers_share_pooled_session():
+    a = WebRouter(api_key=None)
+    b = OSRMRouter()
+    assert a.session is b.session
+    assert a.session.get_adapter("https://example.com")._pool_maxsize >= 10
+    assert "gzip" in a.session.headers["Accept-Encoding"]
+
+    c = WebRouter(api_key=None, pool_maxsize=64)
+    assert c.session is not a.session
+    assert c.session.get_adapter("http://example.com")._pool_maxsize == 64
+
+
+def test_osrm_router_against_mock_server(osrm_server):
+    router = OSRMRouter(base_url=osrm_server.url)
+    route = router.get_route(origins[0], destinations[0])
+    assert route.get_distance() == fake_distance(origins[0], destinations[0])
+
+    df = router.get_distance_matrix(origins, destinations, append_od=True)
+    assert len(df) == len(origins) * len(destinations)
+    for row in df.itertuples(index=False):
+        expected = fake_distance(row[0:2], row[2:4])
+        assert row[4] == expected
+
+
+def test_async_batch_matches_serial(osrm_server):
+    import asyncio
+
+    router = OSRMRouter(base_url=osrm_server.url)
+    router.max_batch_size = 2
+    batch_origins = origins * 3
+    batch_destinations = destinations * 4 + destinations[:1]
+
+    serial = router.get_distances_batch(batch_origins, batch_destinations, append_od=True)
+    concurrent = asyncio.run(
+        router.aget_distances_batch(
+            batch_origins, batch_destinations, append_od=True, concurrency=4
+        )
+    )
+    assert concurrent.equals(serial)
+
+    serial = router.get_distances_batch(batch_origins, batch_destinations, append_od="ids")
+    concurrent = asyncio.run(
+        router.aget_distances_batch(
+            batch_origins, batch_destinations, append_od="ids", concurrency=64
+        )
+    )
+    assert len(concurrent) == 3
+    for a, b in zip(concurrent, serial):
+        assert a.equals(b)
+
+    route = asyncio.run(router.aget_route(origins[0], destinations[0]))
+    assert route.get_distance() == fake_distance(origins[0], destinations[0])
+
+
+def test_parallel_batch_keeps_input_order(osrm_server):
+    router = OSRMRouter(base_url=osrm_server.url)
+    router.max_batch_size = 2
+    batch_origins = [origins[i % 3] for i in range(11)]
+    batch_destinations = [destinations[i % 2] for i in range(10)] + [[42.30, -71.00]]
+
+    expected = [fake_distance(o, d) for o, d in zip(batch_origins, batch_destinations)]
+    for workers in (1, 4):
+        df = router.get_distances_batch(
+            batch_origins, batch_destinations, append_od=True, workers=workers
+        )
+        assert df["distance (m)"].tolist() == expected
+        assert df[["origin_lat", "origin_lon"]].values.tolist() == batch_origins
+
+
+def test_batch_size_option_is_capped_by_the_router(osrm_server):
+    router = OSRMRouter(base_url=osrm_server.url, rate_limit=False)
+    router.max_batch_size = 2
+    pairs_origins = [[42.36, -71.06]] * 4
+    pairs_destinations = [[42.39, -71.12 + 0.01 * i] for i in range(4)]
+
+    for max_batch_size, requests in ((1, 4), (100, 2)):
+        df = router.get_distances_batch(
+            pairs_origins, pairs_destinations, max_batch_size=max_batch_size
+        )
+        assert router.batch_stats["plan"]["requests"] == requests
+        assert df["distance (m)"].tolist() == [
+            fake_distance(o, d) for o, d in zip(pairs_origins, pairs_destinations)
+        ]
+    df = router.get_distances_batch(
+        pairs_origins, pairs_destinations, max_batch_size=3, use_local_server=True
+    )
+    assert router.batch_stats["plan"]["requests"] == 2
+
+
+def test_mapbox_requests_stay_within_25_coordinates():
+    from georouting.routers import MapboxRouter
+
+    router = MapboxRouter("pk.test-token", rate_limit=False)
+    rng = np.random.default_rng(0)
+    pairs_origins = (rng.integers(0, 30, 400) * 0.01 + 42).reshape(-1, 1).repeat(2, 1)
+    pairs_destinations = (rng.integers(0, 30, 400) * 0.01 - 71).reshape(-1, 1).repeat(2, 1)
+    for plan in ("rows", "blocks"):
+        _, _, batches, _ = router._get_batches(pairs_origins, pairs_destinations, plan=plan)
+        assert all(len(o) + len(d) <= 25 for o, d in batches)
+
+    url = router._get_matrix_distance_url(origins[:1], destinations[:2])
+    assert "sources=0&destinations=1;2&" in url
+
+
+def test_block_plan_matches_row_plan(osrm_server):
+    router = OSRMRouter(base_url=osrm_server.url, rate_limit=False)
+    router.max_batch_size = 6
+    origins = [[42.36 + 0.01 * (i % 3), -71.06] for i in range(12)]
+    destinations = [[42.39, -71.12 + 0.01 * (i // 3)] for i in range(12)]
+
+    stats = router.plan_distances_batch(origins, destinations)
+    assert stats["plan"]["requests"] == 2
+    assert stats["plan"]["baseline_requests"] == 3
+    assert osrm_server.paths == []
+
+    blocks = router.get_distances_batch(origins, destinations, plan="blocks")
+    assert len(osrm_server.paths) == 2
+    rows = router.get_distances_batch(origins, destinations)
+    assert blocks.equals(rows)
+
+    # no size limit, as with a local server
+    stats = router.plan_distances_batch(origins, destinations, max_batch_size=np.inf)
+    assert stats["plan"]["requests"] == 1
+
+
+def test_iter_distances_batch_streams_ordered_chunks(osrm_server):
+    router = OSRMRouter(base_url=osrm_server.url, rate_limit=False)
+    pairs_origins = [[42.36 + 0.01 * (i % 4), -71.06] for i in range(10)]
+    pairs_destinations = [[42.39, -71.12 + 0.01 * i] for i in range(10)]
+    expected = router.get_distances_batch(pairs_origins, pairs_destinations, append_od=True)
+
+    for workers in (1, 3):
+        chunks = list(
+            router.iter_distances_batch(
+                iter(pairs_origins),
+                (d for d in pairs_destinations),
+                chunk_size=4,
+                append_od=True,
+                workers=workers,
+            )
+        )
+        assert [list(chunk.index) for chunk in chunks] == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+        assert pd.concat(chunks).equals(expected)
+
+    with pytest.raises(ValueError):
+        list(router.iter_distances_batch(pairs_origins, pairs_destinations[:-1]))
+
+    # dataframes and arrays are read row by row
+    frames = router.iter_distances_batch(
+        pd.DataFrame(pairs_origins, columns=["lat", "lon"]),
+        np.array(pairs_destinations),
+        chunk_size=4,
+        append_od=True,
+    )
+    assert pd.concat(list(frames)).equals(expected)
+
+    # point ids would restart at 0 in every chunk
+    with pytest.raises(ValueError):
+        list(router.iter_distances_batch(pairs_origins, pairs_destinations, append_od="ids"))
+
+
+def test_distance_matrix_array_output(osrm_server):
+    router = OSRMRouter(base_url=osrm_server.url, rate_limit=False)
+    distances, durations = router.get_distance_matrix(
+        origins, destinations, output="array", dtype="float32"
+    )
+    assert distances.shape == durations.shape == (3, 2)
+    assert distances.dtype == np.float32
+    df = router.get_distance_matrix(origins, destinations)
+    assert np.allclose(distances.ravel(), df["distance (m)"])
+    assert np.allclose(durations.ravel(), df["duration (s)"])
+
+    # unreachable pairs come back as null
+    distances, _ = router._parse_distance_matrix_arrays(
+        {"distances": [[1.5, None]], "durations": [[None, 2.0]]}
+    )
+    assert distances[0, 0] == 1.5 and np.isnan(distances[0, 1])
+
+
+def test_pluggable_json_decoder(osrm_server):
+    assert gtl.get_json_decoder("json") is json.loads
+    assert gtl.get_json_decoder() is next(iter(gtl.JSON_DECODERS.values()))
+    with pytest.raises(ValueError):
+        gtl.get_json_decoder("no-such-decoder")
+
+    bodies = []
+
+    def decoder(body):
+        bodies.append(body)
+        return json.loads(body)
+
+    router = OSRMRouter(base_url=osrm_server.url, json_decoder=decoder)
+    df = router.get_distance_matrix(origins, destinations)
+    assert len(bodies) == 1 and isinstance(bodies[0], bytes)
+    assert df["distance (m)"].tolist() == [
+        fake_distance(o, d) for o in origins for d in destinations
+    ]
+
+
+def test_arrow_and_parquet_output(osrm_server, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    router = OSRMRouter(base_url=osrm_server.url, rate_limit=False)
+    table, origin_table, destination_table = router.get_distance_matrix(
+        origins, destinations, append_od=True, output="arrow"
+    )
+    df = router.get_distance_matrix(origins, destinations, append_od=True)
+    assert table.schema.field("distance (m)").type == pa.float32()
+    assert table.schema.field("origin_id").type == pa.int32()
+    assert np.allclose(table["distance (m)"].to_numpy(), df["distance (m)"])
+    ids = table["origin_id"].to_numpy()
+    assert origin_table["lat"].to_numpy()[ids].tolist() == df["origin_lat"].tolist()
+    assert destination_table.column_names == ["destination_id", "lat", "lon"]
+
+    pair_origins = origins * 3
+    pair_destinations = (destinations * 5)[: len(pair_origins)]
+    expected = router.get_distances_batch(pair_origins, pair_destinations)
+    table = router.get_distances_batch(pair_origins, pair_destinations, output="arrow")
+    assert table.column_names == ["distance (m)", "duration (s)"]
+    assert np.allclose(table["distance (m)"].to_numpy(), expected["distance (m)"])
+    table, origin_table, _ = router.get_distances_batch(
+        pair_origins, pair_destinations, append_od=True, output="arrow"
+    )
+    # each repeated origin is stored once
+    assert origin_table.num_rows == len(origins)
+    assert table["origin_id"].to_pylist() == list(range(len(origins))) * 3
+
+    files = router.write_distances_parquet(
+        pair_origins, pair_destinations, tmp_path / "out", chunk_size=4
+    )
+    # one file per chunk of 4 pairs, then the point tables
+    assert [f.name for f in files] == [
+        "part-00000.parquet",
+        "part-00001.parquet",
+        "part-00002.parquet",
+        "_origins.parquet",
+        "_destinations.parquet",
+    ]
+    assert [pq.read_metadata(f).num_rows for f in files[:3]] == [4, 4, 1]
+    table = pq.read_table(tmp_path / "out").sort_by("row")
+    assert table["row"].to_pylist() == list(range(len(pair_origins)))
+    assert np.allclose(table["distance (m)"].to_numpy(), expected["distance (m)"])
+    # the ids are shared by all files
+    for name, id_column, points in (
+        ("_origins.parquet", "origin_id", pair_origins),
+        ("_destinations.parquet", "destination_id", pair_destinations),
+    ):
+        point_table = pq.read_table(tmp_path / "out" / name)
+        assert point_table.column_names == [id_column, "lat", "lon"]
+        assert point_table[id_column].to_pylist() == list(range(point_table.num_rows))
+        ids = table[id_column].to_numpy()
+        assert point_table["lat"].to_numpy()[ids].tolist() == [p[0] for p in points]
+        assert point_table["lon"].to_numpy()[ids].tolist() == [p[1] for p in points]
+
+    files = router.write_distances_parquet(
+        pair_origins, pair_destinations, tmp_path / "plain", chunk_size=4, append_od=False
+    )
+    assert len(files) == 3
+    table = pq.read_table(tmp_path / "plain")
+    assert table.column_names == ["row", "distance (m)", "duration (s)"]
+
+
+def test_od_ids_output(osrm_server):
+    router = OSRMRouter(base_url=osrm_server.url, rate_limit=False)
+    expected = router.get_distance_matrix(origins, destinations, append_od=True)
+    df, origin_table, destination_table = router.get_distance_matrix(
+        origins, destinations, append_od="ids"
+    )
+    assert df.columns.tolist()[:2] == ["origin_id", "destination_id"]
+    assert df["origin_id"].dtype == np.int32
+    assert origin_table.loc[df["origin_id"]].values.tolist() == (
+        expected[["origin_lat", "origin_lon"]].values.tolist()
+    )
+    assert destination_table.loc[df["destination_id"]].values.tolist() == (
+        expected[["destination_lat", "destination_lon"]].values.tolist()
+    )
+    assert df["distance (m)"].tolist() == expected["distance (m)"].tolist()
+
+    pair_origins = origins * 3
+    pair_destinations = (destinations * 5)[: len(pair_origins)]
+    df, origin_table, destination_table = router.get_distances_batch(
+        pair_origins, pair_destinations, append_od="ids"
+    )
+    assert len(origin_table) == len(origins)
+    assert origin_table.loc[df["origin_id"]].values.tolist() == pair_origins
+    assert destination_table.loc[df["destination_id"]].values.tolist() == pair_destinations